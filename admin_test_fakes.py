@@ -0,0 +1,81 @@
+"""
+Fakes e dados compartilhados pelos testes dos handlers de admin
+(test_admin_query_counts.py, test_query_budgets.py).
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+SRC_DIR = Path(__file__).parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from models.admin import Admin
+from models.group import Group, GroupMembership
+from models.payment import Payment
+from models.user import User
+
+ADMIN_TELEGRAM_ID = 1
+
+
+class FakeTelegram:
+    async def kick_chat_member(self, chat_id, user_id):
+        return True
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.sent.append(caption)
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+        self.reply_to_message = None
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def make_update():
+    message = FakeMessage()
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=ADMIN_TELEGRAM_ID),
+        effective_chat=SimpleNamespace(id=ADMIN_TELEGRAM_ID, type="private"),
+        message=message,
+        callback_query=None,
+    )
+    return update, message
+
+
+async def seed(database, rows):
+    """Admin, `rows` groups the target belongs to, and `rows` users with open payments"""
+    now = datetime.utcnow()
+    async with database.session_scope() as session:
+        session.add(Admin(telegram_id=str(ADMIN_TELEGRAM_ID), username="admin"))
+        target = User(telegram_id="1000", username="target")
+        session.add(target)
+        await session.flush()
+        for i in range(rows):
+            group = Group(telegram_group_id=str(-100 - i), name=f"Grupo {i}")
+            session.add(group)
+            await session.flush()
+            session.add(GroupMembership(user_id=target.id, group_id=group.id))
+            session.add(Payment(user_id=target.id, amount=10, status="completed", created_at=now - timedelta(days=i)))
+
+            payer = User(telegram_id=str(2000 + i), username=f"payer{i}")
+            session.add(payer)
+            await session.flush()
+            session.add(Payment(user_id=payer.id, amount=10, payment_method="pix", status="pending", created_at=now))
+            session.add(Payment(
+                user_id=payer.id, amount=10, payment_method="usdt", status="waiting_proof",
+                created_at=now, proof_image_url=f"https://example.com/proof{i}.jpg",
+            ))
+        await session.commit()
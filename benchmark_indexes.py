@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark das consultas quentes antes e depois da migração de índices (7a283af742a0).
+
+Cria um banco SQLite com N usuários (padrão: 1.000.000), pagamentos, vínculos
+a grupos e advertências, aplica o downgrade() da migração para obter o
+esquema antigo, mede cada consulta e mostra o EXPLAIN QUERY PLAN, depois
+aplica o upgrade() e mede de novo.
+
+Uso:
+    python benchmark_indexes.py [--users 1000000] [--db /tmp/bench_indexes.db] [--repeat 20]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from models.base import Base
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), 'migrations', 'versions', '7a283af742a0_add_indexes_for_hot_lookup_columns.py'
+)
+GROUPS = 20
+NOW = datetime(2026, 10, 17, 12, 0, 0)
+
+# (name, SQL, parameter factory) - the access paths used by handlers and services
+QUERIES = [
+    ("user by username (/kick, /ban...)",
+     "SELECT id FROM users WHERE username = ?",
+     lambda n: (f"user{random.randrange(n)}",)),
+    ("expiry sweep (active, expired)",
+     "SELECT id FROM users WHERE status_assinatura = 'active' AND data_expiracao <= ? LIMIT 200",
+     lambda n: (NOW.isoformat(" "),)),
+    ("timed mutes (mute service)",
+     "SELECT id, mute_until FROM users WHERE is_muted = 1 AND mute_until IS NOT NULL",
+     lambda n: ()),
+    ("open payments (/pending)",
+     "SELECT id, user_id FROM payments WHERE status IN (?, ?) ORDER BY created_at",
+     lambda n: ("pending", "waiting_proof")),
+    ("pending PIX (reconciler)",
+     "SELECT id, pixgo_payment_id, created_at FROM payments WHERE status = 'pending' "
+     "AND payment_method = 'pix' AND created_at >= ? ORDER BY created_at DESC",
+     lambda n: ((NOW - timedelta(days=3)).isoformat(" "),)),
+    ("payments of a user (/userinfo)",
+     "SELECT id FROM payments WHERE user_id = ?",
+     lambda n: (random.randrange(1, n + 1),)),
+    ("membership pair (/add)",
+     "SELECT id FROM group_memberships WHERE user_id = ? AND group_id = ?",
+     lambda n: (random.randrange(1, n + 1), random.randrange(1, GROUPS + 1))),
+    ("members of a group",
+     "SELECT user_id FROM group_memberships WHERE group_id = ? LIMIT 100",
+     lambda n: (random.randrange(1, GROUPS + 1),)),
+    ("warnings of a user (/warn)",
+     "SELECT id FROM warnings WHERE user_id = ?",
+     lambda n: (random.randrange(1, n + 1),)),
+]
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("index_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_migration(engine, step):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            step()
+
+
+def seed(db_path, users):
+    """Fill the tables with a realistic distribution of rows"""
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(42)
+
+    def ts(days_back, days_ahead=0):
+        return (NOW + timedelta(seconds=rng.randint(-days_back * 86400, days_ahead * 86400))).isoformat(" ")
+
+    conn.execute("INSERT INTO admins (id, telegram_id, username, permissions) VALUES (1, '1', 'admin', 'super')")
+    conn.executemany(
+        "INSERT INTO groups (id, telegram_group_id, name) VALUES (?, ?, ?)",
+        [(g, str(-1000000000000 - g), f"Grupo {g}") for g in range(1, GROUPS + 1)],
+    )
+
+    def user_rows():
+        for i in range(users):
+            roll = rng.random()
+            status = "active" if roll < 0.6 else "expired" if roll < 0.85 else "inactive"
+            muted = rng.random() < 0.005
+            yield (
+                str(100000000 + i), f"user{i}", status, ts(60, 60), muted,
+                ts(0, 7) if muted else None, NOW.isoformat(" "),
+            )
+
+    conn.executemany(
+        "INSERT INTO users (telegram_id, username, status_assinatura, data_expiracao, is_muted, mute_until, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        user_rows(),
+    )
+
+    def payment_rows():
+        for i in range(users):
+            roll = rng.random()
+            status = "pending" if roll < 0.02 else "waiting_proof" if roll < 0.03 else "completed"
+            yield (rng.randint(1, users), f"pix_{i}", 10.0, status, "pix", ts(180))
+
+    conn.executemany(
+        "INSERT INTO payments (user_id, pixgo_payment_id, amount, status, payment_method, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        payment_rows(),
+    )
+    conn.executemany(
+        "INSERT INTO group_memberships (user_id, group_id) VALUES (?, ?)",
+        ((i, rng.randint(1, GROUPS)) for i in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO warnings (user_id, admin_id, reason) VALUES (?, 1, 'spam')",
+        ((rng.randint(1, users),) for _ in range(users // 10)),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def measure(db_path, users, repeat):
+    """Median latency (ms) and query plan of every benchmark query"""
+    conn = sqlite3.connect(db_path)
+    results = {}
+    for name, sql, params in QUERIES:
+        plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params(users)))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql, params(users)).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = (statistics.median(timings), plan)
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "bench_indexes.db"))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    migration = load_migration()
+
+    # Current schema minus this migration = the schema before it
+    Base.metadata.create_all(engine)
+    run_migration(engine, migration.downgrade)
+
+    print(f"🌱 Populando {args.users:,} usuários em {args.db}...")
+    start = time.perf_counter()
+    seed(args.db, args.users)
+    print(f"   concluído em {time.perf_counter() - start:.1f}s")
+
+    before = measure(args.db, args.users, args.repeat)
+
+    start = time.perf_counter()
+    run_migration(engine, migration.upgrade)
+    print(f"🔧 upgrade() aplicado em {time.perf_counter() - start:.1f}s")
+    with sqlite3.connect(args.db) as conn:
+        conn.execute("ANALYZE")
+
+    after = measure(args.db, args.users, args.repeat)
+    engine.dispose()
+
+    print()
+    print(f"{'Consulta':<34} {'Antes (ms)':>11} {'Depois (ms)':>12} {'Ganho':>8}")
+    for name, _, _ in QUERIES:
+        old_ms, _ = before[name]
+        new_ms, _ = after[name]
+        speedup = f"{old_ms / new_ms:.0f}x" if new_ms > 0 else "-"
+        print(f"{name:<34} {old_ms:>11.3f} {new_ms:>12.3f} {speedup:>8}")
+
+    print("\n📋 Planos de execução")
+    for name, _, _ in QUERIES:
+        print(f"\n{name}")
+        print(f"  antes:  {before[name][1]}")
+        print(f"  depois: {after[name][1]}")
+
+
+if __name__ == "__main__":
+    main()
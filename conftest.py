@@ -0,0 +1,25 @@
+"""
+Fixtures compartilhadas pelos testes.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from utils.query_profiler import QueryProfiler
+
+
+@pytest.fixture
+def query_budget_profiler():
+    """Strict QueryProfiler: a handler over its @query_budget raises QueryBudgetExceeded.
+
+    Tests attach it to their engine and run handlers through
+    ``profiler.wrap(...)``; engines are detached on teardown.
+    """
+    profiler = QueryProfiler(slow_threshold=0, strict=True)
+    yield profiler
+    profiler.detach()
@@ -0,0 +1,32 @@
+"""Add users.username_lower for case-insensitive lookups
+
+Revision ID: 12bed8ace16b
+Revises: 7a283af742a0
+Create Date: 2026-10-17 16:52:40.118275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '12bed8ace16b'
+down_revision: Union[str, Sequence[str], None] = '7a283af742a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('username_lower', sa.String(), nullable=True))
+    # Telegram usernames are ASCII, so SQL lower() matches str.lower() here
+    op.execute("UPDATE users SET username_lower = lower(username) WHERE username IS NOT NULL AND username <> ''")
+    op.create_index('ix_users_username_lower', 'users', ['username_lower'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_username_lower', table_name='users')
+    op.drop_column('users', 'username_lower')
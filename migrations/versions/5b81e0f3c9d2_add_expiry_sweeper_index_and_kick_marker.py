@@ -0,0 +1,30 @@
+"""Add expiry sweeper index and membership kick marker
+
+Revision ID: 5b81e0f3c9d2
+Revises: a4d2c8e91b37
+Create Date: 2026-10-17 10:41:07.532918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b81e0f3c9d2'
+down_revision: Union[str, Sequence[str], None] = 'a4d2c8e91b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_status_expiracao', 'users', ['status_assinatura', 'data_expiracao'], unique=False)
+    op.add_column('group_memberships', sa.Column('kick_started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('group_memberships', 'kick_started_at')
+    op.drop_index('ix_users_status_expiracao', table_name='users')
@@ -0,0 +1,30 @@
+"""Add users.blocked_bot_at and broadcast_jobs.blocked for DM campaigns
+
+Revision ID: 7a0c5e2d91f4
+Revises: 2c6d8b4e7f15
+Create Date: 2026-10-17 14:48:51.093372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a0c5e2d91f4'
+down_revision: Union[str, Sequence[str], None] = '2c6d8b4e7f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('blocked_bot_at', sa.DateTime(), nullable=True))
+    op.add_column('broadcast_jobs', sa.Column('blocked', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('broadcast_jobs', 'blocked')
+    op.drop_column('users', 'blocked_bot_at')
@@ -0,0 +1,53 @@
+"""Add indexes for hot lookup columns
+
+Revision ID: 7a283af742a0
+Revises: 7a0c5e2d91f4
+Create Date: 2026-10-17 16:05:22.418306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a283af742a0'
+down_revision: Union[str, Sequence[str], None] = '7a0c5e2d91f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_username', 'users', ['username'], unique=False)
+    op.create_index(
+        'ix_users_muted_until', 'users', ['mute_until'], unique=False,
+        sqlite_where=sa.text('is_muted = 1'),
+        postgresql_where=sa.text('is_muted'),
+    )
+    op.create_index('ix_payments_status_created_at', 'payments', ['status', 'created_at'], unique=False)
+    op.create_index('ix_payments_user_id_status', 'payments', ['user_id', 'status'], unique=False)
+    op.create_index('ix_warnings_user_id', 'warnings', ['user_id'], unique=False)
+    op.create_index('ix_group_memberships_group_id', 'group_memberships', ['group_id'], unique=False)
+
+    # Keep the oldest row of each duplicated (user_id, group_id) pair before adding the constraint
+    op.execute(
+        "DELETE FROM group_memberships WHERE id NOT IN "
+        "(SELECT MIN(id) FROM group_memberships GROUP BY user_id, group_id)"
+    )
+    with op.batch_alter_table('group_memberships') as batch_op:
+        batch_op.create_unique_constraint('uq_group_memberships_user_group', ['user_id', 'group_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('group_memberships') as batch_op:
+        batch_op.drop_constraint('uq_group_memberships_user_group', type_='unique')
+
+    op.drop_index('ix_group_memberships_group_id', table_name='group_memberships')
+    op.drop_index('ix_warnings_user_id', table_name='warnings')
+    op.drop_index('ix_payments_user_id_status', table_name='payments')
+    op.drop_index('ix_payments_status_created_at', table_name='payments')
+    op.drop_index('ix_users_muted_until', table_name='users')
+    op.drop_index('ix_users_username', table_name='users')
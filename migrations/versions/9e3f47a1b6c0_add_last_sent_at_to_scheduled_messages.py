@@ -0,0 +1,28 @@
+"""Add last_sent_at to scheduled_messages
+
+Revision ID: 9e3f47a1b6c0
+Revises: 5b81e0f3c9d2
+Create Date: 2026-10-17 12:05:33.270415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3f47a1b6c0'
+down_revision: Union[str, Sequence[str], None] = '5b81e0f3c9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scheduled_messages', sa.Column('last_sent_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scheduled_messages', 'last_sent_at')
@@ -0,0 +1,54 @@
+"""Add tombstones table and updated_at to the remaining tables for incremental backups
+
+Revision ID: b93e6f0a4c21
+Revises: e4b19c7d2a58
+Create Date: 2026-10-17 19:12:47.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93e6f0a4c21'
+down_revision: Union[str, Sequence[str], None] = 'e4b19c7d2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table -> column whose value seeds updated_at on existing rows
+UPDATED_AT_SOURCES = {
+    'group_memberships': 'joined_at',
+    'warnings': 'created_at',
+    'scheduled_messages': 'created_at',
+    'webhook_events': 'received_at',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('row_id', sa.String(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_deleted_at', 'tombstones', ['deleted_at'], unique=False)
+
+    for table, source in UPDATED_AT_SOURCES.items():
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = {source}")
+    op.create_index('ix_group_memberships_updated_at', 'group_memberships', ['updated_at'], unique=False)
+    op.create_index('ix_warnings_updated_at', 'warnings', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_warnings_updated_at', table_name='warnings')
+    op.drop_index('ix_group_memberships_updated_at', table_name='group_memberships')
+    for table in reversed(list(UPDATED_AT_SOURCES)):
+        op.drop_column(table, 'updated_at')
+    op.drop_index('ix_tombstones_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
@@ -0,0 +1,45 @@
+"""Add churn_events table recording lapsed subscriptions for the stats rollup
+
+Revision ID: d3a81f5c6b07
+Revises: b93e6f0a4c21
+Create Date: 2026-10-17 21:05:18.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a81f5c6b07'
+down_revision: Union[str, Sequence[str], None] = 'b93e6f0a4c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('churn_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('lapsed_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_churn_events_lapsed_at', 'churn_events', ['lapsed_at'], unique=False)
+    op.create_index('ix_churn_events_updated_at', 'churn_events', ['updated_at'], unique=False)
+
+    # Subscriptions expired so far become their churn events
+    op.execute(
+        "INSERT INTO churn_events (user_id, lapsed_at, updated_at) "
+        "SELECT id, data_expiracao, CURRENT_TIMESTAMP FROM users "
+        "WHERE status_assinatura = 'expired' AND data_expiracao IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_churn_events_updated_at', table_name='churn_events')
+    op.drop_index('ix_churn_events_lapsed_at', table_name='churn_events')
+    op.drop_table('churn_events')
@@ -0,0 +1,56 @@
+"""Add daily_stats rollup and rollup_watermarks tables
+
+Revision ID: e4b19c7d2a58
+Revises: 12bed8ace16b
+Create Date: 2026-10-17 17:41:05.382916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b19c7d2a58'
+down_revision: Union[str, Sequence[str], None] = '12bed8ace16b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('revenue_total', sa.Float(), nullable=False),
+    sa.Column('revenue_pix', sa.Float(), nullable=False),
+    sa.Column('revenue_usdt', sa.Float(), nullable=False),
+    sa.Column('payments_completed', sa.Integer(), nullable=False),
+    sa.Column('payments_pix', sa.Integer(), nullable=False),
+    sa.Column('payments_usdt', sa.Integer(), nullable=False),
+    sa.Column('new_users', sa.Integer(), nullable=False),
+    sa.Column('new_subscribers', sa.Integer(), nullable=False),
+    sa.Column('churned', sa.Integer(), nullable=False),
+    sa.Column('active_subscribers', sa.Integer(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('watermark', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_payments_status_completed_at', 'payments', ['status', 'completed_at'], unique=False)
+    op.create_index('ix_payments_updated_at', 'payments', ['updated_at'], unique=False)
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_updated_at', table_name='users')
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_payments_updated_at', table_name='payments')
+    op.drop_index('ix_payments_status_completed_at', table_name='payments')
+    op.drop_table('rollup_watermarks')
+    op.drop_table('daily_stats')
@@ -1,10 +1,18 @@
+import asyncio
 import json
 import logging
+import os
+import tempfile
 import traceback
-from datetime import datetime, timedelta, timezone
-
-from sqlalchemy.orm import Session
-from telegram import Update
+import urllib.request
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, delete, func, or_, select, update as sql_update
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 from telegram import Message
 
@@ -15,18 +23,88 @@ from models.user import User
 from models.warning import Warning
 from models.system_config import SystemConfig
 from models.scheduled_message import ScheduledMessage
+from models.broadcast_job import BroadcastJob
+from models.churn_event import ChurnEvent
+from models.daily_stats import DailyStats
 from services.telegram_service import TelegramService
 from services.logging_service import LoggingService
+from services.mute_service import MuteService
+from services.message_scheduler import MessageScheduler
+from services.broadcast_service import DM_AUDIENCES, BroadcastService
+from services.admin_cache import AdminCache, admin_required
+from services.backup_service import EXTENSIONS as BACKUP_COMPRESSIONS, BackupService
+from services.restore_service import BackupFormatError, RestoreResult, RestoreService, inspect_backup
+from services.settings_service import (
+    RULES_MESSAGE,
+    SUBSCRIPTION_DAYS,
+    SUBSCRIPTION_PRICE,
+    USDT_WALLET_ADDRESS,
+    WELCOME_MESSAGE,
+    SettingsService,
+)
+from services.subscription_service import SubscriptionService
+from services.user_resolver import UserResolver
+from utils.database import Database
+from utils.query_profiler import query_budget
 
 logger = logging.getLogger(__name__)
 
+# Rows per page of /pending resumo (users), the /pending review queue (payments) and /userinfo (recent payments)
+PENDING_PAGE_SIZE = 10
+REVIEW_PAGE_SIZE = 5
+USERINFO_PAGE_SIZE = 5
+STATS_DEFAULT_DAYS = 7  # /stats time-series window
+STATS_MAX_DAYS = 31
+
+# Payments awaiting settlement or admin review
+OPEN_PAYMENT_STATUSES = ("pending", "waiting_proof")
+
+# Files /restore accepts: streaming backups plus the legacy single-document JSON
+BACKUP_EXTENSIONS = (*BACKUP_COMPRESSIONS.values(), ".json")
+
 
 class AdminHandlers:
 
-    def __init__(self, db: Session, telegram_service: TelegramService, logging_service: LoggingService):
-        self.db = db
+    def __init__(
+        self,
+        database: Database,
+        telegram_service: TelegramService,
+        logging_service: LoggingService,
+        mute_service: Optional[MuteService] = None,
+        message_scheduler: Optional[MessageScheduler] = None,
+        broadcaster: Optional[BroadcastService] = None,
+        admin_cache: Optional[AdminCache] = None,
+        settings: Optional[SettingsService] = None,
+        resolver: Optional[UserResolver] = None,
+        backups: Optional[BackupService] = None,
+        restorer: Optional[RestoreService] = None,
+        subscriptions: Optional[SubscriptionService] = None,
+    ):
+        self.database = database
         self.telegram = telegram_service
         self.logging = logging_service
+        self.mute = mute_service
+        self.scheduler = message_scheduler
+        self.broadcaster = broadcaster
+        self.admins = admin_cache or AdminCache(database)
+        self.settings = settings or SettingsService(database)
+        self.resolver = resolver or UserResolver(database)
+        self.backups = backups or BackupService(database)
+        self.restorer = restorer or RestoreService(database)
+        self.subscriptions = subscriptions or SubscriptionService(settings=self.settings)
+
+    @property
+    def db(self) -> AsyncSession:
+        """Session scoped to the update being handled"""
+        return self.database.session
+
+    @staticmethod
+    def _parse_page(args) -> int:
+        """1-based page number from the first argument (defaults to 1)"""
+        try:
+            return max(1, int(args[0]))
+        except (IndexError, TypeError, ValueError):
+            return 1
 
     async def add_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /add command"""
@@ -38,8 +116,8 @@ class AdminHandlers:
             return
 
         # Check if user is admin or if this is the first admin setup
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        total_admins = self.db.query(Admin).count()
+        admin = await self.admins.get(user.id)
+        total_admins = await self.admins.count()
 
         # Allow bootstrap: if no admins exist, anyone can become the first admin
         if not admin and total_admins > 0:
@@ -58,7 +136,8 @@ class AdminHandlers:
                 permissions="super"
             )
             self.db.add(new_admin)
-            self.db.commit()
+            await self.db.commit()
+            self.admins.invalidate()
             admin = new_admin
 
         # FR-004: Restrict admin commands to private chat only
@@ -66,25 +145,27 @@ class AdminHandlers:
             await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
             return
 
-        # Parse username and group_id from args
+        # Resolve the target (@username, Telegram id or reply) and group_id from args
+        target = await self.resolver.resolve(message, context.args)
         if total_admins == 0:
             # First admin setup - allow self-registration
-            if not context.args or len(context.args) < 1:
+            if not target:
                 username = user.username
+                db_user = await self.resolver.by_telegram_id(user.id)
                 group_telegram_id = None  # Will be set later or not required for first admin
             else:
-                username = context.args[0].lstrip("@")
-                group_telegram_id = context.args[1] if len(context.args) > 1 else None
+                username = target.name
+                db_user = target.user
+                group_telegram_id = target.args[0] if target.args else None
         else:
             # Normal admin operation
-            if not context.args or len(context.args) < 2:
+            if not target or not target.args:
                 await message.reply_text("Uso: /add @username <group_telegram_id>")
                 return
-            username = context.args[0].lstrip("@")
-            group_telegram_id = context.args[1]
+            username = target.name
+            db_user = target.user
+            group_telegram_id = target.args[0]
 
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
         if not db_user:
             # Cannot create user without telegram_id
             await message.reply_text(f"❌ Usuário @{username} não encontrado no banco de dados.\n\n"
@@ -107,19 +188,19 @@ class AdminHandlers:
             return
 
         # Find or create group
-        group = self.db.query(Group).filter_by(telegram_group_id=group_telegram_id).first()
+        group = await self.db.scalar(select(Group).filter_by(telegram_group_id=group_telegram_id))
         if not group:
             group = Group(
                 telegram_group_id=group_telegram_id,
                 name=f"Grupo VIP {group_telegram_id}"
             )
             self.db.add(group)
-            self.db.commit()
+            await self.db.commit()
 
         # Check if already member
-        membership = self.db.query(GroupMembership).filter_by(
+        membership = await self.db.scalar(select(GroupMembership).filter_by(
             user_id=db_user.id, group_id=group.id
-        ).first()
+        ))
         if membership:
             await message.reply_text(f"Usuário @{username} já é membro deste grupo.")
             return
@@ -127,7 +208,7 @@ class AdminHandlers:
         # Add membership
         membership = GroupMembership(user_id=db_user.id, group_id=group.id)
         self.db.add(membership)
-        self.db.commit()
+        await self.db.commit()
 
         # Admit user to group (send invite link)
         invite_link = await self.telegram.create_chat_invite_link(
@@ -160,7 +241,7 @@ class AdminHandlers:
             return
 
         # Check if user is admin (no bootstrap for addadmin - only existing admins can add new admins)
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
+        admin = await self.admins.get(user.id)
         if not admin:
             await message.reply_text("Acesso negado. Você não é um administrador.")
             return
@@ -170,15 +251,14 @@ class AdminHandlers:
             await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
             return
 
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /addadmin @username")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /addadmin @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        username = context.args[0].lstrip("@")
-
-        # Find user by username - must exist and have telegram_id
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. O usuário deve interagir com o bot primeiro.")
             return
@@ -188,7 +268,7 @@ class AdminHandlers:
             return
 
         # Check if user is already an admin
-        existing_admin = self.db.query(Admin).filter_by(telegram_id=db_user.telegram_id).first()
+        existing_admin = await self.admins.get(db_user.telegram_id)
         if existing_admin:
             await message.reply_text(f"Usuário @{username} já é um administrador.")
             return
@@ -202,7 +282,8 @@ class AdminHandlers:
             permissions="basic"  # Default permissions for new admins
         )
         self.db.add(new_admin)
-        self.db.commit()
+        await self.db.commit()
+        self.admins.invalidate()
 
         await message.reply_text(f"✅ Administrador @{username} adicionado com sucesso!\n\n"
                                f"🎯 Permissões: {new_admin.permissions}\n"
@@ -224,7 +305,7 @@ class AdminHandlers:
                 return
 
             # Check if user is admin
-            admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
+            admin = await self.admins.get(user.id)
             logger.info(f"Admin check for user {user.id}: {'Found' if admin else 'Not found'}")
             
             if not admin:
@@ -252,7 +333,7 @@ class AdminHandlers:
             logger.info(f"Attempting to register group: {group_telegram_id}")
 
             # Check if group already exists
-            existing_group = self.db.query(Group).filter_by(telegram_group_id=group_telegram_id).first()
+            existing_group = await self.db.scalar(select(Group).filter_by(telegram_group_id=group_telegram_id))
             if existing_group:
                 logger.info(f"Group {group_telegram_id} already exists")
                 try:
@@ -268,7 +349,7 @@ class AdminHandlers:
                 name=f"Grupo VIP {group_telegram_id}"
             )
             self.db.add(group)
-            self.db.commit()
+            await self.db.commit()
             logger.info(f"Group {group_telegram_id} registered successfully")
 
             try:
@@ -320,56 +401,42 @@ class AdminHandlers:
             except:
                 pass
 
+    @admin_required
     async def kick_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /kick command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /kick @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /kick @username")
-            return
-
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado.")
             return
 
         # Find group
-        group = self.db.query(Group).filter_by(telegram_group_id=str(chat.id)).first()
+        group = await self.db.scalar(select(Group).filter_by(telegram_group_id=str(chat.id)))
         if not group:
             await message.reply_text("Este grupo não está registrado como grupo VIP.")
             return
 
         # Check if user is member of this group
-        membership = self.db.query(GroupMembership).filter_by(
+        membership = await self.db.scalar(select(GroupMembership).filter_by(
             user_id=db_user.id, group_id=group.id
-        ).first()
+        ))
         if not membership:
             await message.reply_text(f"Usuário @{username} não é membro deste grupo.")
             return
 
         # Remove membership from database
-        self.db.delete(membership)
-        self.db.commit()
+        await self.db.delete(membership)
+        await self.db.commit()
 
         # Kick user from Telegram group
         kicked = await self.telegram.kick_chat_member(
@@ -381,35 +448,22 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Usuário @{username} removido do banco de dados, mas falha ao remover do grupo Telegram.")
 
+    @query_budget(6)
+    @admin_required
     async def ban_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /ban command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /ban @username")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /ban @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado.")
             return
@@ -422,56 +476,43 @@ class AdminHandlers:
         # Ban the user
         db_user.is_banned = True
 
-        # Remove user from all groups
-        memberships = self.db.query(GroupMembership).filter_by(user_id=db_user.id).all()
-        for membership in memberships:
-            self.db.delete(membership)
+        # Remove user from all groups: their chat ids in one joined query, then one bulk delete
+        groups = (await self.db.execute(
+            select(GroupMembership.group_id, Group.telegram_group_id)
+            .join(Group, Group.id == GroupMembership.group_id)
+            .filter(GroupMembership.user_id == db_user.id)
+        )).all()
+        await self.db.execute(delete(GroupMembership).filter_by(user_id=db_user.id))
 
+        for group_id, telegram_group_id in groups:
             # Try to kick from Telegram group
             try:
-                # Get group info to kick user
-                group = self.db.query(Group).filter_by(id=membership.group_id).first()
-                if group:
-                    await self.telegram.kick_chat_member(
-                        int(group.telegram_group_id), int(db_user.telegram_id)
-                    )
+                await self.telegram.kick_chat_member(
+                    int(telegram_group_id), int(db_user.telegram_id)
+                )
             except Exception as e:
-                logger.warning(f"Failed to kick user {db_user.telegram_id} from group {membership.group_id}: {e}")
+                logger.warning(f"Failed to kick user {db_user.telegram_id} from group {group_id}: {e}")
 
         # Commit changes
-        self.db.commit()
+        await self.db.commit()
 
         await message.reply_text(f"Usuário @{username} banido permanentemente.")
 
+    @admin_required
     async def unban_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /unban command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /unban @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /unban @username")
-            return
-
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado.")
             return
@@ -485,39 +526,25 @@ class AdminHandlers:
         db_user.is_banned = False
 
         # Commit changes
-        self.db.commit()
+        await self.db.commit()
 
         await message.reply_text(f"Usuário @{username} desbanido com sucesso.")
 
+    @admin_required
     async def unmute_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /unmute command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /unmute @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /unmute @username")
-            return
-
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado.")
             return
@@ -532,40 +559,35 @@ class AdminHandlers:
         db_user.mute_until = None
 
         # Commit changes
-        self.db.commit()
+        await self.db.commit()
+
+        # Drop the pending deadline and lift the Telegram restriction now
+        if self.mute:
+            self.mute.cancel(db_user.id)
+            if db_user.telegram_id:
+                await self.mute.lift(db_user.id, int(db_user.telegram_id))
 
         await message.reply_text(f"Usuário @{username} desmutado com sucesso.")
 
+    @admin_required
     async def mute_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /mute command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
+        # Resolve the target (@username, Telegram id or reply) and optional duration
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /mute @username [tempo em minutos] (ou respondendo a uma mensagem do usuário)")
             return
 
-        # Parse username and optional duration from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /mute @username [tempo em minutos]")
-            return
-
-        username = context.args[0].lstrip("@")
+        username = target.name
+        db_user = target.user
         duration_minutes = None
-        if len(context.args) > 1:
+        if target.args:
             try:
-                duration_minutes = int(context.args[1])
+                duration_minutes = int(target.args[0])
                 if duration_minutes <= 0:
                     await message.reply_text("Duração deve ser um número positivo em minutos.")
                     return
@@ -573,8 +595,6 @@ class AdminHandlers:
                 await message.reply_text("Duração deve ser um número válido em minutos.")
                 return
 
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. Certifique-se de que o usuário iniciou uma conversa com o bot.")
             return
@@ -587,11 +607,17 @@ class AdminHandlers:
         # Mute the user
         db_user.is_muted = True
         if duration_minutes:
-            db_user.mute_until = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
+            db_user.mute_until = datetime.utcnow() + timedelta(minutes=duration_minutes)
         else:
             db_user.mute_until = None  # Permanent mute
 
-        self.db.commit()
+        await self.db.commit()
+
+        # Restrict in the groups and arm the unmute deadline
+        if self.mute:
+            self.mute.schedule(db_user.id, db_user.mute_until)
+            if db_user.telegram_id:
+                await self.mute.restrict(db_user.id, int(db_user.telegram_id), db_user.mute_until)
 
         # Notify user
         if duration_minutes:
@@ -613,36 +639,24 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Usuário @{username} mutado, mas falha ao notificar.")
 
+    @admin_required
     async def warn_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /warn command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
+        admin = self.admins.lookup(user.id)
 
-        if not user or not message or not chat:
+        # Resolve the target (@username, Telegram id or reply) and reason
+        target = await self.resolver.resolve(message, context.args)
+        if not target or not target.args:
+            await message.reply_text("Uso: /warn @username <motivo> (ou respondendo a uma mensagem do usuário)")
             return
 
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
+        username = target.name
+        db_user = target.user
+        reason = " ".join(target.args)
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username and reason from args
-        if not context.args or len(context.args) < 2:
-            await message.reply_text("Uso: /warn @username <motivo>")
-            return
-
-        username = context.args[0].lstrip("@")
-        reason = " ".join(context.args[1:])
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. Certifique-se de que o usuário iniciou uma conversa com o bot.")
             return
@@ -657,7 +671,7 @@ class AdminHandlers:
 
         # Update user's warning count
         db_user.warn_count += 1
-        self.db.commit()
+        await self.db.commit()
 
         # Notify user
         success = await self.telegram.send_message(
@@ -670,45 +684,31 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Aviso registrado para @{username}, mas falha ao notificar o usuário.")
 
+    @admin_required
     async def resetwarn_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /resetwarn command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /resetwarn @username")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /resetwarn @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. Certifique-se de que o usuário iniciou uma conversa com o bot.")
             return
 
         # Delete all warnings for this user
-        deleted_count = self.db.query(Warning).filter_by(user_id=db_user.id).delete()
+        deleted_count = (await self.db.execute(delete(Warning).filter_by(user_id=db_user.id))).rowcount
 
         # Reset warning count
         db_user.warn_count = 0
-        self.db.commit()
+        await self.db.commit()
 
         # Notify user
         success = await self.telegram.send_message(
@@ -721,35 +721,21 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Avisos de @{username} resetados, mas falha ao notificar o usuário.")
 
+    @admin_required
     async def expire_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /expire command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /expire @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /expire @username")
-            return
-
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. Certifique-se de que o usuário iniciou uma conversa com o bot.")
             return
@@ -761,8 +747,9 @@ class AdminHandlers:
 
         # Expire the subscription immediately
         db_user.status_assinatura = "expired"
-        db_user.data_expiracao = datetime.now(timezone.utc)
-        self.db.commit()
+        db_user.data_expiracao = datetime.utcnow()
+        self.db.add(ChurnEvent(user_id=db_user.id, lapsed_at=db_user.data_expiracao))
+        await self.db.commit()
 
         # Notify user
         success = await self.telegram.send_message(
@@ -775,36 +762,23 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Assinatura de @{username} expirada, mas falha ao notificar o usuário.")
 
+    @admin_required
     async def sendto_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /sendto command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username and message from args
-        if not context.args or len(context.args) < 2:
-            await message.reply_text("Uso: /sendto @username <mensagem>")
+        # Resolve the target (@username, Telegram id or reply) and message
+        target = await self.resolver.resolve(message, context.args)
+        if not target or not target.args:
+            await message.reply_text("Uso: /sendto @username <mensagem> (ou respondendo a uma mensagem do usuário)")
             return
 
-        username = context.args[0].lstrip("@")
-        private_message = " ".join(context.args[1:])
+        username = target.name
+        db_user = target.user
+        private_message = " ".join(target.args)
 
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado. Certifique-se de que o usuário iniciou uma conversa com o bot.")
             return
@@ -820,35 +794,22 @@ class AdminHandlers:
         else:
             await message.reply_text(f"Falha ao enviar mensagem para @{username}.")
 
+    @query_budget(3)
+    @admin_required
     async def userinfo_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /userinfo command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
+        # Resolve the target: @username, Telegram id or a reply to one of the user's messages
+        target = await self.resolver.resolve(message, context.args)
+        if not target:
+            await message.reply_text("Uso: /userinfo @username (ou ID, ou respondendo a uma mensagem do usuário)")
             return
 
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
-        # Parse username from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /userinfo @username")
-            return
-
-        username = context.args[0].lstrip("@")
-
-        # Find user by username
-        db_user = self.db.query(User).filter_by(username=username).first()
+        username = target.name
+        db_user = target.user
         if not db_user:
             await message.reply_text(f"Usuário @{username} não encontrado.")
             return
@@ -862,11 +823,25 @@ class AdminHandlers:
         warn_count = db_user.warn_count
         auto_renew = "Sim" if db_user.auto_renew else "Não"
 
-        # Get payment info
-        payments = self.db.query(Payment).filter_by(user_id=db_user.id).all()
-        total_payments = len(payments)
-        completed_payments = len([p for p in payments if p.status == "completed"])
-        pending_payments = len([p for p in payments if p.status == "pending"])
+        # Payment totals per status, aggregated in the database
+        by_status = dict((await self.db.execute(
+            select(Payment.status, func.count())
+            .filter(Payment.user_id == db_user.id)
+            .group_by(Payment.status)
+        )).all())
+        total_payments = sum(by_status.values())
+        completed_payments = by_status.get("completed", 0)
+        pending_payments = by_status.get("pending", 0)
+
+        # One page of the most recent payments: /userinfo @username [página]
+        page = self._parse_page(target.args)
+        recent_payments = (await self.db.execute(
+            select(Payment.id, Payment.amount, Payment.payment_method, Payment.status, Payment.created_at)
+            .filter(Payment.user_id == db_user.id)
+            .order_by(Payment.created_at.desc(), Payment.id.desc())
+            .limit(USERINFO_PAGE_SIZE)
+            .offset((page - 1) * USERINFO_PAGE_SIZE)
+        )).all()
 
         info_text = f"""
 👤 **Informações do Usuário: @{db_user.username}**
@@ -889,64 +864,74 @@ class AdminHandlers:
    • Pendentes: {pending_payments}
 """
 
+        if recent_payments:
+            pages = (total_payments + USERINFO_PAGE_SIZE - 1) // USERINFO_PAGE_SIZE
+            info_text += f"\n🧾 **Últimos pagamentos (página {page}/{pages}):**\n"
+            for payment_id, amount, method, payment_status, created_at in recent_payments:
+                created = created_at.strftime("%d/%m/%Y") if created_at else "N/A"
+                info_text += f"   • #{payment_id} R$ {amount:.2f} {method} - {payment_status} ({created})\n"
+
         await message.reply_text(info_text, parse_mode="Markdown")
 
+    @query_budget(2)
+    @admin_required
     async def pending_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /pending command"""
+        """Handle /pending command - review queue (/pending resumo [página] for the per-user summary)"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
+        if context.args and context.args[0].lower() == "resumo":
+            await self._pending_summary(message, context.args[1:])
             return
 
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        await self._send_review_page(context.bot, chat.id)
 
-        # Get all pending payments (including waiting_proof)
-        pending_payments = self.db.query(Payment).filter(
-            Payment.status.in_(["pending", "waiting_proof"])
-        ).all()
+    async def _pending_summary(self, message: Message, args):
+        """Per-user totals of the open payments, one page of users at a time"""
+        # Totals for the header and page count
+        user_count, total_amount = (await self.db.execute(
+            select(func.count(func.distinct(Payment.user_id)), func.coalesce(func.sum(Payment.amount), 0))
+            .filter(Payment.status.in_(OPEN_PAYMENT_STATUSES))
+        )).one()
 
-        if not pending_payments:
+        if not user_count:
             await message.reply_text("✅ Não há pagamentos pendentes.")
             return
 
-        # Group by user
-        user_payments = {}
-        for payment in pending_payments:
-            user_id = payment.user_id
-            if user_id not in user_payments:
-                user_payments[user_id] = []
-            user_payments[user_id].append(payment)
-
-        # Build response
-        response_lines = ["📋 **Pagamentos Pendentes:**\n"]
+        pages = (user_count + PENDING_PAGE_SIZE - 1) // PENDING_PAGE_SIZE
+        page = min(self._parse_page(args), pages)
 
-        for user_id, payments in user_payments.items():
-            db_user = self.db.query(User).filter_by(id=user_id).first()
-            if not db_user:
-                continue
+        # One row per user with per-method/status counts, oldest pending first
+        rows = (await self.db.execute(
+            select(
+                User.username,
+                User.telegram_id,
+                func.count(Payment.id),
+                func.sum(Payment.amount),
+                func.sum(case((Payment.payment_method == "pix", 1), else_=0)),
+                func.sum(case((and_(Payment.payment_method == "usdt", Payment.status == "pending"), 1), else_=0)),
+                func.sum(case((and_(Payment.payment_method == "usdt", Payment.status == "waiting_proof"), 1), else_=0)),
+            )
+            .join(User, User.id == Payment.user_id)
+            .filter(Payment.status.in_(OPEN_PAYMENT_STATUSES))
+            .group_by(User.id, User.username, User.telegram_id)
+            .order_by(func.min(Payment.created_at), User.id)
+            .limit(PENDING_PAGE_SIZE)
+            .offset((page - 1) * PENDING_PAGE_SIZE)
+        )).all()
 
-            username = f"@{db_user.username}" if db_user.username else f"ID: {db_user.telegram_id}"
-            total_amount = sum(p.amount for p in payments)
-            payment_count = len(payments)
+        # Build response
+        response_lines = [
+            f"📋 **Pagamentos Pendentes** (página {page}/{pages})\n",
+            f"👥 Usuários: {user_count} | 💰 Total: R$ {total_amount:.2f}\n",
+        ]
 
-            # Count different payment types
-            pix_count = len([p for p in payments if p.payment_method == "pix"])
-            usdt_pending_count = len([p for p in payments if p.payment_method == "usdt" and p.status == "pending"])
-            usdt_proof_count = len([p for p in payments if p.payment_method == "usdt" and p.status == "waiting_proof"])
+        for username, telegram_id, payment_count, user_amount, pix_count, usdt_pending_count, usdt_proof_count in rows:
+            label = f"@{username}" if username else f"ID: {telegram_id}"
 
-            response_lines.append(f"👤 **{username}**")
-            response_lines.append(f"   💰 Total pendente: R$ {total_amount:.2f}")
+            response_lines.append(f"👤 **{label}**")
+            response_lines.append(f"   💰 Total pendente: R$ {user_amount:.2f}")
             response_lines.append(f"   📊 Pagamentos: {payment_count}")
             if pix_count > 0:
                 response_lines.append(f"   💳 PIX: {pix_count} (automático)")
@@ -956,17 +941,150 @@ class AdminHandlers:
                 response_lines.append(f"   📸 USDT c/ comprovante: {usdt_proof_count}")
             response_lines.append("")
 
-        response_text = "\n".join(response_lines)
+        if page < pages:
+            response_lines.append(f"➡️ Próxima página: /pending resumo {page + 1}")
 
-        # Telegram has message length limits, so if too long, split or summarize
-        if len(response_text) > 4000:
-            # Count users instead
-            user_count = len(user_payments)
-            total_amount = sum(sum(p.amount for p in payments) for payments in user_payments.values())
-            response_text = f"📋 **Pagamentos Pendentes:**\n\n👥 Usuários com pagamentos pendentes: {user_count}\n💰 Valor total pendente: R$ {total_amount:.2f}"
+        response_text = "\n".join(response_lines)
 
         await message.reply_text(response_text, parse_mode="Markdown")
 
+    async def _send_review_page(self, bot, chat_id: int, direction: str = "next", cursor: Optional[int] = None):
+        """
+        Send one page of the review queue: a card per open payment, then a navigation message.
+
+        Pages are keyset-paginated on (created_at, id), oldest first: only the
+        requested page (plus one row to detect a further page) is loaded.
+        """
+        total = await self.db.scalar(
+            select(func.count()).select_from(Payment).filter(Payment.status.in_(OPEN_PAYMENT_STATUSES))
+        )
+
+        query = (
+            select(
+                Payment.id, Payment.amount, Payment.payment_method, Payment.status,
+                Payment.created_at, Payment.proof_image_url, User.username, User.telegram_id,
+            )
+            .join(User, User.id == Payment.user_id)
+            .filter(Payment.status.in_(OPEN_PAYMENT_STATUSES))
+        )
+        anchor = None
+        if cursor is not None:
+            anchor = await self.db.scalar(select(Payment.created_at).filter_by(id=cursor))
+        if anchor is None:
+            direction, cursor = "next", None
+
+        if direction == "prev":
+            query = query.filter(or_(
+                Payment.created_at < anchor,
+                and_(Payment.created_at == anchor, Payment.id < cursor),
+            )).order_by(Payment.created_at.desc(), Payment.id.desc())
+        else:
+            if cursor is not None:
+                query = query.filter(or_(
+                    Payment.created_at > anchor,
+                    and_(Payment.created_at == anchor, Payment.id > cursor),
+                ))
+            query = query.order_by(Payment.created_at, Payment.id)
+
+        rows = (await self.db.execute(query.limit(REVIEW_PAGE_SIZE + 1))).all()
+        more = len(rows) > REVIEW_PAGE_SIZE
+        rows = rows[:REVIEW_PAGE_SIZE]
+        if direction == "prev":
+            rows.reverse()
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = cursor is not None, more
+
+        if not total:
+            await bot.send_message(chat_id=chat_id, text="✅ Não há pagamentos pendentes.")
+            return
+
+        for row in rows:
+            await self._send_review_card(bot, chat_id, row)
+
+        nav = []
+        if rows and has_prev:
+            nav.append(InlineKeyboardButton("⬅️ Anteriores", callback_data=f"pq:prev:{rows[0].id}"))
+        if rows and has_next:
+            nav.append(InlineKeyboardButton("Próximos ➡️", callback_data=f"pq:next:{rows[-1].id}"))
+        text = f"📋 Fila de revisão: {total} pagamento(s) pendente(s)"
+        if not rows:
+            text += "\n\nFim da fila."
+        await bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            reply_markup=InlineKeyboardMarkup([nav]) if nav else None,
+        )
+
+    async def _send_review_card(self, bot, chat_id: int, row):
+        """One payment of the review queue with its proof thumbnail and Approve/Reject buttons"""
+        label = f"@{row.username}" if row.username else f"ID: {row.telegram_id}"
+        status = "📸 Comprovante enviado" if row.status == "waiting_proof" else "⏳ Aguardando pagamento"
+        created = row.created_at.strftime("%d/%m/%Y %H:%M") if row.created_at else "N/A"
+        caption = (
+            f"🧾 Pagamento #{row.id}\n"
+            f"👤 {label}\n"
+            f"💰 R$ {row.amount:.2f} ({(row.payment_method or 'pix').upper()})\n"
+            f"{status}\n"
+            f"📅 {created}"
+        )
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Aprovar", callback_data=f"pq:ok:{row.id}"),
+            InlineKeyboardButton("❌ Rejeitar", callback_data=f"pq:no:{row.id}"),
+        ]])
+
+        if row.proof_image_url:
+            try:
+                await bot.send_photo(chat_id=chat_id, photo=row.proof_image_url, caption=caption, reply_markup=keyboard)
+                return
+            except TelegramError as e:
+                logger.warning(f"Failed to send proof of payment {row.id}: {e}")
+                caption += "\n⚠️ Comprovante indisponível"
+        await bot.send_message(chat_id=chat_id, text=caption, reply_markup=keyboard)
+
+    @admin_required
+    async def review_callback_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle the Approve/Reject and navigation buttons of the /pending review queue"""
+        query = update.callback_query
+
+        try:
+            _, action, value = query.data.split(":")
+            value = int(value)
+        except ValueError:
+            await query.answer()
+            return
+
+        if action in ("next", "prev"):
+            await query.answer()
+            try:
+                # The old navigation message stays as plain text
+                await query.edit_message_reply_markup(reply_markup=None)
+            except TelegramError as e:
+                logger.debug(f"Failed to clear review navigation: {e}")
+            await self._send_review_page(context.bot, query.message.chat_id, action, value)
+            return
+
+        if action == "ok":
+            result = await self._approve_payment(value, context.bot)
+        elif action == "no":
+            result = await self._reject_payment(value, context.bot)
+        else:
+            await query.answer()
+            return
+        await query.answer(result)
+
+        # Stamp the outcome on the card and drop its buttons
+        card = query.message
+        text = f"{card.caption or card.text or ''}\n\n{result}"
+        try:
+            if card.photo:
+                await query.edit_message_caption(caption=text, reply_markup=None)
+            else:
+                await query.edit_message_text(text=text, reply_markup=None)
+        except TelegramError as e:
+            logger.warning(f"Failed to update review card of payment {value}: {e}")
+
+    @admin_required
     async def broadcast_handler(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -974,37 +1092,58 @@ class AdminHandlers:
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
+        admin = self.admins.lookup(user.id)
 
-        if not user or not message or not chat:
-            return
+        usage = ("Uso: /broadcast <mensagem>\n"
+                 "Mensagem privada: /broadcast --dm active|expired|all <mensagem>")
 
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
+        # Parse target and message from args
+        if not context.args or len(context.args) < 1:
+            await message.reply_text(usage)
             return
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        target = "groups"
+        args = context.args
+        if args[0] == "--dm":
+            if len(args) < 3 or args[1] not in DM_AUDIENCES:
+                await message.reply_text(usage)
+                return
+            if not self.broadcaster:
+                await message.reply_text("❌ Envio por mensagem privada indisponível no momento.")
+                return
+            target = f"dm:{args[1]}"
+            args = args[2:]
 
-        # Parse message from args
-        if not context.args or len(context.args) < 1:
-            await message.reply_text("Uso: /broadcast <mensagem>")
+        broadcast_message = " ".join(args)
+
+        if not self.broadcaster:
+            # No background engine configured: send inline
+            await self._broadcast_to_all_members(broadcast_message)
+            await message.reply_text("Mensagem enviada para todos os membros!")
             return
 
-        broadcast_message = " ".join(context.args)
+        # Persist the job and hand it to the background engine; the reply below
+        # is edited with live counts while it runs. The job is committed before
+        # the reply so no write transaction stays open across the Bot API call.
+        job = BroadcastJob(message=broadcast_message, target=target, created_by=admin.id)
+        self.db.add(job)
+        await self.db.commit()
 
-        # Send broadcast to all members
-        await self._broadcast_to_all_members(broadcast_message)
+        try:
+            progress = await message.reply_text(f"📢 Broadcast #{job.id} agendado. Aguarde...")
+        except TelegramError as e:
+            logger.warning(f"Failed to send progress message of broadcast {job.id}: {e}")
+        else:
+            job.progress_chat_id = str(chat.id)
+            job.progress_message_id = progress.message_id
+            await self.db.commit()
 
-        await message.reply_text("Mensagem enviada para todos os membros!")
+        self.broadcaster.submit(job.id)
 
     async def _broadcast_to_all_members(self, message: str):
         """Send message to all groups"""
         # Get all groups
-        groups = self.db.query(Group).all()
+        groups = (await self.db.scalars(select(Group))).all()
         logger.info(f"Broadcasting to {len(groups)} groups: {[g.telegram_group_id for g in groups]}")
 
         for group in groups:
@@ -1020,25 +1159,13 @@ class AdminHandlers:
                 logger.error(f"Failed to send broadcast to group {group.telegram_group_id}: {e}")
                 # Continue with other groups even if one fails
 
+    @admin_required
     async def setprice_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setprice command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        admin = self.admins.lookup(user.id)
 
         # Parse price and currency from args
         if not context.args or len(context.args) < 2:
@@ -1065,44 +1192,20 @@ class AdminHandlers:
             return
 
         # Update or create system config
-        config_key = "subscription_price"
+        config_key = SUBSCRIPTION_PRICE
         config_value = f"{price:.2f} {currency}"
 
-        existing_config = self.db.query(SystemConfig).filter_by(key=config_key).first()
-        if existing_config:
-            existing_config.value = config_value
-            existing_config.updated_by = admin.id
-        else:
-            new_config = SystemConfig(
-                key=config_key,
-                value=config_value,
-                updated_by=admin.id
-            )
-            self.db.add(new_config)
-
-        self.db.commit()
+        await self.settings.set(config_key, config_value, admin.id)
 
         await message.reply_text(f"✅ Preço da assinatura atualizado com sucesso!\n\nNovo preço: {config_value}")
 
+    @admin_required
     async def settime_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /settime command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        admin = self.admins.lookup(user.id)
 
         # Parse days from args
         if not context.args or len(context.args) < 1:
@@ -1122,44 +1225,20 @@ class AdminHandlers:
             return
 
         # Update or create system config
-        config_key = "subscription_days"
+        config_key = SUBSCRIPTION_DAYS
         config_value = str(days)
 
-        existing_config = self.db.query(SystemConfig).filter_by(key=config_key).first()
-        if existing_config:
-            existing_config.value = config_value
-            existing_config.updated_by = admin.id
-        else:
-            new_config = SystemConfig(
-                key=config_key,
-                value=config_value,
-                updated_by=admin.id
-            )
-            self.db.add(new_config)
-
-        self.db.commit()
+        await self.settings.set(config_key, config_value, admin.id)
 
         await message.reply_text(f"✅ Duração da assinatura atualizada com sucesso!\n\nNova duração: {days} dias")
 
+    @admin_required
     async def setwallet_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /setwallet command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        admin = self.admins.lookup(user.id)
 
         # Parse wallet address from args
         if not context.args or len(context.args) < 1:
@@ -1174,120 +1253,93 @@ class AdminHandlers:
             return
 
         # Update or create system config
-        config_key = "usdt_wallet_address"
+        config_key = USDT_WALLET_ADDRESS
         config_value = wallet_address
 
-        existing_config = self.db.query(SystemConfig).filter_by(key=config_key).first()
-        if existing_config:
-            existing_config.value = config_value
-            existing_config.updated_by = admin.id
-        else:
-            new_config = SystemConfig(
-                key=config_key,
-                value=config_value,
-                updated_by=admin.id
-            )
-            self.db.add(new_config)
-
-        self.db.commit()
+        await self.settings.set(config_key, config_value, admin.id)
 
         await message.reply_text(f"✅ Carteira USDT atualizada com sucesso!\n\nNova carteira: `{wallet_address}`")
 
+    @admin_required
     async def stats_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /stats command"""
-        user = update.effective_user
+        """Handle /stats command: dashboard read from the daily_stats rollup in one query"""
         message = update.message
-        chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
 
         try:
-            # Get statistics
-            total_users = self.db.query(User).count()
-            total_admins = self.db.query(Admin).count()
-            total_groups = self.db.query(Group).count()
-            total_payments = self.db.query(Payment).count()
-
-            # Calculate total payment amount
-            from sqlalchemy import func
-            total_amount_result = self.db.query(func.sum(Payment.amount)).scalar()
-            total_amount = total_amount_result or 0
-
-            # Get active subscriptions (users with future expiration)
-            from datetime import datetime, timezone
-            active_subscriptions = self.db.query(User).filter(
-                User.data_expiracao > datetime.now(timezone.utc)
-            ).count()
-
-            # Get recent payments (last 30 days)
-            from datetime import timedelta
-            thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-            recent_payments = self.db.query(Payment).filter(
-                Payment.created_at >= thirty_days_ago
-            ).count()
-
-            # Get scheduled messages count
-            from models.scheduled_message import ScheduledMessage
-            scheduled_messages = self.db.query(ScheduledMessage).filter_by(is_active=True).count()
-
-            # Format statistics
-            stats_text = f"""📊 **Estatísticas do Sistema**
-
-👥 **Usuários:**
-• Total: {total_users}
-• Com assinatura ativa: {active_subscriptions}
-
-👨‍💼 **Administradores:** {total_admins}
-
-👥 **Grupos:** {total_groups}
+            days = int(context.args[0]) if context.args else STATS_DEFAULT_DAYS
+        except ValueError:
+            days = STATS_DEFAULT_DAYS
+        days = max(1, min(days, STATS_MAX_DAYS))
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
 
-💰 **Pagamentos:**
-• Total de transações: {total_payments}
-• Valor total: R$ {total_amount:.2f}
-• Pagamentos recentes (30 dias): {recent_payments}
+        try:
+            rows = (await self.db.execute(
+                select(
+                    DailyStats,
+                    select(func.sum(DailyStats.revenue_total)).scalar_subquery().label("revenue_all"),
+                    select(func.sum(DailyStats.payments_completed)).scalar_subquery().label("payments_all"),
+                    select(func.sum(DailyStats.new_users)).scalar_subquery().label("users_all"),
+                    select(func.count()).select_from(Admin).scalar_subquery().label("admins"),
+                    select(func.count()).select_from(Group).scalar_subquery().label("groups"),
+                    select(func.count()).select_from(ScheduledMessage)
+                    .where(ScheduledMessage.is_active.is_(True)).scalar_subquery().label("scheduled"),
+                )
+                .where(DailyStats.day >= since)
+                .order_by(DailyStats.day.desc())
+            )).all()
 
-📅 **Mensagens Agendadas:** {scheduled_messages}
+            if not rows:
+                await message.reply_text(
+                    "📊 As estatísticas ainda não foram consolidadas. Tente novamente em alguns minutos."
+                )
+                return
 
-📈 **Resumo:** Sistema saudável com {active_subscriptions} usuários ativos"""
+            totals = rows[0]
+            daily = [row.DailyStats for row in rows]
+            active = next((day.active_subscribers for day in daily if day.active_subscribers is not None), 0)
+            revenue = sum(day.revenue_total for day in daily)
+            revenue_pix = sum(day.revenue_pix for day in daily)
+            revenue_usdt = sum(day.revenue_usdt for day in daily)
+
+            lines = [
+                "📊 Estatísticas do Sistema",
+                "",
+                f"👥 Usuários: {totals.users_all or 0} (assinaturas ativas: {active})",
+                f"👨‍💼 Administradores: {totals.admins}  |  👥 Grupos: {totals.groups}",
+                f"📅 Mensagens agendadas ativas: {totals.scheduled}",
+                f"💰 Receita total: R$ {totals.revenue_all or 0:.2f} em {totals.payments_all or 0} pagamentos",
+                "",
+                f"📈 Últimos {days} dia(s):",
+                f"• Receita: R$ {revenue:.2f} (PIX R$ {revenue_pix:.2f} | USDT {revenue_usdt:.2f})",
+                f"• Novos assinantes: {sum(day.new_subscribers for day in daily)}",
+                f"• Novos usuários: {sum(day.new_users for day in daily)}",
+                f"• Churn (assinaturas expiradas): {sum(day.churned for day in daily)}",
+                "",
+                "Dia | Receita (PIX/USDT) | Novos | Churn",
+            ]
+            for day in daily:
+                lines.append(
+                    f"{day.day:%d/%m} | R$ {day.revenue_total:.2f} ({day.revenue_pix:.2f}/{day.revenue_usdt:.2f})"
+                    f" | +{day.new_subscribers} | -{day.churned}"
+                )
+            computed_at = max((day.computed_at for day in daily if day.computed_at), default=None)
+            if computed_at:
+                lines.append("")
+                lines.append(f"🕒 Atualizado em {computed_at:%d/%m %H:%M} UTC")
 
-            await message.reply_text(stats_text)
+            await message.reply_text("\n".join(lines))
 
         except Exception as e:
             logger.error(f"Failed to get statistics: {e}")
             await message.reply_text("❌ Falha ao obter estatísticas do sistema.")
 
+    @admin_required
     async def logs_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /logs command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
         # Parse parameters
         limit = 10  # Default limit
         level = None
@@ -1342,29 +1394,16 @@ class AdminHandlers:
             logger.error(f"Failed to get logs: {e}")
             await message.reply_text("❌ Falha ao obter logs do sistema.")
 
+    @admin_required
     async def admins_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /admins command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
         try:
             # Get all admins
-            admins = self.db.query(Admin).all()
+            admins = (await self.db.scalars(select(Admin))).all()
             logger.info(f"[ADMINS_HANDLER] Found {len(admins)} admins in database")
 
             if not admins:
@@ -1410,29 +1449,16 @@ class AdminHandlers:
             logger.error(f"[ADMINS_HANDLER] Failed to get admins list: {e}", exc_info=True)
             await message.reply_text("❌ Falha ao obter lista de administradores.")
 
+    @admin_required
     async def settings_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /settings command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
         try:
             # Get all system configurations
-            configs = self.db.query(SystemConfig).all()
+            configs = (await self.db.scalars(select(SystemConfig))).all()
 
             if not configs:
                 await message.reply_text("⚙️ Nenhuma configuração encontrada.")
@@ -1478,25 +1504,13 @@ class AdminHandlers:
             logger.error(f"Failed to get settings: {e}")
             await message.reply_text("❌ Falha ao obter configurações do sistema.")
 
+    @admin_required
     async def rules_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /rules command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        admin = self.admins.lookup(user.id)
 
         # Parse rules text from args
         if not context.args:
@@ -1506,44 +1520,20 @@ class AdminHandlers:
         rules_text = " ".join(context.args)
 
         # Update or create system config
-        config_key = "rules_message"
+        config_key = RULES_MESSAGE
         config_value = rules_text
 
-        existing_config = self.db.query(SystemConfig).filter_by(key=config_key).first()
-        if existing_config:
-            existing_config.value = config_value
-            existing_config.updated_by = admin.id
-        else:
-            new_config = SystemConfig(
-                key=config_key,
-                value=config_value,
-                updated_by=admin.id
-            )
-            self.db.add(new_config)
-
-        self.db.commit()
+        await self.settings.set(config_key, config_value, admin.id)
 
         await message.reply_text(f"✅ Regras do grupo atualizadas com sucesso!\n\nRegras: {rules_text}")
 
+    @admin_required
     async def welcome_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /welcome command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        admin = self.admins.lookup(user.id)
 
         # Parse welcome text from args
         if not context.args:
@@ -1553,48 +1543,63 @@ class AdminHandlers:
         welcome_text = " ".join(context.args)
 
         # Update or create system config
-        config_key = "welcome_message"
+        config_key = WELCOME_MESSAGE
         config_value = welcome_text
 
-        existing_config = self.db.query(SystemConfig).filter_by(key=config_key).first()
-        if existing_config:
-            existing_config.value = config_value
-            existing_config.updated_by = admin.id
-        else:
-            new_config = SystemConfig(
-                key=config_key,
-                value=config_value,
-                updated_by=admin.id
-            )
-            self.db.add(new_config)
-
-        self.db.commit()
+        await self.settings.set(config_key, config_value, admin.id)
 
         await message.reply_text(f"✅ Mensagem de boas-vindas atualizada com sucesso!\n\nMensagem: {welcome_text}")
 
+    @admin_required
     async def schedule_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /schedule command"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
+        admin = self.admins.lookup(user.id)
+
+        usage = ("Uso: /schedule <HH:MM> <mensagem>\nExemplo: /schedule 09:00 Bom dia a todos!\n\n"
+                 "/schedule list - lista as mensagens agendadas\n"
+                 "/schedule remove <HH:MM> - remove a mensagem do horário")
+
+        if context.args and context.args[0].lower() == "list":
+            schedules = (await self.db.scalars(
+                select(ScheduledMessage).filter_by(is_active=True).order_by(ScheduledMessage.schedule_time)
+            )).all()
+            if not schedules:
+                await message.reply_text("Nenhuma mensagem agendada.")
+                return
+            lines = [f"⏰ {s.schedule_time.strftime('%H:%M')} - {s.message}" for s in schedules]
+            await message.reply_text("📅 Mensagens agendadas:\n\n" + "\n".join(lines))
             return
 
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
+        if context.args and context.args[0].lower() == "remove":
+            if len(context.args) < 2:
+                await message.reply_text(usage)
+                return
+            try:
+                hours, minutes = (int(part) for part in context.args[1].split(":"))
+                remove_time = dt_time(hours, minutes)
+            except ValueError:
+                await message.reply_text("Formato de horário inválido. Use HH:MM (exemplo: 09:00)")
+                return
+            existing_schedule = await self.db.scalar(select(ScheduledMessage).filter_by(
+                schedule_time=remove_time,
+                is_active=True
+            ))
+            if not existing_schedule:
+                await message.reply_text(f"Nenhuma mensagem agendada para {context.args[1]}.")
+                return
+            existing_schedule.is_active = False
+            await self.db.commit()
+            if self.scheduler:
+                await self.scheduler.reload()
+            await message.reply_text(f"✅ Mensagem das {context.args[1]} removida.")
             return
 
         # Parse time and message from args
         if not context.args or len(context.args) < 2:
-            await message.reply_text("Uso: /schedule <HH:MM> <mensagem>\nExemplo: /schedule 09:00 Bom dia a todos!")
+            await message.reply_text(usage)
             return
 
         time_str = context.args[0]
@@ -1613,12 +1618,11 @@ class AdminHandlers:
             return
 
         # Check if schedule already exists for this time
-        from datetime import time
-        schedule_time = time(hours, minutes)
-        existing_schedule = self.db.query(ScheduledMessage).filter_by(
+        schedule_time = dt_time(hours, minutes)
+        existing_schedule = await self.db.scalar(select(ScheduledMessage).filter_by(
             schedule_time=schedule_time,
             is_active=True
-        ).first()
+        ))
 
         if existing_schedule:
             await message.reply_text(f"Já existe uma mensagem agendada para {time_str}. Use outro horário.")
@@ -1631,112 +1635,59 @@ class AdminHandlers:
             created_by=admin.id
         )
         self.db.add(new_schedule)
-        self.db.commit()
+        await self.db.commit()
+
+        # Hot-reload the dispatcher timeline
+        if self.scheduler:
+            await self.scheduler.reload()
 
         await message.reply_text(f"✅ Mensagem agendada com sucesso!\n\nHorário: {time_str}\nMensagem: {schedule_message}")
 
+    @admin_required
     async def backup_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /backup command"""
+        """Handle /backup [delta] command: stream a compressed NDJSON dump and send it as a document"""
         user = update.effective_user
         message = update.message
-        chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
+        delta = bool(context.args) and context.args[0].lower() == "delta"
 
         try:
-            import json
-            import tempfile
-            from datetime import datetime, timezone
-
-            # Create backup data
-            backup_data = {
-                "backup_timestamp": datetime.now(timezone.utc).isoformat(),
-                "version": "1.0",
-                "tables": {}
-            }
-
-            # Export all tables
-            tables_to_export = [
-                ("users", User),
-                ("admins", Admin),
-                ("groups", Group),
-                ("payments", Payment),
-                ("warnings", Warning),
-                ("group_memberships", GroupMembership),
-                ("system_configs", SystemConfig),
-                ("scheduled_messages", ScheduledMessage)
-            ]
-
-            for table_name, model_class in tables_to_export:
-                records = self.db.query(model_class).all()
-                backup_data["tables"][table_name] = []
-
-                for record in records:
-                    # Convert SQLAlchemy model to dict
-                    record_dict = {}
-                    for column in model_class.__table__.columns:
-                        value = getattr(record, column.name)
-                        # Convert datetime objects to ISO format strings
-                        if hasattr(value, 'isoformat'):
-                            value = value.isoformat()
-                        record_dict[column.name] = value
-                    backup_data["tables"][table_name].append(record_dict)
-
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False)
-                backup_file_path = f.name
-
-            # Send file to admin
-            with open(backup_file_path, 'rb') as f:
-                await self.telegram.send_document(
-                    chat_id=int(user.id),
-                    document=f,
-                    filename=f"backup_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json",
-                    caption="📦 Backup do sistema criado com sucesso!"
-                )
-
-            # Clean up temporary file
-            import os
-            os.unlink(backup_file_path)
+            await message.reply_text("🔄 Gerando backup...")
+            with tempfile.TemporaryDirectory() as directory:
+                if delta:
+                    # Deltas belong to the local chain: written next to their parent
+                    path = await self.backups.create_delta()
+                    if path is None:
+                        await message.reply_text(
+                            "❌ Não há backup completo local para servir de base. "
+                            "Ative os backups agendados ou aguarde o próximo backup completo."
+                        )
+                        return
+                else:
+                    path = await self.backups.create(Path(directory))
+                with open(path, 'rb') as f:
+                    sent = await self.telegram.send_document(
+                        chat_id=int(user.id),
+                        document=f,
+                        filename=path.name,
+                        caption="📦 Backup incremental criado com sucesso!" if delta else "📦 Backup do sistema criado com sucesso!"
+                    )
 
-            await message.reply_text("✅ Backup criado e enviado com sucesso!")
+            if not sent:
+                await message.reply_text("❌ Backup gerado, mas o envio do arquivo falhou.")
+                return
+            await message.reply_text(
+                f"✅ Backup criado e enviado com sucesso!\n"
+                f"📄 {self.backups.last_rows} registros, {self.backups.last_size / 1024:.1f} KB"
+            )
 
         except Exception as e:
             logger.error(f"Failed to create backup: {e}")
             await message.reply_text("❌ Falha ao criar backup do sistema.")
 
+    @admin_required
     async def restore_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /restore command"""
-        user = update.effective_user
         message = update.message
-        chat = update.effective_chat
-
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
 
         # Check if this is a confirmation message
         if message.text and message.text.strip().upper() == "CONFIRMAR":
@@ -1752,302 +1703,184 @@ class AdminHandlers:
             await self._quick_restore(message)
             return
 
+        # Replay of the local chain (last full backup plus its deltas)
+        if context.args and context.args[0].lower() == "local":
+            await self._prepare_local_restore(message, context)
+            return
+
         # Check if message has a document
         if not message.document:
             await message.reply_text(
                 "📤 **Opções de Restauração:**\n\n"
-                "🔹 **Arquivo:** Envie `/restore` + arquivo de backup\n"
-                "🔹 **Rápida:** Envie `/restore_quick` para restaurar backup automático\n\n"
-                "⚠️ **ATENÇÃO:** Ambos apagam todos os dados atuais!"
+                "🔹 **Arquivo:** Envie o arquivo de backup com a legenda `/restore`\n"
+                "🔹 **Rápida:** Envie `/restore_quick` para restaurar backup automático\n"
+                "🔹 **Local:** Envie `/restore local` para restaurar o último backup completo local e seus incrementais\n\n"
+                "⚠️ **ATENÇÃO:** Todas apagam os dados atuais! Um backup incremental enviado como arquivo é aplicado sobre os dados atuais."
             )
             return
 
         # Check file extension
-        if not message.document.file_name or not message.document.file_name.endswith('.json'):
-            await message.reply_text("Arquivo de backup deve ter extensão .json")
+        if not message.document.file_name or not message.document.file_name.endswith(BACKUP_EXTENSIONS):
+            await message.reply_text("Arquivo de backup deve ter extensão .ndjson.gz, .ndjson.zst ou .json")
             return
 
         try:
-            import json
-            from datetime import datetime
-
-            # Download the file
+            # Download to disk: the restore engine streams the file from there
             file = await message.document.get_file()
-            file_content = await file.download_as_bytearray()
-
-            # Parse JSON
-            backup_data = json.loads(file_content.decode('utf-8'))
+            fd, path = tempfile.mkstemp(suffix=f"_{message.document.file_name}")
+            os.close(fd)
+            await file.download_to_drive(path)
 
-            # Validate backup format
-            if "tables" not in backup_data or "version" not in backup_data:
+            try:
+                summary = await asyncio.to_thread(inspect_backup, Path(path))
+            except (BackupFormatError, ValueError) as e:
+                os.unlink(path)
+                logger.warning(f"Rejected backup file: {e}")
                 await message.reply_text("❌ Arquivo de backup inválido ou corrompido.")
                 return
 
-            # Store backup data in context for confirmation
-            context.user_data['pending_restore'] = backup_data
-
-            # Ask for confirmation
-            await message.reply_text(
-                "⚠️ **ATENÇÃO: OPERAÇÃO DESTRUTIVA!**\n\n"
-                "Esta operação irá **APAGAR TODOS OS DADOS ATUAIS** e restaurar do backup!\n\n"
-                f"📦 Backup de: {backup_data.get('backup_timestamp', 'N/A')}\n"
-                f"👨‍💼 Admins no backup: {len(backup_data['tables'].get('admins', []))}\n"
-                f"👥 Usuários no backup: {len(backup_data['tables'].get('users', []))}\n\n"
-                "Para confirmar, digite exatamente: **CONFIRMAR**"
-            )
+            self._set_pending_restore(context, [path], temporary=True)
+            await message.reply_text(self._restore_prompt([summary]))
 
-        except json.JSONDecodeError:
-            await message.reply_text("❌ Arquivo de backup inválido - erro ao ler JSON.")
         except Exception as e:
             logger.error(f"Failed to parse backup file: {e}")
             await message.reply_text("❌ Erro ao processar arquivo de backup.")
 
-    async def _execute_restore(self, message: Message, context: ContextTypes.DEFAULT_TYPE):
-        """Execute the actual restore operation"""
+    async def _prepare_local_restore(self, message: Message, context: ContextTypes.DEFAULT_TYPE):
+        """Check the local backup chain and ask for confirmation before replaying it"""
+        paths = self.backups.chain()
+        if not paths:
+            await message.reply_text("❌ Nenhum backup local encontrado.")
+            return
         try:
-            from datetime import datetime
-
-            # Get backup data from context
-            backup_data = context.user_data['pending_restore']
-            del context.user_data['pending_restore']  # Clear pending restore
-
-            # Clear existing data (in reverse dependency order)
-            self.db.query(ScheduledMessage).delete()
-            self.db.query(Warning).delete()
-            self.db.query(GroupMembership).delete()
-            self.db.query(Payment).delete()
-            self.db.query(SystemConfig).delete()
-            self.db.query(Group).delete()
-            self.db.query(Admin).delete()
-            self.db.query(User).delete()
-
-            # Restore data
-            table_restore_order = [
-                ("users", User),
-                ("admins", Admin),
-                ("groups", Group),
-                ("payments", Payment),
-                ("warnings", Warning),
-                ("group_memberships", GroupMembership),
-                ("system_configs", SystemConfig),
-                ("scheduled_messages", ScheduledMessage)
+            summaries = [await asyncio.to_thread(inspect_backup, path) for path in paths]
+        except (BackupFormatError, OSError, ValueError) as e:
+            logger.warning(f"Local backup chain unreadable: {e}")
+            await message.reply_text("❌ Cadeia de backups local inválida ou incompleta.")
+            return
+        self._set_pending_restore(context, paths, temporary=False)
+        await message.reply_text(self._restore_prompt(summaries))
+
+    @staticmethod
+    def _set_pending_restore(context: ContextTypes.DEFAULT_TYPE, paths: List[Path], temporary: bool):
+        """Store the files awaiting confirmation (replacing a restore never confirmed)"""
+        previous = context.user_data.pop('pending_restore', None)
+        if previous and previous["temporary"]:
+            for path in previous["paths"]:
+                Path(path).unlink(missing_ok=True)
+        context.user_data['pending_restore'] = {"paths": [str(path) for path in paths], "temporary": temporary}
+
+    @staticmethod
+    def _restore_prompt(summaries: List[Dict[str, Any]]) -> str:
+        """Confirmation message for the backups about to be replayed"""
+        counts = summaries[0]["counts"]
+        lines = []
+        if summaries[0].get("kind") == "delta":
+            lines += [
+                "⚠️ **ATENÇÃO: BACKUP INCREMENTAL!**",
+                "",
+                "As alterações do backup serão **aplicadas sobre os dados atuais**.",
             ]
+        else:
+            lines += [
+                "⚠️ **ATENÇÃO: OPERAÇÃO DESTRUTIVA!**",
+                "",
+                "Esta operação irá **APAGAR TODOS OS DADOS ATUAIS** e restaurar do backup!",
+            ]
+        lines += [
+            "",
+            f"📦 Backup de: {summaries[-1].get('backup_timestamp', 'N/A')}",
+            f"👨‍💼 Admins no backup: {counts.get('admins', 0)}",
+            f"👥 Usuários no backup: {counts.get('users', 0)}",
+            f"📄 Total de registros: {sum(sum(summary['counts'].values()) for summary in summaries)}",
+        ]
+        if len(summaries) > 1:
+            lines.append(f"🧩 Backups incrementais: {len(summaries) - 1}")
+        lines += ["", "Para confirmar, digite exatamente: **CONFIRMAR**"]
+        return "\n".join(lines)
+
+    async def restore_confirm_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a plain "CONFIRMAR" message; ignored unless this admin has a restore pending"""
+        if 'pending_restore' not in context.user_data or not update.message:
+            return
+        if not await self.admins.get(update.effective_user.id):
+            return
+        await self._execute_restore(update.message, context)
 
-            restored_counts = {}
-
-            for table_name, model_class in table_restore_order:
-                if table_name in backup_data["tables"]:
-                    records = backup_data["tables"][table_name]
-                    restored_counts[table_name] = 0
-
-                    for record_data in records:
-                        # Convert ISO datetime strings back to datetime objects
-                        for key, value in record_data.items():
-                            column = getattr(model_class.__table__.columns, key, None)
-                            if column and hasattr(column.type, 'python_type'):
-                                if column.type.python_type == datetime:
-                                    if value and isinstance(value, str):
-                                        record_data[key] = datetime.fromisoformat(value)
-
-                        # Create new record
-                        new_record = model_class(**record_data)
-                        self.db.add(new_record)
-                        restored_counts[table_name] += 1
-
-            self.db.commit()
-
-            # Report results
-            result_text = "✅ **Restauração concluída com sucesso!**\n\n"
-            result_text += f"📦 Backup de: {backup_data.get('backup_timestamp', 'N/A')}\n\n"
-            result_text += "**Registros restaurados:**\n"
-
-            for table_name, count in restored_counts.items():
-                table_display_name = table_name.replace('_', ' ').title()
-                result_text += f"• {table_display_name}: {count}\n"
-
-            await message.reply_text(result_text)
+    async def _execute_restore(self, message: Message, context: ContextTypes.DEFAULT_TYPE):
+        """Execute the actual restore operation"""
+        pending = context.user_data.pop('pending_restore')
+        paths = [Path(path) for path in pending["paths"]]
+        try:
+            await message.reply_text("🔄 Restaurando backup...")
+            result = await self.restorer.restore_chain(paths)
+            self._invalidate_caches()
+            await message.reply_text(self._restore_report("✅ **Restauração concluída com sucesso!**", result))
 
         except Exception as e:
             logger.error(f"Failed to restore backup: {e}")
-            self.db.rollback()  # Rollback on error
-            await message.reply_text("❌ Falha ao restaurar backup do sistema.")
+            await message.reply_text("❌ Falha ao restaurar backup do sistema. Nenhum dado foi alterado.")
+        finally:
+            if pending["temporary"]:
+                for path in paths:
+                    path.unlink(missing_ok=True)
 
     async def _quick_restore(self, message):
         """Execute quick restore from hardcoded backup URL"""
-        try:
-            import json
-            import urllib.request
-
-            # URL do backup no GitHub
-            backup_url = "https://raw.githubusercontent.com/MolinariBR/botclient/master/backup_complete_20251031_122314.json"
+        # URL do backup no GitHub
+        backup_url = "https://raw.githubusercontent.com/MolinariBR/botclient/master/backup_complete_20251031_122314.json"
 
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
             await message.reply_text("🔄 Baixando backup do repositório...")
+            await asyncio.to_thread(urllib.request.urlretrieve, backup_url, path)
 
-            # Download backup
-            with urllib.request.urlopen(backup_url) as response:
-                backup_data = json.loads(response.read().decode('utf-8'))
-
-            # Validate backup
-            if "tables" not in backup_data or "version" not in backup_data:
-                await message.reply_text("❌ Backup do repositório inválido.")
-                return
-
-            await message.reply_text(
-                f"⚠️ **RESTAURAÇÃO RÁPIDA CONFIRMADA**\n\n"
-                f"📦 Backup: {backup_data.get('backup_timestamp', 'N/A')}\n"
-                f"👨‍💼 Admins: {len(backup_data['tables'].get('admins', []))}\n"
-                f"👥 Usuários: {len(backup_data['tables'].get('users', []))}\n\n"
-                f"🔄 Executando restauração..."
-            )
-
-            # Execute restore directly
-            from datetime import datetime
-
-            # Clear existing data using raw SQL with proper error handling
-            from sqlalchemy import text
-
-            # Disable foreign key checks temporarily
-            self.db.execute(text("PRAGMA foreign_keys = OFF"))
-
-            tables_to_clear = [
-                'scheduled_messages',
-                'warnings',
-                'group_memberships',
-                'payments',
-                'system_configs',
-                'groups',
-                'admins',
-                'users'
-            ]
-
-            for table_name in tables_to_clear:
-                try:
-                    self.db.execute(text(f"DELETE FROM {table_name}"))
-                    logger.info(f"Successfully deleted from {table_name}")
-                except Exception as e:
-                    logger.warning(f"Could not delete from {table_name}: {e}")
-
-            # Re-enable foreign keys
-            self.db.execute(text("PRAGMA foreign_keys = ON"))
-            self.db.commit()
-
-            # Restore data
-            table_restore_order = [
-                ("users", User),
-                ("admins", Admin),
-                ("groups", Group),
-                ("payments", Payment),
-                ("warnings", Warning),
-                ("group_memberships", GroupMembership),
-                ("system_configs", SystemConfig),
-                ("scheduled_messages", ScheduledMessage)
-            ]
-
-            restored_counts = {}
-
-            for table_name, model_class in table_restore_order:
-                if table_name in backup_data["tables"]:
-                    records = backup_data["tables"][table_name]
-                    restored_counts[table_name] = 0
-
-                    for record_data in records:
-                        # Convert datetime fields directly
-                        datetime_fields = {'created_at', 'updated_at', 'expires_at', 'renewed_at', 'scheduled_time', 'sent_at'}
-                        for field in datetime_fields:
-                            if field in record_data and record_data[field] and isinstance(record_data[field], str):
-                                try:
-                                    # Try different datetime formats
-                                    if 'T' in record_data[field]:
-                                        record_data[field] = datetime.fromisoformat(record_data[field].replace('Z', '+00:00'))
-                                    else:
-                                        record_data[field] = datetime.strptime(record_data[field], '%Y-%m-%d %H:%M:%S.%f')
-                                except (ValueError, TypeError) as dt_error:
-                                    logger.warning(f"Failed to parse datetime {record_data[field]} for field {field}: {dt_error}")
-                                    record_data[field] = None
-                        
-                        # Safe data type conversion with error handling
-                        try:
-                            # Skip conversion for critical string fields that should remain as-is
-                            critical_string_fields = {'telegram_id', 'username', 'first_name', 'last_name', 'status_assinatura', 'permissions'}
-                            
-                            for key, value in list(record_data.items()):
-                                # Handle null values
-                                if value == "null" or value is None:
-                                    record_data[key] = None
-                                    continue
-
-                                # Skip conversion for critical string fields
-                                if key in critical_string_fields:
-                                    continue
-
-                                column = getattr(model_class.__table__.columns, key, None)
-                                if column and hasattr(column.type, 'python_type'):
-                                    # Convert integers to booleans for boolean columns
-                                    if column.type.python_type == bool:
-                                        if isinstance(value, int):
-                                            record_data[key] = bool(value)
-                                        elif isinstance(value, str):
-                                            # Handle various string representations of boolean
-                                            record_data[key] = value.lower() in ('true', '1', 'yes', 'on')
-                                        else:
-                                            record_data[key] = bool(value)
-                        except Exception as conv_error:
-                            logger.warning(f"Data conversion failed for {model_class.__name__}: {conv_error}")
-                            # Continue with original data if conversion fails
-
-                        # Create new record with error handling
-                        try:
-                            new_record = model_class(**record_data)
-                            self.db.add(new_record)
-                            restored_counts[table_name] += 1
-                        except Exception as record_error:
-                            logger.error(f"Failed to create {model_class.__name__} record: {record_error}")
-                            logger.error(f"Record data: {record_data}")
-                            logger.error(f"Table: {table_name}, Record keys: {list(record_data.keys())}")
-                            # Try to identify the problematic field
-                            for k, v in record_data.items():
-                                if v is None:
-                                    logger.error(f"NULL value in field: {k}")
-                            # Continue with next record instead of failing completely
-
-            self.db.commit()
-
-            # Report results
-            result_text = "✅ **Restauração Rápida Concluída!**\n\n"
-            result_text += f"📦 Backup: {backup_data.get('backup_timestamp', 'N/A')}\n\n"
-            result_text += "**Registros restaurados:**\n"
-
-            for table_name, count in restored_counts.items():
-                table_display_name = table_name.replace('_', ' ').title()
-                result_text += f"• {table_display_name}: {count}\n"
-
-            await message.reply_text(result_text)
+            await message.reply_text("⚠️ **RESTAURAÇÃO RÁPIDA CONFIRMADA**\n\n🔄 Executando restauração...")
+            result = await self.restorer.restore(Path(path))
+            self._invalidate_caches()
+            await message.reply_text(self._restore_report("✅ **Restauração Rápida Concluída!**", result))
 
+        except BackupFormatError as e:
+            logger.error(f"Invalid quick restore backup: {e}")
+            await message.reply_text("❌ Backup do repositório inválido.")
         except Exception as e:
             logger.error(f"Failed quick restore: {e}")
-            self.db.rollback()
             await message.reply_text("❌ Falha na restauração rápida.")
-
+        finally:
+            os.unlink(path)
+
+    def _invalidate_caches(self):
+        """Drop every cache that may hold rows the restore replaced"""
+        # The local chain no longer describes the database: next scheduled backup is a full one
+        self.backups.mark_chain_broken()
+        self.admins.invalidate()
+        self.settings.invalidate()
+        self.resolver.invalidate()
+
+    @staticmethod
+    def _restore_report(title: str, result: RestoreResult) -> str:
+        lines = [
+            title,
+            "",
+            f"📦 Backup de: {result.backup_timestamp or 'N/A'}",
+            f"⏱️ {result.rows} registros em {result.duration:.1f}s ({result.rows_per_second:,.0f} registros/s)",
+            "",
+            "**Registros restaurados:**",
+        ]
+        for table_name, count in result.counts.items():
+            lines.append(f"• {table_name.replace('_', ' ').title()}: {count}")
+        if result.deleted:
+            lines += ["", f"🗑️ Registros removidos pelos incrementais: {sum(result.deleted.values())}"]
+        return "\n".join(lines)
+
+    @admin_required
     async def confirm_payment_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /confirm command - approve payment"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
         # Parse payment ID from args
         if not context.args or len(context.args) < 1:
             await message.reply_text("Uso: /confirm <payment_id>")
@@ -2059,64 +1892,34 @@ class AdminHandlers:
             await message.reply_text("❌ ID do pagamento deve ser um número.")
             return
 
-        # Get payment
-        payment = self.db.query(Payment).filter_by(id=payment_id).first()
-        if not payment:
-            await message.reply_text("❌ Pagamento não encontrado.")
-            return
+        await message.reply_text(await self._approve_payment(payment_id, context.bot))
 
-        if payment.status == "completed":
-            await message.reply_text("✅ Este pagamento já foi aprovado.")
-            return
+    async def _approve_payment(self, payment_id: int, bot) -> str:
+        """Approve a payment, activate the subscription and notify the user. Returns the admin reply.
 
-        # Update payment status
-        payment.status = "completed"
-        payment.completed_at = datetime.utcnow()
-        self.db.commit()
+        Settles through SubscriptionService.settle_payment, like the webhook and
+        the reconciler, so a payment they settle concurrently is extended once.
+        """
+        # Get payment
+        payment = await self.db.scalar(select(Payment).filter_by(id=payment_id))
+        if not payment:
+            return "❌ Pagamento não encontrado."
 
-        # Get user
-        db_user = self.db.query(User).filter_by(id=payment.user_id).first()
-        if db_user:
-            # Update user subscription
-            db_user.status_assinatura = "active"
-            db_user.data_expiracao = datetime.utcnow() + timedelta(days=30)  # 30 days
-            self.db.commit()
+        db_user = await self.subscriptions.settle_payment(self.db, payment)
+        await self.db.commit()
+        if db_user is None:
+            return "✅ Este pagamento já foi aprovado."
 
-            # Notify user
-            try:
-                await context.bot.send_message(
-                    chat_id=db_user.telegram_id,
-                    text=f"✅ **Pagamento Aprovado!**\n\n"
-                         f"💰 Valor: R$ {payment.amount:.2f}\n"
-                         f"⏰ Assinatura ativada por 30 dias\n\n"
-                         f"Aproveite seu acesso VIP!",
-                    parse_mode="Markdown"
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify user {db_user.telegram_id}: {e}")
-
-        await message.reply_text(f"✅ Pagamento {payment_id} aprovado com sucesso!")
+        await self.subscriptions.notify_activation(bot, db_user, payment)
+        return f"✅ Pagamento {payment_id} aprovado com sucesso!"
 
+    @admin_required
     async def reject_payment_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /reject command - reject payment"""
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
 
-        if not user or not message or not chat:
-            return
-
-        # Check if user is admin
-        admin = self.db.query(Admin).filter_by(telegram_id=str(user.id)).first()
-        if not admin:
-            await message.reply_text("Acesso negado. Você não é um administrador.")
-            return
-
-        # FR-004: Restrict admin commands to private chat only
-        if chat.type != "private":
-            await message.reply_text("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
-            return
-
         # Parse payment ID from args
         if not context.args or len(context.args) < 1:
             await message.reply_text("Uso: /reject <payment_id>")
@@ -2128,26 +1931,38 @@ class AdminHandlers:
             await message.reply_text("❌ ID do pagamento deve ser um número.")
             return
 
+        await message.reply_text(await self._reject_payment(payment_id, context.bot))
+
+    async def _reject_payment(self, payment_id: int, bot) -> str:
+        """Reject a payment and notify the user. Returns the admin reply.
+
+        Only open payments are rejected, with a conditional UPDATE: a stale
+        review card can't turn a payment the webhook or the reconciler just
+        settled into a failed one.
+        """
         # Get payment
-        payment = self.db.query(Payment).filter_by(id=payment_id).first()
+        payment = await self.db.scalar(select(Payment).filter_by(id=payment_id))
         if not payment:
-            await message.reply_text("❌ Pagamento não encontrado.")
-            return
+            return "❌ Pagamento não encontrado."
 
-        if payment.status == "failed":
-            await message.reply_text("❌ Este pagamento já foi rejeitado.")
-            return
-
-        # Update payment status
-        payment.status = "failed"
-        self.db.commit()
+        result = await self.db.execute(
+            sql_update(Payment)
+            .where(Payment.id == payment_id, Payment.status.in_(OPEN_PAYMENT_STATUSES))
+            .values(status="failed")
+        )
+        await self.db.commit()
+        if result.rowcount == 0:
+            await self.db.refresh(payment)
+            if payment.status == "failed":
+                return "❌ Este pagamento já foi rejeitado."
+            return f"⚠️ Pagamento {payment_id} já foi processado (status: {payment.status})."
 
         # Get user
-        db_user = self.db.query(User).filter_by(id=payment.user_id).first()
+        db_user = await self.db.scalar(select(User).filter_by(id=payment.user_id))
         if db_user:
             # Notify user
             try:
-                await context.bot.send_message(
+                await bot.send_message(
                     chat_id=db_user.telegram_id,
                     text=f"❌ **Pagamento Rejeitado**\n\n"
                          f"💰 Valor: R$ {payment.amount:.2f}\n\n"
@@ -2157,4 +1972,4 @@ class AdminHandlers:
             except Exception as e:
                 logger.error(f"Failed to notify user {db_user.telegram_id}: {e}")
 
-        await message.reply_text(f"❌ Pagamento {payment_id} rejeitado.")
+        return f"❌ Pagamento {payment_id} rejeitado."
@@ -1,15 +1,19 @@
 import datetime
 import logging
+from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update as sql_update
+from sqlalchemy.ext.asyncio import AsyncSession
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from models.payment import Payment
 from models.user import User
-from services.pixgo_service import PixGoService
+from services.admin_cache import AdminCache
+from services.pixgo_service import AsyncPixGoService
+from services.settings_service import SettingsService
 from services.usdt_service import USDTService
-from utils.config import Config
+from utils.database import Database
 from utils.performance import measure_performance, measure_block
 
 logger = logging.getLogger(__name__)
@@ -18,17 +22,27 @@ logger = logging.getLogger(__name__)
 class UserHandlers:
     def __init__(
         self,
-        db_session: Session,
-        pixgo_service: PixGoService,
+        database: Database,
+        pixgo_service: AsyncPixGoService,
         usdt_service: USDTService,
+        admin_cache: Optional[AdminCache] = None,
+        settings: Optional[SettingsService] = None,
     ):
-        self.db = db_session
+        self.database = database
         self.pixgo = pixgo_service
         self.usdt = usdt_service
+        self.admins = admin_cache or AdminCache(database)
+        self.settings = settings or SettingsService(database)
+
+    @property
+    def db(self) -> AsyncSession:
+        """Session scoped to the update being handled"""
+        return self.database.session
 
     @measure_performance("user_handlers.start_handler")
     async def start_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
+        settings = await self.settings.current()
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
@@ -46,8 +60,8 @@ class UserHandlers:
 
 Este bot gerencia acesso a grupos VIP através de assinaturas automáticas.
 
-💰 **Preço:** R$ {Config.SUBSCRIPTION_PRICE}
-⏰ **Duração:** {Config.SUBSCRIPTION_DAYS} dias
+💰 **Preço:** R$ {settings.subscription_price}
+⏰ **Duração:** {settings.subscription_days} dias
 
 📱 **Como usar:**
 • Use `/pay` para gerar pagamento da assinatura
@@ -57,12 +71,23 @@ Este bot gerencia acesso a grupos VIP através de assinaturas automáticas.
 ❓ **Suporte:** Use /support para falar com administradores
 """
 
+        # Talking to the bot again means it is no longer blocked: re-enable DM campaigns
+        if chat.type == "private":
+            result = await self.db.execute(
+                sql_update(User)
+                .where(User.telegram_id == str(user.id), User.blocked_bot_at.isnot(None))
+                .values(blocked_bot_at=None)
+            )
+            if result.rowcount:
+                await self.db.commit()
+
         logger.info(f"✅ Sending unified welcome to {user.first_name}")
         await message.reply_text(welcome_text, parse_mode="Markdown")
 
     @measure_performance("user_handlers.pay_handler")
     async def pay_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /pay command - works in both private and group chats"""
+        settings = await self.settings.current()
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
@@ -70,7 +95,7 @@ Este bot gerencia acesso a grupos VIP através de assinaturas automáticas.
             return
 
         # Check if user already has active subscription
-        db_user = self.db.query(User).filter_by(telegram_id=str(user.id)).first()
+        db_user = await self.db.scalar(select(User).filter_by(telegram_id=str(user.id)))
         if db_user and db_user.status_assinatura == "active":
             await message.reply_text("✅ Você já possui uma assinatura ativa!")
             return
@@ -84,7 +109,7 @@ Este bot gerencia acesso a grupos VIP através de assinaturas automáticas.
                 last_name=user.last_name,
             )
             self.db.add(db_user)
-            self.db.commit()
+            await self.db.commit()
 
         # Create payment method selection keyboard
         keyboard = [
@@ -98,8 +123,8 @@ Este bot gerencia acesso a grupos VIP através de assinaturas automáticas.
         await message.reply_text(
             f"""🎯 **Escolha o método de pagamento**
 
-Valor: R$ {Config.SUBSCRIPTION_PRICE:.2f}
-Descrição: Assinatura VIP (30 dias)
+Valor: R$ {settings.subscription_price:.2f}
+Descrição: Assinatura VIP ({settings.subscription_days} dias)
 
 Selecione uma das opções abaixo:""",
             reply_markup=reply_markup,
@@ -115,7 +140,7 @@ Selecione uma das opções abaixo:""",
         if not user or not message or not chat:
             return
 
-        db_user = self.db.query(User).filter_by(telegram_id=str(user.id)).first()
+        db_user = await self.db.scalar(select(User).filter_by(telegram_id=str(user.id)))
         if not db_user:
             await message.reply_text("Usuário não encontrado. Certifique-se de ter iniciado uma conversa com o bot.")
             return
@@ -144,6 +169,7 @@ Expiração: {expiration_str}
     @measure_performance("user_handlers.renew_handler")
     async def renew_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /renew command - works in both private and group chats"""
+        settings = await self.settings.current()
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
@@ -151,7 +177,7 @@ Expiração: {expiration_str}
             return
 
         # Check if user exists and has active subscription
-        db_user = self.db.query(User).filter_by(telegram_id=str(user.id)).first()
+        db_user = await self.db.scalar(select(User).filter_by(telegram_id=str(user.id)))
         if not db_user:
             await message.reply_text("Usuário não encontrado. Use /pay para assinar primeiro.")
             return
@@ -166,8 +192,8 @@ Expiração: {expiration_str}
             return
 
         # Create renewal payment
-        pix_payment = self.pixgo.create_payment(
-            amount=Config.SUBSCRIPTION_PRICE,
+        pix_payment = await self.pixgo.create_payment(
+            amount=settings.subscription_price,
             description=f"Renovação de Assinatura VIP - {user.username or user.first_name}",
             payer_info={"telegram_id": str(user.id)},
         )
@@ -181,11 +207,11 @@ Expiração: {expiration_str}
             payment = Payment(
                 user_id=db_user.id,
                 pixgo_payment_id=pix_payment.get("payment_id", pix_payment.get("id", "unknown")),
-                amount=Config.SUBSCRIPTION_PRICE,
+                amount=settings.subscription_price,
                 payment_method="pix",
             )
             self.db.add(payment)
-            self.db.commit()
+            await self.db.commit()
 
             qr_image_url = pix_payment.get('qr_image_url')
             
@@ -195,30 +221,30 @@ Expiração: {expiration_str}
                     photo=qr_image_url,
                     caption=f"""🔄 **Renovação de Assinatura**
 
-� **Valor:** R$ {Config.SUBSCRIPTION_PRICE:.2f}
+� **Valor:** R$ {settings.subscription_price:.2f}
 📝 **Descrição:** Renovação de Assinatura VIP
 
-⚠️ **Após o pagamento, sua assinatura será estendida automaticamente por mais {Config.SUBSCRIPTION_DAYS} dias.**"""
+⚠️ **Após o pagamento, sua assinatura será estendida automaticamente por mais {settings.subscription_days} dias.**"""
                 )
             else:
                 # Fallback to text-only version
                 payment_message = f"""
 �🔄 **Renovação de Assinatura**
 
-Valor: R$ {Config.SUBSCRIPTION_PRICE:.2f}
+Valor: R$ {settings.subscription_price:.2f}
 Descrição: Renovação de Assinatura VIP
 
 ```
 {qr_code}
 ```
 
-Após o pagamento, sua assinatura será estendida automaticamente por mais {Config.SUBSCRIPTION_DAYS} dias.
+Após o pagamento, sua assinatura será estendida automaticamente por mais {settings.subscription_days} dias.
 """
                 await message.reply_text(payment_message)
         else:
             # Fallback to USDT
             usdt_instructions = self.usdt.get_payment_instructions(
-                Config.SUBSCRIPTION_PRICE
+                settings.subscription_price, settings.usdt_wallet_address
             )
             await message.reply_text(
                 f"PIX indisponível. Use USDT:\n{usdt_instructions}"
@@ -241,7 +267,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
             return
 
         # Get or create user
-        db_user = self.db.query(User).filter_by(telegram_id=str(user.id)).first()
+        db_user = await self.db.scalar(select(User).filter_by(telegram_id=str(user.id)))
         if not db_user:
             db_user = User(
                 telegram_id=str(user.id),
@@ -250,7 +276,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
                 last_name=user.last_name,
             )
             self.db.add(db_user)
-            self.db.commit()
+            await self.db.commit()
 
         if callback_data == "pay_pix":
             await self._process_pix_payment(query, db_user, user)
@@ -261,10 +287,11 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
 
     async def _process_pix_payment(self, query, db_user, user):
         """Process PIX payment"""
+        settings = await self.settings.current()
         try:
             # Create PIX payment
-            pix_payment = self.pixgo.create_payment(
-                amount=Config.SUBSCRIPTION_PRICE,
+            pix_payment = await self.pixgo.create_payment(
+                amount=settings.subscription_price,
                 description=f"Assinatura VIP - {user.first_name}",
                 payer_info={"telegram_id": str(user.id)},
             )
@@ -283,13 +310,13 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
             # Save payment to database
             payment = Payment(
                 user_id=db_user.id,
-                amount=Config.SUBSCRIPTION_PRICE,
+                amount=settings.subscription_price,
                 payment_method="pix",
                 pixgo_payment_id=payment_id,
                 status="pending",
             )
             self.db.add(payment)
-            self.db.commit()
+            await self.db.commit()
 
             # Send payment details
             qr_image_url = pix_payment.get('qr_image_url')
@@ -299,7 +326,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
                 info_text = f"""💰 **PAGAMENTO PIX GERADO**
 
 👤 **Cliente:** {user.first_name}
-💵 **Valor:** R$ {Config.SUBSCRIPTION_PRICE:.2f}
+💵 **Valor:** R$ {settings.subscription_price:.2f}
 ⏰ **Vencimento:** {pix_payment.get('expires_at', 'N/A')}"""
                 
                 await query.message.reply_text(info_text, parse_mode="Markdown")
@@ -333,7 +360,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
                 info_text = f"""💰 PAGAMENTO PIX GERADO
 
 👤 Cliente: {user.first_name}
-💵 Valor: R$ {Config.SUBSCRIPTION_PRICE:.2f}
+💵 Valor: R$ {settings.subscription_price:.2f}
 ⏰ Vencimento: {pix_payment.get('expires_at', 'N/A')}"""
 
                 await query.message.reply_text(info_text)
@@ -356,32 +383,33 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
 
     async def _process_usdt_payment(self, query, db_user, user):
         """Process USDT payment"""
+        settings = await self.settings.current()
         try:
             # Create USDT payment record
             payment = Payment(
                 user_id=db_user.id,
-                amount=Config.SUBSCRIPTION_PRICE,
+                amount=settings.subscription_price,
                 payment_method="usdt",
                 status="waiting_proof",
             )
             self.db.add(payment)
-            self.db.commit()
+            await self.db.commit()
 
             # Send USDT payment instructions
             usdt_text = f"""
 ₿ **PAGAMENTO USDT (POLYGON)**
 
 👤 **Cliente:** {user.first_name}
-💵 **Valor:** R$ {Config.SUBSCRIPTION_PRICE:.2f}
-💎 **Valor em USDT:** ≈{(Config.SUBSCRIPTION_PRICE / 300):.4f} USDT
+💵 **Valor:** R$ {settings.subscription_price:.2f}
+💎 **Valor em USDT:** ≈{(settings.subscription_price / 300):.4f} USDT
 
 🏦 **Carteira Polygon:**
 ```
-{Config.USDT_WALLET_ADDRESS}
+{settings.usdt_wallet_address}
 ```
 
 📋 **Instruções:**
-1. Envie exatamente **{(Config.SUBSCRIPTION_PRICE / 300):.4f} USDT** para o endereço acima
+1. Envie exatamente **{(settings.subscription_price / 300):.4f} USDT** para o endereço acima
 2. Use a rede **Polygon** (não Ethereum mainnet)
 3. Tire uma foto/print do comprovante de transação
 4. Envie a imagem usando o comando **/proof** neste grupo
@@ -405,6 +433,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
     @measure_performance("user_handlers.help_handler")
     async def help_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
+        settings = await self.settings.current()
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
@@ -412,8 +441,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
             return
 
         # Check if user is admin
-        from models.admin import Admin
-        is_admin = self.db.query(Admin).filter(Admin.telegram_id == str(user.id)).first() is not None
+        is_admin = await self.admins.is_admin(user.id)
 
         if is_admin:
             # Admin help
@@ -435,7 +463,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
 • `/resetwarn @usuario` - Resetar avisos
 
 💰 **Pagamentos:**
-• `/pending` - Ver pagamentos pendentes
+• `/pending` - Fila de revisão com botões Aprovar/Rejeitar (`/pending resumo` para o resumo por usuário)
 • `/confirm ID` - Confirmar pagamento
 • `/reject ID` - Rejeitar pagamento
 
@@ -445,23 +473,23 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
 • `/setwallet endereco` - Alterar carteira USDT
 
 📊 **Estatísticas:**
-• `/stats` - Ver estatísticas
+• `/stats [dias]` - Ver estatísticas
 • `/logs` - Ver logs recentes
 
 📋 **Outros:**
 • `/rules` - Ver regras
 • `/welcome` - Configurar boas-vindas
 • `/schedule` - Agendar mensagens
-• `/backup` - Fazer backup
-• `/restore` - Restaurar backup
+• `/backup [delta]` - Fazer backup (completo ou incremental)
+• `/restore [local]` - Restaurar backup (arquivo ou cadeia local)
 """
         else:
             # User help
             help_text = f"""
 🤖 **BOT VIP TELEGRAM**
 
-💰 **Preço:** R$ {Config.SUBSCRIPTION_PRICE}
-⏰ **Duração:** {Config.SUBSCRIPTION_DAYS} dias
+💰 **Preço:** R$ {settings.subscription_price}
+⏰ **Duração:** {settings.subscription_days} dias
 
 📋 **Comandos Disponíveis:**
 
@@ -517,10 +545,13 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
             photo_url = file.file_path
 
             # Check for pending USDT payment
-            pending_payment = self.db.query(Payment).filter_by(
-                user_id=self.db.query(User).filter_by(telegram_id=str(user.id)).first().id,
-                status="waiting_proof"
-            ).first()
+            db_user = await self.db.scalar(select(User).filter_by(telegram_id=str(user.id)))
+            pending_payment = None
+            if db_user:
+                pending_payment = await self.db.scalar(select(Payment).filter_by(
+                    user_id=db_user.id,
+                    status="waiting_proof"
+                ))
 
             if not pending_payment:
                 await message.reply_text("❌ Nenhum pagamento pendente encontrado. Use /pay primeiro.")
@@ -531,7 +562,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
             pending_payment.proof_image_url = photo_url
             pending_payment.status = "waiting_proof"
             pending_payment.proof_submitted_at = datetime.now()
-            self.db.commit()
+            await self.db.commit()
 
             # Notify user
             await message.reply_text(
@@ -550,9 +581,7 @@ Após o pagamento, sua assinatura será estendida automaticamente por mais {Conf
 
     async def _notify_admins_new_proof(self, payment: Payment, user, context=None):
         """Notify all admins about new USDT payment proof"""
-        from models.admin import Admin
-
-        admins = self.db.query(Admin).all()
+        admins = await self.admins.all()
 
         notification_text = f"""
 🔔 **Novo comprovante USDT recebido!**
@@ -604,6 +633,7 @@ Use /pending para ver todos os pagamentos pendentes.
     @measure_performance("user_handlers.info_handler")
     async def info_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /info command"""
+        settings = await self.settings.current()
         user = update.effective_user
         message = update.message
         chat = update.effective_chat
@@ -618,8 +648,8 @@ Use /pending para ver todos os pagamentos pendentes.
 👥 **Tipo:** {chat.type}
 📅 **Criado em:** {chat.date if hasattr(chat, 'date') else 'N/A'}
 
-💰 **Preço da Assinatura:** R$ {Config.SUBSCRIPTION_PRICE}
-⏰ **Duração:** {Config.SUBSCRIPTION_DAYS} dias
+💰 **Preço da Assinatura:** R$ {settings.subscription_price}
+⏰ **Duração:** {settings.subscription_days} dias
 """
 
         await message.reply_text(info_text, parse_mode="Markdown")
@@ -6,10 +6,9 @@ import sys
 import asyncio
 import logging
 import traceback
+from datetime import timedelta
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import telegram
 import httpx
 
@@ -20,6 +19,7 @@ from telegram.ext import (
     CallbackQueryHandler,
     filters,
     ChatMemberHandler,
+    TypeHandler,
 )
 
 # Handlers / Services / Utils (assumo que já existem em seu projeto)
@@ -27,11 +27,31 @@ from handlers.admin_handlers import AdminHandlers
 from handlers.user_handlers import UserHandlers
 from utils.config import Config
 from utils.logger import setup_logging
+from utils.database import Database
+from utils.update_processor import SessionUpdateProcessor
+from utils.performance import instrument_engine, performance_monitor
+from utils.query_profiler import query_profiler
+from utils.tracing import tracer
+from utils.telegram_request import MeasuredRequest
 from services.mute_service import MuteService
-from services.pixgo_service import PixGoService
+from services.pixgo_service import AsyncPixGoService
 from services.usdt_service import USDTService
 from services.telegram_service import TelegramService
 from services.logging_service import LoggingService
+from services.subscription_service import SubscriptionService
+from services.webhook_service import DepositWebhookServer
+from services.metrics_server import MetricsServer
+from services.trace_exporter import TraceExporter
+from services.payment_reconciler import PaymentReconciler
+from services.expiry_sweeper import ExpirySweeper
+from services.stats_rollup import StatsRollup
+from services.backup_service import BackupService
+from services.restore_service import RestoreService
+from services.message_scheduler import MessageScheduler
+from services.broadcast_service import BroadcastService
+from services.admin_cache import AdminCache
+from services.settings_service import SettingsService
+from services.user_resolver import UserResolver
 
 # ---------- CONFIG / ENV ----------
 load_dotenv(".env.local")  # chamado apenas uma vez
@@ -49,26 +69,61 @@ except Exception:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 logging.getLogger("httpx").setLevel(logging.WARNING)  # reduzir ruído de libs
 
+# Métricas de desempenho: janela dos percentis e amostragem de memória
+performance_monitor.window = Config.PERFORMANCE_WINDOW
+performance_monitor.memory_sample_rate = Config.PERFORMANCE_MEMORY_SAMPLE_RATE
+
 # ---------- DATABASE ----------
 def init_database():
     if not getattr(Config, "DATABASE_URL", None):
         logging.error("DATABASE_URL não configurada em Config.")
         raise RuntimeError("DATABASE_URL não configurada")
-    engine = create_engine(Config.DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return engine, SessionLocal
+    # Engine assíncrono: cada update abre sua própria sessão (ver SessionUpdateProcessor)
+    database = Database(Config.DATABASE_URL)
+    # Tempo de cada query entra nas métricas do handler que a executou
+    instrument_engine(database.engine.sync_engine)
+    # Cada query é atribuída ao handler em execução; as lentas vão para um log próprio com EXPLAIN
+    query_profiler.configure(slow_threshold=Config.SLOW_QUERY_THRESHOLD, slow_log=Config.SLOW_QUERY_LOG)
+    query_profiler.attach(database.engine.sync_engine)
+    # Em updates amostrados pelo tracer, cada query vira um span filho
+    tracer.attach(database.engine.sync_engine)
+    return database
 
 # ---------- SERVICES ----------
-def init_services(db_session):
+def init_services(database: Database):
     """
     Inicializa e retorna as instâncias de serviço necessárias.
-    db_session pode ser None se o serviço não precisar dele.
+    Serviços que acessam o banco abrem sessões via database.session_scope().
     """
-    pixgo = PixGoService(Config.PIXGO_API_KEY, Config.PIXGO_BASE_URL)
+    pixgo = AsyncPixGoService(Config.PIXGO_API_KEY, Config.PIXGO_BASE_URL)
     usdt = USDTService(Config.USDT_WALLET_ADDRESS)
     telegram_svc = TelegramService(Config.TELEGRAM_TOKEN)
-    mute = MuteService(db_session)
+    mute = MuteService(database, telegram_svc)
     logging_svc = LoggingService()
+    settings = SettingsService(database)
+    subscriptions = SubscriptionService(Config.SUBSCRIPTION_DAYS, settings)
+    scheduler = MessageScheduler(
+        database,
+        telegram_svc,
+        timezone_name=Config.SCHEDULE_TIMEZONE,
+        catch_up=timedelta(minutes=Config.SCHEDULE_CATCH_UP_MINUTES),
+    )
+    broadcaster = BroadcastService(
+        database,
+        global_rate=Config.BROADCAST_GLOBAL_RATE,
+        group_rate_per_minute=Config.BROADCAST_GROUP_RATE_PER_MINUTE,
+    )
+    admins = AdminCache(database)
+    resolver = UserResolver(database)
+    backups = BackupService(
+        database,
+        directory=Config.BACKUP_DIR,
+        keep=Config.BACKUP_KEEP,
+        interval=Config.BACKUP_INTERVAL,
+        delta_interval=Config.BACKUP_DELTA_INTERVAL,
+        compression=Config.BACKUP_COMPRESSION,
+    )
+    restorer = RestoreService(database)
     logging.info("Serviços inicializados.")
     return {
         "pixgo": pixgo,
@@ -76,10 +131,24 @@ def init_services(db_session):
         "telegram": telegram_svc,
         "mute": mute,
         "logging": logging_svc,
+        "subscriptions": subscriptions,
+        "scheduler": scheduler,
+        "broadcaster": broadcaster,
+        "admins": admins,
+        "settings": settings,
+        "resolver": resolver,
+        "backups": backups,
+        "restorer": restorer,
     }
 
 # ---------- HANDLERS SETUP ----------
-def setup_handlers(application: Application, user_handlers: UserHandlers, admin_handlers: AdminHandlers, mute_service: MuteService):
+def setup_handlers(
+    application: Application,
+    user_handlers: UserHandlers,
+    admin_handlers: AdminHandlers,
+    mute_service: MuteService,
+    resolver: UserResolver,
+):
     """
     Registra todos os handlers no Application.
     Handlers utilitários (message_logger/chat_member_handler) definidos apenas aqui.
@@ -113,6 +182,8 @@ def setup_handlers(application: Application, user_handlers: UserHandlers, admin_
             logging.error(f"Erro em chat_member_handler: {e}")
 
     # Registrar handlers (ordem e grupos pensados para evitar conflito)
+    # Atualiza username/nome do remetente antes de qualquer outro handler
+    application.add_handler(TypeHandler(telegram.Update, resolver.track_update), group=-10)
     application.add_handler(MessageHandler(filters.ALL, message_logger), group=1)
     application.add_handler(ChatMemberHandler(chat_member_handler, ChatMemberHandler.MY_CHAT_MEMBER), group=1)
 
@@ -129,6 +200,7 @@ def setup_handlers(application: Application, user_handlers: UserHandlers, admin_
 
     # Callback handlers for payment buttons
     application.add_handler(CallbackQueryHandler(user_handlers.payment_callback_handler, pattern="^pay_"))
+    application.add_handler(CallbackQueryHandler(admin_handlers.review_callback_handler, pattern="^pq:"))
 
     # Admin commands
     admin_cmds = [
@@ -179,9 +251,22 @@ def setup_handlers(application: Application, user_handlers: UserHandlers, admin_
 
     application.add_handler(MessageHandler(filters.TEXT & filters.ChatType.GROUPS, group_message_test), group=-5)
 
+    # /restore com o arquivo de backup anexado (legenda) e a confirmação "CONFIRMAR"
+    application.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/restore") & filters.ChatType.PRIVATE,
+        admin_handlers.restore_handler,
+    ))
+    application.add_handler(MessageHandler(
+        filters.Regex(r"(?i)^\s*confirmar\s*$") & filters.ChatType.PRIVATE,
+        admin_handlers.restore_confirm_handler,
+    ))
+
     # Handler for USDT payment proofs (photos in private chats)
     application.add_handler(MessageHandler(filters.PHOTO & filters.ChatType.PRIVATE, user_handlers.proof_handler))
 
+    # Queries contadas por handler (e checadas contra o @query_budget declarado)
+    query_profiler.instrument_application(application)
+
     logging.info("Handlers registrados com sucesso.")
 
 # ---------- ASYNC MAIN (inicia serviços concorrentes) ----------
@@ -228,26 +313,151 @@ def main():
             logging.debug(f"Validação Config pulada/erro: {e}")
 
         # Inicializa DB e Services
-        engine, SessionLocal = init_database()
-        db = SessionLocal()
-        services = init_services(db)
+        database = init_database()
+        services = init_services(database)
 
         # Inicializa Handlers
-        user_handlers = UserHandlers(db, services["pixgo"], services["usdt"])
-        admin_handlers = AdminHandlers(db, services["telegram"], services["logging"])
+        user_handlers = UserHandlers(
+            database, services["pixgo"], services["usdt"], services["admins"], services["settings"]
+        )
+        admin_handlers = AdminHandlers(
+            database, services["telegram"], services["logging"], services["mute"],
+            services["scheduler"], services["broadcaster"], services["admins"], services["settings"],
+            services["resolver"], services["backups"], services["restorer"], services["subscriptions"]
+        )
 
-        # Cria Application
-        application = Application.builder().token(Config.TELEGRAM_TOKEN).build()
+        # Webhook de depósitos (PIX) roda no mesmo loop do polling
+        webhook_server = None
+        if Config.DEPIX_WEBHOOK_SECRET:
+            webhook_server = DepositWebhookServer(
+                database,
+                services["subscriptions"],
+                Config.DEPIX_WEBHOOK_SECRET,
+                host=Config.WEBHOOK_HOST,
+                port=Config.WEBHOOK_PORT,
+                path=Config.WEBHOOK_PATH,
+            )
+        else:
+            logging.info("DEPIX_WEBHOOK_SECRET não configurado; webhook de depósitos desativado.")
 
-        # Registra handlers
-        setup_handlers(application, user_handlers, admin_handlers, services["mute"])
+        # Reconciliador de pagamentos PIX pendentes (fallback enquanto o webhook não é confiável)
+        reconciler = None
+        if Config.RECONCILER_ENABLED and Config.PIXGO_API_KEY:
+            reconciler = PaymentReconciler(
+                database,
+                services["pixgo"],
+                services["subscriptions"],
+                tick_interval=Config.RECONCILER_INTERVAL,
+                concurrency=Config.RECONCILER_CONCURRENCY,
+            )
 
-        # Start mute service
-        try:
-            # Skip mute service for now to test payments
-            pass
-        except Exception as e:
-            logging.error(f"Falha ao iniciar mute service: {e}")
+        # Expira assinaturas vencidas e remove os usuários dos grupos
+        sweeper = None
+        if Config.SWEEPER_ENABLED:
+            sweeper = ExpirySweeper(
+                database,
+                services["telegram"],
+                check_interval=Config.SWEEPER_INTERVAL,
+                concurrency=Config.SWEEPER_CONCURRENCY,
+                rate_limit=Config.SWEEPER_RATE_LIMIT,
+            )
+
+        # Mantém a tabela daily_stats usada pelo /stats
+        stats_rollup = None
+        if Config.STATS_ROLLUP_ENABLED:
+            stats_rollup = StatsRollup(database, interval=Config.STATS_ROLLUP_INTERVAL)
+
+        # Updates de usuários diferentes rodam em paralelo; do mesmo usuário, em ordem
+        update_processor = SessionUpdateProcessor(
+            database,
+            max_concurrent_updates=Config.MAX_CONCURRENT_UPDATES,
+            max_pending_updates=Config.MAX_PENDING_UPDATES,
+        )
+
+        # Endpoint /metrics (Prometheus) com latências, fila de updates, PixGo e Bot API
+        metrics_server = None
+        if Config.METRICS_ENABLED:
+            metrics_server = MetricsServer(
+                update_processor=update_processor,
+                pixgo=services["pixgo"],
+                host=Config.METRICS_HOST,
+                port=Config.METRICS_PORT,
+                path=Config.METRICS_PATH,
+            )
+
+        # Tracing de uma amostra dos updates: span raiz por update, filhos para SQL, PixGo e Bot API
+        trace_exporter = None
+        if Config.TRACING_SAMPLE_RATE > 0:
+            trace_exporter = TraceExporter(
+                path=Config.TRACING_FILE,
+                endpoint=Config.TRACING_ENDPOINT or None,
+                interval=Config.TRACING_FLUSH_INTERVAL,
+            )
+            tracer.configure(sample_rate=Config.TRACING_SAMPLE_RATE, exporter=trace_exporter)
+
+        async def post_init(app: Application):
+            try:
+                await services["mute"].start()
+            except Exception as e:
+                logging.error(f"Falha ao iniciar mute service: {e}")
+            try:
+                await services["scheduler"].start()
+            except Exception as e:
+                logging.error(f"Falha ao iniciar agendador de mensagens: {e}")
+            # Retoma broadcasts interrompidos pelo último desligamento
+            services["broadcaster"].bot = app.bot
+            await services["broadcaster"].start()
+            if webhook_server:
+                webhook_server.bot = app.bot
+                await webhook_server.start()
+            if reconciler:
+                reconciler.bot = app.bot
+                await reconciler.start()
+            if sweeper:
+                await sweeper.start()
+            if stats_rollup:
+                await stats_rollup.start()
+            # Backups locais periódicos com rotação
+            if Config.BACKUP_SCHEDULE_ENABLED:
+                await services["backups"].start()
+            if metrics_server:
+                await metrics_server.start()
+            if trace_exporter:
+                await trace_exporter.start()
+
+        async def post_shutdown(app: Application):
+            if metrics_server:
+                await metrics_server.stop()
+            if stats_rollup:
+                await stats_rollup.stop()
+            await services["backups"].stop()
+            if sweeper:
+                await sweeper.stop()
+            if reconciler:
+                await reconciler.stop()
+            if webhook_server:
+                await webhook_server.stop()
+            await services["mute"].stop()
+            await services["scheduler"].stop()
+            await services["broadcaster"].stop()
+            await services["pixgo"].aclose()
+            if trace_exporter:
+                await trace_exporter.stop()
+            await database.dispose()
+
+        # Cria Application (uma sessão de banco por update)
+        application = (
+            Application.builder()
+            .token(Config.TELEGRAM_TOKEN)
+            .concurrent_updates(update_processor)
+            .request(MeasuredRequest())  # chamadas da Bot API medidas (getUpdates fica de fora)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
+            .build()
+        )
+
+        # Registra handlers
+        setup_handlers(application, user_handlers, admin_handlers, services["mute"], services["resolver"])
 
         # Run polling
         application.run_polling(
@@ -9,6 +9,11 @@ from .admin import Admin
 from .warning import Warning
 from .system_config import SystemConfig
 from .scheduled_message import ScheduledMessage
+from .webhook_event import WebhookEvent
+from .broadcast_job import BroadcastJob
+from .daily_stats import DailyStats, RollupWatermark
+from .tombstone import Tombstone
+from .churn_event import ChurnEvent
 
 __all__ = [
     'Base',
@@ -19,5 +24,11 @@ __all__ = [
     'Admin',
     'Warning',
     'SystemConfig',
-    'ScheduledMessage'
+    'ScheduledMessage',
+    'WebhookEvent',
+    'BroadcastJob',
+    'DailyStats',
+    'RollupWatermark',
+    'Tombstone',
+    'ChurnEvent'
 ]
\ No newline at end of file
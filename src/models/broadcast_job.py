@@ -0,0 +1,28 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+
+from .base import Base
+
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True)
+    message = Column(Text, nullable=False)
+    target = Column(String, nullable=False, default="groups")  # groups, dm:active, dm:expired, dm:all
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    cursor = Column(Integer, nullable=False, default=0)  # Last target id fully processed (keyset)
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)  # DM recipients that blocked the bot
+    progress_chat_id = Column(String)  # Admin chat holding the live progress message
+    progress_message_id = Column(Integer)
+    created_by = Column(Integer, ForeignKey("admins.id"))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
@@ -0,0 +1,26 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer
+
+from .base import Base
+
+
+class ChurnEvent(Base):
+    """A subscription that lapsed, recorded when it was flipped to expired.
+
+    The stats rollup counts churn from these rows rather than from
+    ``users.data_expiracao``, which a later renewal moves.
+    """
+
+    __tablename__ = "churn_events"
+    __table_args__ = (
+        # Stats rollup: churn per day, and events recorded since the last watermark
+        Index("ix_churn_events_lapsed_at", "lapsed_at"),
+        Index("ix_churn_events_updated_at", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)  # No foreign key: the event outlives a deleted user
+    lapsed_at = Column(DateTime, nullable=False)  # data_expiracao when it expired: the churn day
+    # When the event was recorded (never updated; named for incremental backups)
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
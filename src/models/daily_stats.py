@@ -0,0 +1,33 @@
+import datetime
+
+from sqlalchemy import Column, Date, DateTime, Float, Integer, String
+
+from .base import Base
+
+
+class DailyStats(Base):
+    """Per-day (UTC) rollup of payments and users, maintained by the stats rollup job"""
+
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    revenue_total = Column(Float, nullable=False, default=0)
+    revenue_pix = Column(Float, nullable=False, default=0)
+    revenue_usdt = Column(Float, nullable=False, default=0)
+    payments_completed = Column(Integer, nullable=False, default=0)
+    payments_pix = Column(Integer, nullable=False, default=0)
+    payments_usdt = Column(Integer, nullable=False, default=0)
+    new_users = Column(Integer, nullable=False, default=0)
+    new_subscribers = Column(Integer, nullable=False, default=0)  # First completed payment ever on this day
+    churned = Column(Integer, nullable=False, default=0)  # Subscriptions that lapsed this day (churn_events)
+    active_subscribers = Column(Integer)  # Snapshot taken while the day was current
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class RollupWatermark(Base):
+    """Point up to which a rollup has consumed its source tables"""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=False)
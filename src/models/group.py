@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -25,11 +25,22 @@ class Group(Base):
 
 class GroupMembership(Base):
     __tablename__ = "group_memberships"
+    __table_args__ = (
+        # One membership per user and group; also serves lookups by user_id
+        UniqueConstraint("user_id", "group_id", name="uq_group_memberships_user_group"),
+        Index("ix_group_memberships_group_id", "group_id"),
+        # Incremental backups export rows changed since the previous one
+        Index("ix_group_memberships_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
     joined_at = Column(DateTime, default=datetime.datetime.utcnow)
+    kick_started_at = Column(DateTime)  # Set by the expiry sweeper before kicking
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
 
     # Relationships
     user = relationship("User", back_populates="group_memberships")
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -8,6 +8,15 @@ from .base import Base
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # /pending and the reconciler scan open payments by status, oldest/newest first
+        Index("ix_payments_status_created_at", "status", "created_at"),
+        # A user's payments, optionally narrowed by status
+        Index("ix_payments_user_id_status", "user_id", "status"),
+        # Stats rollup: revenue per day and rows changed since the last watermark
+        Index("ix_payments_status_completed_at", "status", "completed_at"),
+        Index("ix_payments_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -15,6 +15,10 @@ class ScheduledMessage(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     created_by = Column(Integer, ForeignKey("admins.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_sent_at = Column(DateTime)  # UTC occurrence last claimed by the dispatcher
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
 
     # Relationships
     admin = relationship("Admin", back_populates="scheduled_messages")
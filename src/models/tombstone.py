@@ -0,0 +1,64 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, event, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from .base import Base
+
+# Tables incremental backups leave out: derived data and this bookkeeping itself
+UNTRACKED_TABLES = frozenset({"daily_stats", "rollup_watermarks", "tombstones"})
+
+
+class Tombstone(Base):
+    """A deleted row, so incremental backups can replay the deletion"""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_deleted_at", "deleted_at"),)
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(String, nullable=False)  # Primary key of the deleted row
+    deleted_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
+def _tracked(table) -> bool:
+    return table is not None and table.name not in UNTRACKED_TABLES and len(table.primary_key.columns) == 1
+
+
+@event.listens_for(Session, "before_flush")
+def _record_deleted_objects(session, flush_context, instances):
+    """session.delete(obj) -> tombstone written in the same flush"""
+    now = datetime.datetime.utcnow()
+    for obj in session.deleted:
+        table = getattr(type(obj), "__table__", None)
+        identity = inspect(obj).identity
+        if _tracked(table) and identity:
+            session.add(Tombstone(table_name=table.name, row_id=str(identity[0]), deleted_at=now))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_deletes(orm_execute_state):
+    """delete(Model).where(...) -> tombstones for the rows it is about to remove.
+
+    Statements executed with ``execution_options(tombstones=False)`` (restores
+    wiping a table) are left alone.
+    """
+    if not orm_execute_state.is_delete or not orm_execute_state.execution_options.get("tombstones", True):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if not _tracked(table):
+        return
+
+    key = next(iter(table.primary_key.columns))
+    query = select(key)
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+    session = orm_execute_state.session
+    now = datetime.datetime.utcnow()
+    rows = [
+        {"table_name": table.name, "row_id": str(row_id), "deleted_at": now}
+        for row_id in session.execute(query).scalars()
+    ]
+    if rows:
+        session.execute(insert(Tombstone), rows)
@@ -1,17 +1,35 @@
 import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import relationship, validates
 
 from .base import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Range scan used by the expiry sweeper
+        Index("ix_users_status_expiracao", "status_assinatura", "data_expiracao"),
+        Index("ix_users_username", "username"),
+        # /kick, /ban, /mute... resolve their target case-insensitively
+        Index("ix_users_username_lower", "username_lower"),
+        # Stats rollup: sign-ups per day and rows changed since the last watermark
+        Index("ix_users_created_at", "created_at"),
+        Index("ix_users_updated_at", "updated_at"),
+        # Timed mutes loaded by the mute service; only muted rows are indexed
+        Index(
+            "ix_users_muted_until",
+            "mute_until",
+            sqlite_where=text("is_muted = 1"),
+            postgresql_where=text("is_muted"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(String, unique=True, nullable=True)
     username = Column(String)
+    username_lower = Column(String)  # Normalized copy of username, kept in sync by the validator below
     first_name = Column(String)
     last_name = Column(String)
     status_assinatura = Column(String, default="inactive")  # active, inactive, expired
@@ -21,6 +39,7 @@ class User(Base):
     mute_until = Column(DateTime)
     warn_count = Column(Integer, default=0)
     auto_renew = Column(Boolean, default=True)
+    blocked_bot_at = Column(DateTime)  # Set when a DM fails with Forbidden; skipped by DM campaigns
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(
         DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
@@ -30,3 +49,8 @@ class User(Base):
     payments = relationship("Payment", back_populates="user")
     group_memberships = relationship("GroupMembership", back_populates="user")
     warnings = relationship("Warning", back_populates="user")
+
+    @validates("username")
+    def _sync_username_lower(self, key, value):
+        self.username_lower = value.lower() if value else None
+        return value
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -8,12 +8,20 @@ from .base import Base
 
 class Warning(Base):
     __tablename__ = "warnings"
+    __table_args__ = (
+        Index("ix_warnings_user_id", "user_id"),
+        # Incremental backups export rows changed since the previous one
+        Index("ix_warnings_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
     reason = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
 
     # Relationships
     user = relationship("User", back_populates="warnings")
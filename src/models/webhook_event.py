@@ -0,0 +1,25 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, UniqueConstraint
+
+from .base import Base
+
+
+class WebhookEvent(Base):
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # One row per (bankTxId, status) transition: replays of the same event are rejected
+        UniqueConstraint("bank_tx_id", "status", name="uq_webhook_events_bank_tx_status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    bank_tx_id = Column(String, nullable=False)
+    qr_id = Column(String)
+    status = Column(String, nullable=False)  # pending, depix_sent, under_review, canceled, error, refunded, expired
+    value_in_cents = Column(Integer)
+    payment_id = Column(Integer)  # payments.id settled by this event, if any
+    payload = Column(Text)
+    received_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from models.admin import Admin
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Admin.permissions values, lowest to highest
+PERMISSION_LEVELS = {"basic": 1, "advanced": 2, "super": 3}
+
+
+@dataclass(frozen=True)
+class CachedAdmin:
+    """Immutable snapshot of an Admin row"""
+
+    id: int
+    telegram_id: str
+    username: Optional[str]
+    permissions: str
+
+    def has_permission(self, level: str) -> bool:
+        """True if this admin's permission level is at least `level`"""
+        return PERMISSION_LEVELS.get(self.permissions, 1) >= PERMISSION_LEVELS[level]
+
+
+class AdminCache:
+    """In-process copy of the admins table keyed by telegram_id.
+
+    Lookups are dict hits. Freshness is checked at most every
+    ``check_interval`` seconds with a one-row version stamp
+    (count, max id, max updated_at), so inserts, deletes and updates made
+    by other processes or directly in the database are picked up without
+    reloading the table on every command. ``invalidate()`` forces a reload
+    after in-process writes (/addadmin, restore), and the whole table is
+    reloaded every ``reload_interval`` seconds as a backstop for raw edits
+    that do not touch ``updated_at``.
+    """
+
+    def __init__(self, database: Database, check_interval: float = 5, reload_interval: float = 300):
+        self.database = database
+        self.check_interval = check_interval
+        self.reload_interval = reload_interval
+        self.version = 0  # Bumped on every reload
+        self._admins: Dict[str, CachedAdmin] = {}
+        self._stamp: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Drop the cached stamp so the next lookup reloads the table"""
+        self._stamp = None
+        self._checked_at = 0.0
+
+    async def refresh(self):
+        """Reload the table if the version stamp changed (rate limited by check_interval)"""
+        if self._stamp is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._stamp is not None and now - self._checked_at < self.check_interval:
+                return
+            async with self.database.session_scope() as session:
+                stamp = tuple((await session.execute(
+                    select(func.count(Admin.id), func.max(Admin.id), func.max(Admin.updated_at))
+                )).one())
+                if stamp != self._stamp or now - self._loaded_at >= self.reload_interval:
+                    rows = (await session.execute(
+                        select(Admin.id, Admin.telegram_id, Admin.username, Admin.permissions)
+                    )).all()
+                    self._admins = {
+                        str(row.telegram_id): CachedAdmin(
+                            id=row.id,
+                            telegram_id=str(row.telegram_id),
+                            username=row.username,
+                            permissions=row.permissions or "basic",
+                        )
+                        for row in rows
+                    }
+                    self._loaded_at = now
+                    self.version += 1
+                    logger.debug("Admin cache reloaded (%d admins, version %d)", len(self._admins), self.version)
+            self._stamp = stamp
+            self._checked_at = now
+
+    async def get(self, telegram_id) -> Optional[CachedAdmin]:
+        """Admin with this Telegram id, or None"""
+        await self.refresh()
+        return self._admins.get(str(telegram_id))
+
+    def lookup(self, telegram_id) -> Optional[CachedAdmin]:
+        """Admin from the current snapshot, without a freshness check"""
+        return self._admins.get(str(telegram_id))
+
+    async def is_admin(self, telegram_id) -> bool:
+        return await self.get(telegram_id) is not None
+
+    async def count(self) -> int:
+        await self.refresh()
+        return len(self._admins)
+
+    async def all(self) -> List[CachedAdmin]:
+        await self.refresh()
+        return list(self._admins.values())
+
+
+def admin_required(handler=None, *, level: Optional[str] = None, private_only: bool = True):
+    """Decorator for handler methods that only admins may run.
+
+    Uses ``self.admins`` (an AdminCache), so authorization costs no
+    database round trip. Works for commands and for callback queries. Also enforces FR-004 (admin commands only in the
+    private chat with the bot) unless ``private_only=False``. Inside the
+    handler, ``self.admins.lookup(user.id)`` returns the caller's admin.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+            user = update.effective_user
+            query = update.callback_query
+            message = update.message or (query.message if query else None)
+            chat = update.effective_chat
+
+            if not user or not message or not chat:
+                return
+
+            async def deny(text: str):
+                # Button presses get an alert instead of a new chat message
+                if query:
+                    await query.answer(text, show_alert=True)
+                else:
+                    await message.reply_text(text)
+
+            admin = await self.admins.get(user.id)
+            if not admin:
+                await deny("Acesso negado. Você não é um administrador.")
+                return
+
+            if level and not admin.has_permission(level):
+                await deny(f"Acesso negado. Este comando exige permissão {level}.")
+                return
+
+            # FR-004: Restrict admin commands to private chat only
+            if private_only and chat.type != "private":
+                await deny("❌ Comandos administrativos só podem ser executados no chat privado com o bot.")
+                return
+
+            return await func(self, update, context)
+
+        return wrapper
+
+    if handler is not None:
+        return decorator(handler)
+    return decorator
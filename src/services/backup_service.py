@@ -0,0 +1,403 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from sqlalchemy import Table, delete, select
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from models.base import Base
+from models.tombstone import UNTRACKED_TABLES, Tombstone
+from utils.database import Database
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BACKUP_FORMAT = "botclient-backup"
+BACKUP_VERSION = "2.0"
+MANIFEST_NAME = "manifest.json"
+
+# File suffix of each supported compression
+EXTENSIONS = {
+    "gzip": ".ndjson.gz",
+    "zstd": ".ndjson.zst",
+}
+
+
+def backup_tables() -> List[Table]:
+    """Every mapped table, parents before children"""
+    return list(Base.metadata.sorted_tables)
+
+
+def delta_tables() -> List[Table]:
+    """Tables incremental backups carry, parents before children"""
+    return [table for table in backup_tables() if table.name not in UNTRACKED_TABLES]
+
+
+def _encode(value):
+    """JSON fallback for column types json does not know"""
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _line(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_encode).encode("utf-8") + b"\n"
+
+
+class BackupService:
+    """Streaming backup writer, also usable as a scheduled job with rotating local files.
+
+    A backup is newline-delimited JSON in a gzip (or zstd, when the
+    ``zstandard`` package is installed) stream: a header line, then for each
+    table a ``{"table": ..., "columns": [...]}`` line followed by one JSON
+    array per row, and a trailer with the row counts so truncated files are
+    detected. Rows are read with ``yield_per`` in a single read transaction
+    and compressed off the event loop, so memory stays bounded by one batch
+    whatever the size of the database.
+
+    Scheduled backups form chains recorded in ``manifest.json``: a full
+    backup followed by deltas. A delta holds the rows whose ``updated_at``
+    moved since its parent's watermark (minus an overlap for transactions
+    still open at that point) and, before them, ``{"deleted": ...}``
+    sections listing the primary keys of rows deleted since then, taken from
+    the tombstones table. Replaying a full backup and its deltas in order
+    rebuilds the database as of the last delta.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        directory: str = "backups",
+        keep: int = 7,
+        interval: float = 86400,
+        delta_interval: float = 0,
+        compression: str = "gzip",
+        batch_size: int = 1000,
+        overlap: float = 60,
+    ):
+        """
+        Initialize the backup service
+
+        Args:
+            database: Database to export
+            directory: Where scheduled backups and their manifest are written
+            keep: Full backups (with their deltas) kept in `directory`; older chains are deleted
+            interval: Seconds between scheduled full backups
+            delta_interval: Seconds between scheduled deltas (0 = full backups only)
+            compression: "gzip" or "zstd" (falls back to gzip without zstandard)
+            batch_size: Rows fetched and written per batch
+            overlap: Seconds a delta reaches back before its parent's watermark
+        """
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unsupported backup compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; writing gzip backups instead")
+            compression = "gzip"
+
+        self.database = database
+        self.directory = Path(directory)
+        self.keep = keep
+        self.interval = interval
+        self.delta_interval = delta_interval
+        self.compression = compression
+        self.batch_size = batch_size
+        self.overlap = timedelta(seconds=overlap)
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.backups = 0
+        self.deltas = 0
+        self.failures = 0
+        self.last_rows = 0
+        self.last_size = 0
+        self.last_duration = 0.0
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.compression]
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_NAME
+
+    def _open(self, path: Path) -> BinaryIO:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+        return gzip.open(path, "wb", compresslevel=6)
+
+    async def export(self, path: Path, since: Optional[datetime] = None, **header) -> Dict[str, Any]:
+        """
+        Write a backup to `path`: full, or only what changed since `since`.
+
+        Extra keyword arguments go into the header. Returns the header as
+        written (with its ``watermark``) plus the trailer's ``counts`` and
+        ``deleted`` row counts.
+        """
+        tables = backup_tables() if since is None else delta_tables()
+        counts: Dict[str, int] = {}
+        deleted: Dict[str, int] = {}
+        watermark = datetime.utcnow()  # Taken before the read transaction starts
+        header = {
+            "format": BACKUP_FORMAT,
+            "version": BACKUP_VERSION,
+            "kind": "full" if since is None else "delta",
+            "backup_timestamp": watermark.isoformat(),
+            "watermark": watermark.isoformat(),
+            "since": since.isoformat() if since else None,
+            "tables": [table.name for table in tables],
+            **header,
+        }
+
+        stream = await asyncio.to_thread(self._open, path)
+        try:
+            await asyncio.to_thread(stream.write, _line(header))
+
+            # One session: every table comes from the same read transaction
+            async with self.database.session_scope(detached=True) as session:
+                if since is not None:
+                    deleted = await self._write_tombstones(session, stream, since, tables)
+
+                for table in tables:
+                    columns = [column.name for column in table.columns]
+                    await asyncio.to_thread(stream.write, _line({"table": table.name, "columns": columns}))
+                    counts[table.name] = 0
+
+                    query = select(table).order_by(*table.primary_key.columns)
+                    if since is not None and "updated_at" in table.columns:
+                        query = query.where(table.c.updated_at >= since)
+                    result = await session.stream(query.execution_options(yield_per=self.batch_size))
+                    async for rows in result.partitions():
+                        chunk = b"".join(_line(list(row)) for row in rows)
+                        await asyncio.to_thread(stream.write, chunk)
+                        counts[table.name] += len(rows)
+
+            await asyncio.to_thread(stream.write, _line({"end": True, "counts": counts, "deleted": deleted}))
+        finally:
+            await asyncio.to_thread(stream.close)
+        return {**header, "counts": counts, "deleted": deleted}
+
+    async def _write_tombstones(self, session, stream, since: datetime, tables: List[Table]) -> Dict[str, int]:
+        """One "deleted" section per table with rows deleted since `since`. Returns the counts."""
+        deleted: Dict[str, int] = {}
+        for table in tables:
+            key = next(iter(table.primary_key.columns))
+            result = await session.stream(
+                select(Tombstone.row_id)
+                .where(Tombstone.table_name == table.name, Tombstone.deleted_at >= since)
+                .order_by(Tombstone.id)
+                .execution_options(yield_per=self.batch_size)
+            )
+            async for rows in result.partitions():
+                if table.name not in deleted:
+                    await asyncio.to_thread(stream.write, _line({"deleted": table.name, "columns": [key.name]}))
+                    deleted[table.name] = 0
+                await asyncio.to_thread(stream.write, b"".join(_line([row_id]) for row_id, in rows))
+                deleted[table.name] += len(rows)
+        return deleted
+
+    async def _write(self, directory: Path, prefix: str, since: Optional[datetime] = None, **header) -> Dict[str, Any]:
+        """Export into a new timestamped file of `directory`. Returns the export info plus its `path`."""
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{prefix}_{datetime.utcnow():%Y%m%d_%H%M%S}"
+        path = directory / f"{stem}{self.extension}"
+        suffix = 1
+        while path.exists():
+            path = directory / f"{stem}-{suffix}{self.extension}"
+            suffix += 1
+        partial = path.with_name(path.name + ".part")
+
+        started = time.monotonic()
+        try:
+            info = await self.export(partial, since=since, id=path.name[: -len(self.extension)], **header)
+            os.replace(partial, path)
+        except BaseException:
+            self.failures += 1
+            partial.unlink(missing_ok=True)
+            raise
+
+        self.last_rows = sum(info["counts"].values()) + sum(info["deleted"].values())
+        self.last_size = path.stat().st_size
+        self.last_duration = time.monotonic() - started
+        logger.info(
+            "Backup %s written: %d rows, %d bytes in %.2fs",
+            path.name, self.last_rows, self.last_size, self.last_duration,
+        )
+        return {**info, "path": path}
+
+    async def create(self, directory: Optional[Path] = None) -> Path:
+        """
+        Write a timestamped full backup.
+
+        Into `directory` when given (a one-off file, outside any chain);
+        otherwise into the configured directory, starting a new chain.
+        """
+        if directory is not None:
+            info = await self._write(Path(directory), "backup")
+        else:
+            info = await self._write(self.directory, "backup")
+            manifest = self.load_manifest()
+            manifest["backups"].append(self._entry(info, base=info["id"]))
+            manifest["needs_full"] = False
+            self.save_manifest(manifest)
+        self.backups += 1
+        return info["path"]
+
+    async def create_delta(self) -> Optional[Path]:
+        """Write a delta on top of the newest backup of the chain. None when a full backup is due instead."""
+        manifest = self.load_manifest()
+        if manifest["needs_full"] or not manifest["backups"]:
+            return None
+        parent = manifest["backups"][-1]
+        since = datetime.fromisoformat(parent["watermark"]) - self.overlap
+        info = await self._write(self.directory, "delta", since=since, parent=parent["id"], base=parent["base"])
+        manifest["backups"].append(self._entry(info, base=parent["base"], parent=parent["id"]))
+        self.save_manifest(manifest)
+        self.deltas += 1
+        return info["path"]
+
+    @staticmethod
+    def _entry(info: Dict[str, Any], base: str, parent: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": info["id"],
+            "file": info["path"].name,
+            "kind": info["kind"],
+            "base": base,
+            "parent": parent,
+            "since": info["since"],
+            "watermark": info["watermark"],
+            "rows": sum(info["counts"].values()),
+            "deleted": sum(info["deleted"].values()),
+            "size": info["path"].stat().st_size,
+        }
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Backups of the configured directory, oldest first"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"needs_full": False, "backups": []}
+
+    def save_manifest(self, manifest: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.manifest_path.with_name(MANIFEST_NAME + ".part")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(partial, self.manifest_path)
+
+    def mark_chain_broken(self):
+        """The database was replaced (restore): the next scheduled backup must be a full one"""
+        if not self.manifest_path.exists():
+            return
+        manifest = self.load_manifest()
+        manifest["needs_full"] = True
+        self.save_manifest(manifest)
+
+    def chain(self) -> List[Path]:
+        """Files to replay, in order, to rebuild the newest state: the last full backup and its deltas"""
+        entries = self.load_manifest()["backups"]
+        fulls = [entry for entry in entries if entry["kind"] == "full"]
+        if not fulls:
+            return []
+        base = fulls[-1]["id"]
+        return [self.directory / entry["file"] for entry in entries if entry["base"] == base]
+
+    async def run_once(self) -> Path:
+        """Write whatever the schedule calls for: a full backup when one is due, a delta otherwise"""
+        manifest = self.load_manifest()
+        fulls = [entry for entry in manifest["backups"] if entry["kind"] == "full"]
+        due = (
+            not fulls
+            or manifest["needs_full"]
+            or not self.delta_interval
+            or datetime.utcnow() - datetime.fromisoformat(fulls[-1]["watermark"]) >= timedelta(seconds=self.interval)
+        )
+        path = None if due else await self.create_delta()
+        if path is None:
+            path = await self.create()
+            removed = await self.rotate()
+            if removed:
+                logger.info("Rotated %d old backup files", len(removed))
+        return path
+
+    async def rotate(self) -> List[Path]:
+        """
+        Delete chains beyond the newest `keep` full backups. Returns the removed files.
+
+        Tombstones older than every kept chain are no longer needed and are
+        purged as well.
+        """
+        manifest = self.load_manifest()
+        fulls = [entry for entry in manifest["backups"] if entry["kind"] == "full"]
+        if self.keep <= 0 or len(fulls) <= self.keep:
+            return []
+        kept_bases = {entry["id"] for entry in fulls[-self.keep:]}
+
+        removed = []
+        for entry in manifest["backups"]:
+            if entry["base"] not in kept_bases:
+                path = self.directory / entry["file"]
+                path.unlink(missing_ok=True)
+                removed.append(path)
+        manifest["backups"] = [entry for entry in manifest["backups"] if entry["base"] in kept_bases]
+        self.save_manifest(manifest)
+
+        oldest = datetime.fromisoformat(fulls[-self.keep]["watermark"]) - self.overlap
+        async with self.database.session_scope(detached=True) as session:
+            await session.execute(delete(Tombstone).where(Tombstone.deleted_at < oldest))
+            await session.commit()
+        return removed
+
+    async def start(self):
+        """Start the scheduled backup task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                "Backup schedule started - writing to %s (full every %s seconds, deltas every %s seconds)",
+                self.directory, self.interval, self.delta_interval or "-",
+            )
+
+    async def stop(self):
+        """Stop the scheduled backup task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Backup schedule stopped")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Error writing scheduled backup: %s", e)
+            await asyncio.sleep(self.delta_interval or self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of the backup service"""
+        return {
+            "backups": self.backups,
+            "deltas": self.deltas,
+            "failures": self.failures,
+            "last_rows": self.last_rows,
+            "last_size": self.last_size,
+            "last_duration": self.last_duration,
+        }
@@ -0,0 +1,329 @@
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import func, select, update
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from models.broadcast_job import BroadcastJob
+from models.group import Group
+from models.user import User
+from utils.database import Database
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Job states that still have work left (resumed on startup)
+RESUMABLE_STATUSES = ("pending", "running")
+
+# Audiences of /broadcast --dm
+DM_AUDIENCES = ("active", "expired", "all")
+
+
+class BroadcastService:
+    """Background broadcast engine with Telegram-safe rate limits.
+
+    Each /broadcast becomes a persisted BroadcastJob targeting either every
+    Group (``groups``) or the private chats of subscribers (``dm:active``,
+    ``dm:expired``, ``dm:all``). Targets are streamed in keyset-paginated
+    batches after ``job.cursor`` (never loaded all at once) and sent concurrently
+    through a global token bucket (~30 msg/s) plus a per-group bucket
+    (20 msg/min). ``RetryAfter`` pauses the global bucket for the time
+    Telegram asks for. The cursor and counters are saved after every
+    batch, so a restart resumes the job re-sending at most one batch, and
+    a single progress message in the admin chat is edited with live counts.
+    Users whose DM fails with ``Forbidden`` get ``blocked_bot_at`` set and
+    are skipped by later campaigns.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        bot: Any = None,
+        global_rate: float = 30,
+        group_rate_per_minute: float = 20,
+        batch_size: int = 30,
+        max_retries: int = 3,
+        progress_interval: float = 3,
+    ):
+        """
+        Initialize the broadcast engine
+
+        Args:
+            database: Database used to open a session per batch
+            bot: Telegram bot used to send and edit messages
+            global_rate: Maximum messages per second across all chats
+            group_rate_per_minute: Maximum messages per minute to one group
+            batch_size: Targets loaded and sent per batch
+            max_retries: Attempts per target after RetryAfter
+            progress_interval: Seconds between progress message edits
+        """
+        self.database = database
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate)
+        self.group_rate = group_rate_per_minute / 60
+        self.group_capacity = group_rate_per_minute
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self._group_buckets: Dict[int, TokenBucket] = {}
+        self._jobs: Dict[int, asyncio.Task] = {}
+
+        # Metrics
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.retry_after_hits = 0
+
+    async def start(self):
+        """Resume every job interrupted by the last shutdown"""
+        async with self.database.session_scope(detached=True) as session:
+            job_ids = (await session.scalars(
+                select(BroadcastJob.id)
+                .filter(BroadcastJob.status.in_(RESUMABLE_STATUSES))
+                .order_by(BroadcastJob.id)
+            )).all()
+        for job_id in job_ids:
+            self._spawn(job_id)
+        logger.info("Broadcast service started - %d jobs resumed", len(job_ids))
+
+    async def stop(self):
+        """Cancel running jobs; they stay resumable in the database"""
+        tasks = list(self._jobs.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Broadcast service stopped")
+
+    def submit(self, job_id: int):
+        """Run a committed BroadcastJob in the background"""
+        self._spawn(job_id)
+
+    def _spawn(self, job_id: int):
+        if job_id in self._jobs:
+            return
+        # Fresh context: the job is not part of the update that submitted it (session, trace, query attribution)
+        task = asyncio.create_task(self._run_job(job_id), context=contextvars.Context())
+        self._jobs[job_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(job_id, None))
+
+    def active_jobs(self) -> List[int]:
+        """Ids of the jobs running in this process"""
+        return list(self._jobs)
+
+    @staticmethod
+    def _dm_filters(target: str) -> list:
+        """WHERE clauses selecting the users of a dm:<audience> target"""
+        audience = target.split(":", 1)[1]
+        if audience not in DM_AUDIENCES:
+            raise ValueError(f"Unknown DM audience: {audience}")
+        filters = [
+            User.telegram_id.isnot(None),
+            User.blocked_bot_at.is_(None),
+            User.is_banned.isnot(True),
+        ]
+        if audience != "all":
+            filters.append(User.status_assinatura == audience)
+        return filters
+
+    async def _count_targets(self, session, target: str) -> int:
+        if target.startswith("dm:"):
+            return await session.scalar(
+                select(func.count()).select_from(User).filter(*self._dm_filters(target))
+            )
+        return await session.scalar(select(func.count()).select_from(Group))
+
+    async def _load_targets(self, session, target: str, after_id: int) -> List[Tuple[int, int]]:
+        """Next batch of (id, chat_id) after the cursor"""
+        if target.startswith("dm:"):
+            query = (
+                select(User.id, User.telegram_id)
+                .filter(User.id > after_id, *self._dm_filters(target))
+                .order_by(User.id)
+            )
+        else:
+            query = (
+                select(Group.id, Group.telegram_group_id)
+                .filter(Group.id > after_id)
+                .order_by(Group.id)
+            )
+        rows = (await session.execute(query.limit(self.batch_size))).all()
+        return [(row_id, int(chat_id)) for row_id, chat_id in rows]
+
+    async def _mark_blocked(self, session, user_ids: List[int]):
+        """Flag users that blocked the bot so later DM campaigns skip them"""
+        await session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(blocked_bot_at=datetime.utcnow())
+        )
+
+    async def _run_job(self, job_id: int):
+        async with self.database.session_scope(detached=True) as session:
+            job = await session.get(BroadcastJob, job_id)
+            if not job or job.status not in RESUMABLE_STATUSES:
+                return
+            if job.status == "pending":
+                job.total = await self._count_targets(session, job.target)
+                job.started_at = datetime.utcnow()
+            job.status = "running"
+            await session.commit()
+            progress = {
+                "id": job.id,
+                "text": f"📢 **Mensagem do Administrador**\n\n{job.message}",
+                "target": job.target,
+                "cursor": job.cursor,
+                "total": job.total or 0,
+                "sent": job.sent or 0,
+                "failed": job.failed or 0,
+                "blocked": job.blocked or 0,
+                "chat_id": job.progress_chat_id,
+                "message_id": job.progress_message_id,
+            }
+
+        logger.info("Broadcast job %s running (%s targets, cursor %s)", job_id, progress["total"], progress["cursor"])
+        reporter = asyncio.create_task(self._report_progress(progress))
+        status = "failed"
+        try:
+            while True:
+                async with self.database.session_scope(detached=True) as session:
+                    batch = await self._load_targets(session, progress["target"], progress["cursor"])
+                if not batch:
+                    status = "completed"
+                    break
+
+                results = await asyncio.gather(*(self._send(chat_id, progress["text"]) for _, chat_id in batch))
+                progress["cursor"] = batch[-1][0]
+                progress["sent"] += sum(1 for result in results if result == "sent")
+                progress["failed"] += sum(1 for result in results if result != "sent")
+                blocked = []
+                if progress["target"].startswith("dm:"):
+                    blocked = [row_id for (row_id, _), result in zip(batch, results) if result == "blocked"]
+                    progress["blocked"] += len(blocked)
+
+                async with self.database.session_scope(detached=True) as session:
+                    if blocked:
+                        await self._mark_blocked(session, blocked)
+                    await session.execute(
+                        update(BroadcastJob)
+                        .where(BroadcastJob.id == job_id)
+                        .values(
+                            cursor=progress["cursor"],
+                            sent=progress["sent"],
+                            failed=progress["failed"],
+                            blocked=progress["blocked"],
+                        )
+                    )
+                    await session.commit()
+        except asyncio.CancelledError:
+            status = None  # Shutdown: left "running" to be resumed
+            raise
+        except Exception as e:
+            logger.error("Broadcast job %s failed: %s", job_id, e)
+        finally:
+            reporter.cancel()
+            if status:
+                async with self.database.session_scope(detached=True) as session:
+                    await session.execute(
+                        update(BroadcastJob)
+                        .where(BroadcastJob.id == job_id)
+                        .values(status=status, finished_at=datetime.utcnow())
+                    )
+                    await session.commit()
+                await self._edit_progress(progress, status)
+                logger.info(
+                    "Broadcast job %s %s: %d sent, %d failed",
+                    job_id, status, progress["sent"], progress["failed"],
+                )
+
+    def _group_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._group_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._group_buckets[chat_id] = TokenBucket(self.group_rate, capacity=self.group_capacity)
+        return bucket
+
+    async def _send(self, chat_id: int, text: str) -> str:
+        """Send one message. Returns "sent", "blocked" or "failed"."""
+        for _ in range(self.max_retries):
+            if chat_id < 0:
+                await self._group_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                self.messages_sent += 1
+                return "sent"
+            except RetryAfter as e:
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                self.retry_after_hits += 1
+                self.global_bucket.pause(float(delay))
+                logger.warning("Broadcast hit flood control, pausing %ss", delay)
+            except Forbidden:
+                self.messages_failed += 1
+                return "blocked"
+            except TelegramError as e:
+                logger.error(f"Failed to send broadcast to {chat_id}: {e}")
+                break
+        self.messages_failed += 1
+        return "failed"
+
+    def _progress_text(self, progress: Dict[str, Any], status: str) -> str:
+        labels = {
+            "running": "⏳ Em andamento",
+            "completed": "✅ Concluído",
+            "failed": "❌ Interrompido por erro",
+        }
+        done = progress["sent"] + progress["failed"]
+        audience = {
+            "groups": "grupos",
+            "dm:active": "assinantes ativos",
+            "dm:expired": "assinantes expirados",
+            "dm:all": "todos os usuários",
+        }.get(progress["target"], progress["target"])
+        text = (
+            f"📢 Broadcast #{progress['id']} ({audience})\n\n"
+            f"Status: {labels.get(status, status)}\n"
+            f"Progresso: {done}/{progress['total']}\n"
+            f"✅ Enviadas: {progress['sent']}\n"
+            f"❌ Falhas: {progress['failed']}"
+        )
+        if progress["blocked"]:
+            text += f"\n🚫 Bloquearam o bot: {progress['blocked']}"
+        return text
+
+    async def _edit_progress(self, progress: Dict[str, Any], status: str):
+        if not self.bot or not progress["chat_id"] or not progress["message_id"]:
+            return
+        try:
+            await self.bot.edit_message_text(
+                chat_id=int(progress["chat_id"]),
+                message_id=progress["message_id"],
+                text=self._progress_text(progress, status),
+            )
+        except BadRequest as e:
+            # "Message is not modified" when nothing changed since the last edit
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Failed to edit broadcast progress: {e}")
+        except TelegramError as e:
+            logger.warning(f"Failed to edit broadcast progress: {e}")
+
+    async def _report_progress(self, progress: Dict[str, Any]):
+        last = None
+        while True:
+            current = (progress["sent"], progress["failed"])
+            if current != last:
+                await self._edit_progress(progress, "running")
+                last = current
+            await asyncio.sleep(self.progress_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of the broadcast engine"""
+        return {
+            "active_jobs": len(self._jobs),
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+            "retry_after_hits": self.retry_after_hits,
+        }
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, insert, select, update
+
+from models.admin import Admin
+from models.churn_event import ChurnEvent
+from models.group import Group, GroupMembership
+from models.user import User
+from services.telegram_service import TelegramService
+from utils.database import Database
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Chat member statuses meaning the user is no longer in the group
+REMOVED_STATUSES = {"left", "kicked"}
+
+
+class ExpirySweeper:
+    """Scheduled job that expires lapsed subscriptions and removes the users from their groups.
+
+    Every sweep first flips ``active`` users whose ``data_expiracao`` has
+    passed to ``expired`` in one bulk UPDATE, recording a ChurnEvent for
+    each of them in the same transaction. The group memberships of
+    expired users then act as a durable work queue: each batch is marked
+    with ``kick_started_at`` before any Bot API call and deleted once the
+    kick succeeded. After a crash, marked memberships are verified with
+    ``get_chat_member`` first, so nobody is kicked twice or skipped.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        telegram_service: TelegramService,
+        check_interval: float = 300,
+        concurrency: int = 5,
+        rate_limit: float = 20,
+        batch_size: int = 200,
+    ):
+        """
+        Initialize the sweeper
+
+        Args:
+            database: Database used to open a session per step
+            telegram_service: Service used to kick users from Telegram groups
+            check_interval: Seconds between sweeps
+            concurrency: Maximum simultaneous kicks
+            rate_limit: Maximum Bot API calls per second (a kick costs two)
+            batch_size: Memberships processed per batch
+        """
+        self.database = database
+        self.telegram = telegram_service
+        self.check_interval = check_interval
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.rate_limiter = TokenBucket(rate_limit, capacity=max(rate_limit, 2))
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.sweeps = 0
+        self.expired = 0
+        self.kicked = 0
+        self.kick_failures = 0
+        self.last_sweep_duration = 0.0
+
+    async def start(self):
+        """Start the sweeping task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Expiry sweeper started - sweeping every %s seconds", self.check_interval)
+
+    async def stop(self):
+        """Stop the sweeping task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Expiry sweeper stopped")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Error sweeping expired subscriptions: %s", e)
+            await asyncio.sleep(self.check_interval)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Run one full sweep. Returns how many users expired and memberships were removed."""
+        started = time.monotonic()
+        expired = await self.expire_due_users()
+        removed = await self.remove_expired_members()
+        self.sweeps += 1
+        self.last_sweep_duration = time.monotonic() - started
+        if expired or removed:
+            logger.info(
+                "Expiry sweep: %d subscriptions expired, %d memberships removed in %.2fs",
+                expired, removed, self.last_sweep_duration,
+            )
+        return {"expired": expired, "removed": removed}
+
+    async def expire_due_users(self) -> int:
+        """Flip every lapsed active subscription to expired in a single UPDATE, recording the churn"""
+        now = datetime.utcnow()
+        async with self.database.session_scope() as session:
+            lapsed = (await session.execute(
+                update(User)
+                .where(
+                    User.status_assinatura == "active",
+                    User.data_expiracao.isnot(None),
+                    User.data_expiracao <= now,
+                )
+                .values(status_assinatura="expired")
+                .returning(User.id, User.data_expiracao)
+                .execution_options(synchronize_session=False)
+            )).all()
+            if lapsed:
+                await session.execute(
+                    insert(ChurnEvent),
+                    [{"user_id": user_id, "lapsed_at": lapsed_at, "updated_at": now} for user_id, lapsed_at in lapsed],
+                )
+            await session.commit()
+        self.expired += len(lapsed)
+        return len(lapsed)
+
+    async def remove_expired_members(self) -> int:
+        """Kick expired users from every group they are registered in"""
+        removed = 0
+        last_id = 0
+        while True:
+            batch = await self._claim_batch(last_id)
+            if not batch:
+                return removed
+            last_id = batch[-1]["id"]
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def remove(membership: Dict[str, Any]) -> bool:
+                async with semaphore:
+                    try:
+                        return await self._remove_member(membership)
+                    except Exception as e:
+                        logger.error("Failed to remove membership %s: %s", membership["id"], e)
+                        self.kick_failures += 1
+                        return False
+
+            results = await asyncio.gather(*(remove(m) for m in batch))
+            done = [m["id"] for m, ok in zip(batch, results) if ok]
+            if done:
+                async with self.database.session_scope() as session:
+                    await session.execute(delete(GroupMembership).where(GroupMembership.id.in_(done)))
+                    await session.commit()
+            removed += len(done)
+
+    async def _claim_batch(self, after_id: int) -> List[Dict[str, Any]]:
+        """Next memberships of expired users, marked as started before any kick"""
+        async with self.database.session_scope() as session:
+            rows = (await session.execute(
+                select(
+                    GroupMembership.id,
+                    GroupMembership.kick_started_at,
+                    User.telegram_id,
+                    Group.telegram_group_id,
+                )
+                .join(User, GroupMembership.user_id == User.id)
+                .join(Group, GroupMembership.group_id == Group.id)
+                .where(
+                    User.status_assinatura == "expired",
+                    # Admins keep their seats even if their own subscription lapsed
+                    ~exists().where(Admin.telegram_id == User.telegram_id),
+                    GroupMembership.id > after_id,
+                )
+                .order_by(GroupMembership.id)
+                .limit(self.batch_size)
+            )).all()
+
+            fresh = [row.id for row in rows if row.kick_started_at is None]
+            if fresh:
+                await session.execute(
+                    update(GroupMembership)
+                    .where(GroupMembership.id.in_(fresh))
+                    .values(kick_started_at=datetime.utcnow())
+                )
+                await session.commit()
+
+        return [
+            {
+                "id": row.id,
+                "resumed": row.kick_started_at is not None,
+                "user_id": row.telegram_id,
+                "chat_id": row.telegram_group_id,
+            }
+            for row in rows
+        ]
+
+    async def _remove_member(self, membership: Dict[str, Any]) -> bool:
+        """Kick one membership. Returns True when the user is out of the group."""
+        if not membership["user_id"]:
+            # Never linked to a Telegram account: nothing to kick
+            return True
+        chat_id = int(membership["chat_id"])
+        user_id = int(membership["user_id"])
+
+        if membership["resumed"]:
+            # A previous sweep may have kicked before crashing; check first
+            await self.rate_limiter.acquire()
+            member = await self.telegram.get_chat_member(chat_id, user_id)
+            if member is not None and member.status in REMOVED_STATUSES:
+                return True
+
+        await self.rate_limiter.acquire(2)
+        if await self.telegram.kick_chat_member(chat_id, user_id):
+            self.kicked += 1
+            return True
+
+        # Left marked: retried (after verification) on the next sweep
+        self.kick_failures += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of the sweeper"""
+        return {
+            "sweeps": self.sweeps,
+            "expired": self.expired,
+            "kicked": self.kicked,
+            "kick_failures": self.kick_failures,
+            "last_sweep_duration": self.last_sweep_duration,
+        }
@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import or_, select, update
+
+from models.group import Group
+from models.scheduled_message import ScheduledMessage
+from services.telegram_service import TelegramService
+from utils.database import Database
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class MessageScheduler:
+    """Dispatcher that sends active ScheduledMessage rows to every group at their HH:MM.
+
+    Occurrences are computed from the calendar in ``timezone_name`` (never
+    by sleeping 24h, so there is no drift) and kept in a min-heap. Each
+    occurrence is claimed with a conditional UPDATE of ``last_sent_at``
+    before fan-out, so restarts and other replicas never send it twice; an
+    occurrence missed while the bot was down is sent on startup if it is
+    at most ``catch_up`` old.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        telegram_service: TelegramService,
+        timezone_name: str = "America/Sao_Paulo",
+        rate_limit: float = 25,
+        catch_up: timedelta = timedelta(hours=6),
+        resync_interval: int = 3600,
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            database: Database used to open a session per reload/send
+            telegram_service: Service used to deliver the messages
+            timezone_name: Time zone the HH:MM of /schedule refers to
+            rate_limit: Maximum messages per second across all groups
+            catch_up: How late a missed occurrence may still be sent
+            resync_interval: Seconds between reloads from the database
+        """
+        self.database = database
+        self.telegram = telegram_service
+        self.tz = ZoneInfo(timezone_name)
+        self.rate_limiter = TokenBucket(rate_limit)
+        self.catch_up = catch_up
+        self.resync_interval = resync_interval
+        self._task: Optional[asyncio.Task] = None
+        self._heap: List[Tuple[datetime, int]] = []
+        self._timeline: Dict[int, Tuple[datetime, time]] = {}
+        self._wakeup = asyncio.Event()
+
+        # Metrics
+        self.fired = 0
+        self.delivered = 0
+        self.failed = 0
+
+    async def start(self):
+        """Load the timeline and start the dispatch task"""
+        if self._task is None:
+            await self.reload()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Message scheduler started - %d active messages", len(self._timeline))
+
+    async def stop(self):
+        """Stop the dispatch task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Message scheduler stopped")
+
+    def _occurrence(self, day: date, schedule_time: time) -> datetime:
+        """UTC (naive) instant of HH:MM local time on the given local day"""
+        local = datetime.combine(day, schedule_time, tzinfo=self.tz)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _local_date(self, instant: datetime) -> date:
+        return instant.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+
+    def next_occurrence(
+        self,
+        schedule_time: time,
+        last_sent_at: Optional[datetime],
+        created_at: Optional[datetime],
+        now: Optional[datetime] = None,
+    ) -> datetime:
+        """Next occurrence to send: today's if it was missed recently, otherwise the upcoming one"""
+        now = now or datetime.utcnow()
+        today = self._local_date(now)
+        latest = self._occurrence(today, schedule_time)
+        if latest > now:
+            latest = self._occurrence(today - timedelta(days=1), schedule_time)
+
+        # Already sent, or created after it: that occurrence was never owed
+        handled = last_sent_at or created_at
+        missed = handled is None or handled < latest
+        if missed and now - latest <= self.catch_up:
+            return latest
+        return self._occurrence(self._local_date(latest) + timedelta(days=1), schedule_time)
+
+    async def reload(self):
+        """Rebuild the timeline from the active scheduled messages"""
+        async with self.database.session_scope() as session:
+            rows = (await session.execute(
+                select(
+                    ScheduledMessage.id,
+                    ScheduledMessage.schedule_time,
+                    ScheduledMessage.last_sent_at,
+                    ScheduledMessage.created_at,
+                ).filter(ScheduledMessage.is_active == True)
+            )).all()
+
+        now = datetime.utcnow()
+        self._heap = []
+        self._timeline = {}
+        for message_id, schedule_time, last_sent_at, created_at in rows:
+            self._push(message_id, self.next_occurrence(schedule_time, last_sent_at, created_at, now), schedule_time)
+        # Re-arm the loop's timer for the new earliest occurrence
+        self._wakeup.set()
+
+    def _push(self, message_id: int, fire_at: datetime, schedule_time: time):
+        self._timeline[message_id] = (fire_at, schedule_time)
+        heapq.heappush(self._heap, (fire_at, message_id))
+
+    def next_fire(self) -> Optional[datetime]:
+        """Earliest pending occurrence, discarding entries of removed/reloaded messages"""
+        while self._heap:
+            fire_at, message_id = self._heap[0]
+            entry = self._timeline.get(message_id)
+            if entry and entry[0] == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        """Sleep until the next occurrence, then dispatch every due message"""
+        last_resync = asyncio.get_running_loop().time()
+        while True:
+            fire_at = self.next_fire()
+            timeout = float(self.resync_interval)
+            if fire_at is not None:
+                timeout = min(timeout, (fire_at - datetime.utcnow()).total_seconds())
+
+            self._wakeup.clear()
+            if timeout > 0:
+                timer = asyncio.get_running_loop().call_later(timeout, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+
+            try:
+                if asyncio.get_running_loop().time() - last_resync >= self.resync_interval:
+                    await self.reload()
+                    last_resync = asyncio.get_running_loop().time()
+                await self._dispatch_due()
+            except Exception as e:
+                logger.error("Error dispatching scheduled messages: %s", e)
+                await asyncio.sleep(1)
+
+    async def _dispatch_due(self):
+        now = datetime.utcnow()
+        while True:
+            fire_at = self.next_fire()
+            if fire_at is None or fire_at > now:
+                return
+            _, message_id = heapq.heappop(self._heap)
+            _, schedule_time = self._timeline[message_id]
+            # Schedule tomorrow's occurrence before sending today's
+            self._push(message_id, self._occurrence(self._local_date(fire_at) + timedelta(days=1), schedule_time), schedule_time)
+            await self._send(message_id, fire_at)
+
+    async def _send(self, message_id: int, occurrence: datetime):
+        """Claim one occurrence and deliver it to every group"""
+        async with self.database.session_scope() as session:
+            result = await session.execute(
+                update(ScheduledMessage)
+                .where(
+                    ScheduledMessage.id == message_id,
+                    ScheduledMessage.is_active == True,
+                    or_(ScheduledMessage.last_sent_at.is_(None), ScheduledMessage.last_sent_at < occurrence),
+                )
+                .values(last_sent_at=occurrence)
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                # Deactivated, or already sent by another instance
+                return
+            text = await session.scalar(select(ScheduledMessage.message).filter_by(id=message_id))
+            chat_ids = (await session.scalars(select(Group.telegram_group_id))).all()
+
+        async def deliver(chat_id: str) -> bool:
+            await self.rate_limiter.acquire()
+            return await self.telegram.send_message(int(chat_id), text)
+
+        results = await asyncio.gather(*(deliver(chat_id) for chat_id in chat_ids), return_exceptions=True)
+        delivered = sum(1 for ok in results if ok is True)
+        self.fired += 1
+        self.delivered += delivered
+        self.failed += len(results) - delivered
+        logger.info("Scheduled message %s sent to %d/%d groups", message_id, delivered, len(results))
@@ -0,0 +1,229 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+from utils.performance import PerformanceMonitor, performance_monitor
+from utils.query_profiler import QueryProfiler, query_profiler
+from utils.telegram_request import RESPONSE_COUNTS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "botclient"
+
+# Histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Monitor operations with a family of their own; everything else is a handler/service operation
+DB_OPERATION = "db.query"
+TELEGRAM_PREFIX = "telegram."
+
+PIXGO_CIRCUIT_STATES = ("closed", "open", "half_open")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Exposition:
+    """Prometheus text format writer: HELP/TYPE once per family, then its samples"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def family(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            self.lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None):
+        self.lines.append(f"{PREFIX}_{name}{_labels(labels or {})} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, snapshot, labels: Optional[Dict[str, Any]] = None):
+        """Histogram samples from a utils.metrics Snapshot of nanosecond durations"""
+        labels = labels or {}
+        self.family(name, "histogram", help_text)
+        bounds = {bound: int(bound * 1e9) for bound in LATENCY_BUCKETS}
+        cumulative = snapshot.cumulative(bounds.values())
+        for bound, bound_ns in bounds.items():
+            self.sample(f"{name}_bucket", cumulative[bound_ns], {**labels, "le": _number(bound)})
+        self.sample(f"{name}_bucket", snapshot.count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_sum", snapshot.total / 1e9, labels)
+        self.sample(f"{name}_count", snapshot.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """Embedded aiohttp endpoint exposing metrics in the Prometheus text format.
+
+    Every scrape reads counters and histogram buckets that are maintained as
+    work happens (PerformanceMonitor, update processor, PixGo breaker,
+    query profiler, Telegram responses); nothing is recomputed beyond summing per-thread
+    buckets, and no quantiles are computed - Prometheus derives them from
+    the histograms.
+    """
+
+    def __init__(
+        self,
+        monitor: Optional[PerformanceMonitor] = None,
+        update_processor: Any = None,
+        pixgo: Any = None,
+        profiler: Optional[QueryProfiler] = None,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        path: str = "/metrics",
+    ):
+        self.monitor = monitor or performance_monitor
+        self.update_processor = update_processor
+        self.pixgo = pixgo
+        self.profiler = profiler or query_profiler
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+
+    def build_app(self) -> web.Application:
+        """Create the aiohttp application with the metrics route"""
+        app = web.Application()
+        app.router.add_get(self.path, self.handle_metrics)
+        return app
+
+    async def start(self):
+        """Start serving metrics"""
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Metrics endpoint listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop the HTTP server"""
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+        logger.info("Metrics endpoint stopped")
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    def render(self) -> str:
+        """Current metrics in the Prometheus text exposition format"""
+        out = _Exposition()
+        self._operations(out)
+        self._update_queue(out)
+        self._pixgo(out)
+        self._handler_queries(out)
+        self._telegram_responses(out)
+        return out.render()
+
+    def _operations(self, out: _Exposition):
+        operations = sorted(self.monitor.operations())
+        # Samples of a family must be contiguous: one pass per family
+        for operation in operations:
+            if operation != DB_OPERATION and not operation.startswith(TELEGRAM_PREFIX):
+                out.histogram(
+                    "operation_duration_seconds", "Handler and service call time, awaits included.",
+                    self.monitor.snapshot(operation, window=False), {"operation": operation},
+                )
+        if DB_OPERATION in operations:
+            out.histogram(
+                "db_query_duration_seconds", "SQL statement execution time.",
+                self.monitor.snapshot(DB_OPERATION, window=False),
+            )
+        for operation in operations:
+            if operation.startswith(TELEGRAM_PREFIX):
+                out.histogram(
+                    "telegram_request_duration_seconds", "Bot API request time, by API method.",
+                    self.monitor.snapshot(operation, window=False), {"method": operation[len(TELEGRAM_PREFIX):]},
+                )
+
+        out.family("operation_errors_total", "counter", "Measured executions that raised.")
+        for operation in operations:
+            out.sample("operation_errors_total", self.monitor.errors(operation), {"operation": operation})
+
+    def _update_queue(self, out: _Exposition):
+        if self.update_processor is None:
+            return
+        stats = self.update_processor.get_stats()
+        gauges = (
+            ("update_queue_pending", "pending", "Updates running or waiting for their turn."),
+            ("update_queue_keys", "keys", "Users/chats with pending updates."),
+            ("update_queue_max_depth", "max_queue_depth", "Deepest per-user queue right now."),
+            ("updates_active", "active", "Updates being handled."),
+            ("update_workers", "worker_limit", "Concurrent update handlers allowed."),
+        )
+        for name, key, help_text in gauges:
+            out.family(name, "gauge", help_text)
+            out.sample(name, stats[key])
+        out.family("updates_processed_total", "counter", "Updates handled since start.")
+        out.sample("updates_processed_total", stats["processed"])
+
+    def _pixgo(self, out: _Exposition):
+        if self.pixgo is None:
+            return
+        stats = self.pixgo.get_stats()
+        out.family("pixgo_circuit_state", "gauge", "PixGo circuit breaker state (1 = current).")
+        for state in PIXGO_CIRCUIT_STATES:
+            out.sample("pixgo_circuit_state", int(stats["circuit_state"] == state), {"state": state})
+        out.family("pixgo_circuit_failures", "gauge", "Consecutive PixGo failures counted by the breaker.")
+        out.sample("pixgo_circuit_failures", stats["circuit_failures"])
+        out.family("pixgo_circuit_opened_total", "counter", "Times the PixGo circuit breaker tripped.")
+        out.sample("pixgo_circuit_opened_total", stats["circuit_opened"])
+        out.family("pixgo_circuit_rejected_total", "counter", "PixGo calls refused while the breaker was open.")
+        out.sample("pixgo_circuit_rejected_total", stats["circuit_rejected"])
+        self._counter_by(out, "pixgo_retries_total", "PixGo request retries.", "function", stats["retries"])
+        self._counter_by(
+            out, "pixgo_retries_exhausted_total", "PixGo requests that failed every retry.",
+            "function", stats["retries_exhausted"],
+        )
+
+    def _handler_queries(self, out: _Exposition):
+        stats = sorted(self.profiler.get_stats().items())
+        self._counter_by(
+            out, "handler_queries_total", "SQL statements issued, by handler.",
+            "handler", {handler: figures["queries"] for handler, figures in stats},
+        )
+        self._counter_by(
+            out, "handler_query_seconds_total", "Time spent in SQL statements, by handler.",
+            "handler", {handler: figures["seconds"] for handler, figures in stats},
+        )
+        self._counter_by(
+            out, "handler_slow_queries_total", "SQL statements over the slow-query threshold, by handler.",
+            "handler", {handler: figures["slow"] for handler, figures in stats},
+        )
+
+    def _telegram_responses(self, out: _Exposition):
+        responses: Iterable[Tuple[Tuple[str, str], int]] = sorted(list(RESPONSE_COUNTS.items()))
+        out.family("telegram_responses_total", "counter", "Bot API responses, by API method and HTTP status.")
+        rate_limited: Dict[str, int] = {}
+        for (method, status), count in responses:
+            out.sample("telegram_responses_total", count, {"method": method, "code": status})
+            if status == "429":
+                rate_limited[method] = count
+        self._counter_by(out, "telegram_rate_limited_total", "Bot API calls answered 429.", "method", rate_limited)
+
+    @staticmethod
+    def _counter_by(out: _Exposition, name: str, help_text: str, label: str, values: Dict[str, float]):
+        out.family(name, "counter", help_text)
+        for key, value in sorted(values.items()):
+            out.sample(name, value, {label: key})
@@ -1,38 +1,68 @@
 import asyncio
+import heapq
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 
+from models.group import Group, GroupMembership
 from models.user import User
+from services.telegram_service import TelegramService
+from utils.database import Database
 
 logger = logging.getLogger(__name__)
 
 
-class MuteService:
-    """Service for handling automatic unmute functionality"""
+def _utc_naive(value: datetime) -> datetime:
+    """Normalize to naive UTC, the form DateTime columns hand back"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
-    def __init__(self, db: Session, check_interval: int = 60):
+class MuteService:
+    """Service for handling automatic unmute functionality.
+
+    Pending mute deadlines live in an in-memory min-heap seeded from
+    ``User.mute_until`` at startup and kept current by /mute and /unmute.
+    The loop sleeps until the earliest deadline (or until a sooner one is
+    scheduled) and then clears the mute in the database and lifts the
+    Telegram restriction in the same step.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        telegram_service: Optional[TelegramService] = None,
+        resync_interval: int = 3600,
+    ):
         """
         Initialize mute service
 
         Args:
-            db: Database session
-            check_interval: Interval in seconds to check for expired mutes (default: 60 seconds)
+            database: Database used to open a session per unmute
+            telegram_service: Service used to restrict/lift users in their groups
+            resync_interval: Seconds between reloads of the heap from the database,
+                to pick up mutes written outside this process (default: 1 hour)
         """
-        self.db = db
-        self.check_interval = check_interval
+        self.database = database
+        self.telegram = telegram_service
+        self.resync_interval = resync_interval
         self._task: Optional[asyncio.Task] = None
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
 
     async def start(self):
-        """Start the mute checking task"""
+        """Seed the deadline heap and start the unmute task"""
         if self._task is None:
-            self._task = asyncio.create_task(self._check_expired_mutes_loop())
-            logger.info("Mute service started - checking for expired mutes every %d seconds", self.check_interval)
+            await self.load_pending()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Mute service started - %d timed mutes scheduled", len(self._deadlines))
 
     async def stop(self):
-        """Stop the mute checking task"""
+        """Stop the unmute task"""
         if self._task is not None:
             self._task.cancel()
             try:
@@ -42,40 +72,122 @@ class MuteService:
             self._task = None
             logger.info("Mute service stopped")
 
-    async def _check_expired_mutes_loop(self):
-        """Main loop that periodically checks for expired mutes"""
+    async def load_pending(self):
+        """(Re)build the heap from every timed mute stored in the database"""
+        async with self.database.session_scope() as session:
+            rows = (await session.execute(
+                select(User.id, User.mute_until).filter(
+                    User.is_muted == True,
+                    User.mute_until.isnot(None)
+                )
+            )).all()
+
+        self._heap = []
+        self._deadlines = {}
+        for user_id, mute_until in rows:
+            self.schedule(user_id, mute_until)
+
+    def schedule(self, user_id: int, mute_until: Optional[datetime]):
+        """Register (or move) the unmute deadline of a user; None means permanent"""
+        if mute_until is None:
+            self.cancel(user_id)
+            return
+        deadline = _utc_naive(mute_until)
+        self._deadlines[user_id] = deadline
+        heapq.heappush(self._heap, (deadline, user_id))
+        if self._heap[0] == (deadline, user_id):
+            # New earliest deadline: wake the loop so it re-arms its timer
+            self._wakeup.set()
+
+    def cancel(self, user_id: int):
+        """Forget the deadline of a user (stale heap entries are skipped lazily)"""
+        self._deadlines.pop(user_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Earliest live deadline, discarding cancelled/rescheduled entries"""
+        while self._heap:
+            deadline, user_id = self._heap[0]
+            if self._deadlines.get(user_id) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        """Sleep until the next deadline, then release every due mute"""
+        last_resync = asyncio.get_running_loop().time()
         while True:
+            deadline = self.next_deadline()
+            timeout = float(self.resync_interval)
+            if deadline is not None:
+                timeout = min(timeout, (deadline - datetime.utcnow()).total_seconds())
+
+            self._wakeup.clear()
+            if timeout > 0:
+                # A timer on the same event (rather than wait_for) keeps stop()'s
+                # cancellation from being swallowed when both race
+                timer = asyncio.get_running_loop().call_later(timeout, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+
             try:
-                await self._check_expired_mutes()
+                if asyncio.get_running_loop().time() - last_resync >= self.resync_interval:
+                    await self.load_pending()
+                    last_resync = asyncio.get_running_loop().time()
+                await self._release_due()
             except Exception as e:
-                logger.error("Error checking expired mutes: %s", e)
-
-            await asyncio.sleep(self.check_interval)
-
-    async def _check_expired_mutes(self):
-        """Check and unmute users whose mute duration has expired"""
-        now = datetime.now(timezone.utc)
+                logger.error("Error processing expired mutes: %s", e)
+                await asyncio.sleep(1)
 
-        # Find all muted users whose mute_until time has passed
-        expired_mutes = self.db.query(User).filter(
-            User.is_muted == True,
-            User.mute_until.isnot(None),
-            User.mute_until <= now
-        ).all()
-
-        if expired_mutes:
-            logger.info("Found %d expired mutes to process", len(expired_mutes))
-
-            for user in expired_mutes:
-                logger.info("Unmuting user @%s (ID: %s) - mute expired at %s",
-                          user.username, user.id, user.mute_until)
-
-                # Unmute the user
-                user.is_muted = False
-                user.mute_until = None
-
-            # Commit all changes
-            self.db.commit()
-            logger.info("Successfully unmuted %d users", len(expired_mutes))
-        else:
-            logger.debug("No expired mutes found")
\ No newline at end of file
+    async def _release_due(self):
+        """Unmute every user whose deadline has passed"""
+        now = datetime.utcnow()
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                return
+            _, user_id = heapq.heappop(self._heap)
+            del self._deadlines[user_id]
+            await self._unmute(user_id, now)
+
+    async def _unmute(self, user_id: int, now: datetime):
+        async with self.database.session_scope() as session:
+            # Conditional so a re-mute with a later deadline is never undone
+            result = await session.execute(
+                update(User)
+                .where(User.id == user_id, User.is_muted == True, User.mute_until <= now)
+                .values(is_muted=False, mute_until=None)
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                return
+            telegram_id = await session.scalar(select(User.telegram_id).filter_by(id=user_id))
+
+        logger.info("Unmuting user %s - mute expired", user_id)
+        if telegram_id:
+            await self.lift(user_id, int(telegram_id))
+
+    async def _group_chat_ids(self, user_id: int) -> List[int]:
+        async with self.database.session_scope() as session:
+            chat_ids = (await session.scalars(
+                select(Group.telegram_group_id)
+                .join(GroupMembership, GroupMembership.group_id == Group.id)
+                .filter(GroupMembership.user_id == user_id)
+            )).all()
+        return [int(chat_id) for chat_id in chat_ids]
+
+    async def restrict(self, user_id: int, telegram_id: int, mute_until: Optional[datetime] = None):
+        """Mute the user in every registered group of theirs"""
+        if not self.telegram:
+            return
+        until = mute_until.replace(tzinfo=timezone.utc) if mute_until and not mute_until.tzinfo else mute_until
+        for chat_id in await self._group_chat_ids(user_id):
+            await self.telegram.restrict_chat_member(chat_id, telegram_id, until_date=until)
+
+    async def lift(self, user_id: int, telegram_id: int):
+        """Lift the mute of the user in every registered group of theirs"""
+        if not self.telegram:
+            return
+        for chat_id in await self._group_chat_ids(user_id):
+            await self.telegram.lift_restrictions(chat_id, telegram_id)
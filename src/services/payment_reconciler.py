@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from models.payment import Payment
+from services.pixgo_service import (
+    AsyncPixGoService,
+    CircuitBreakerState,
+    PixGoCircuitBreakerError,
+    PixGoError,
+    PixGoRateLimitError,
+)
+from services.subscription_service import SubscriptionService
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Provider statuses mapped to our Payment.status
+SETTLED_STATUSES = {"completed", "paid", "approved", "depix_sent"}
+FAILED_STATUSES = {
+    "failed": "failed",
+    "canceled": "failed",
+    "cancelled": "failed",
+    "error": "failed",
+    "refunded": "failed",
+    "expired": "expired",
+}
+
+# (max payment age, check interval): fresh payments are polled every few
+# seconds, older ones progressively less often
+DEFAULT_BACKOFF_SCHEDULE: List[Tuple[timedelta, float]] = [
+    (timedelta(minutes=10), 5),
+    (timedelta(hours=1), 30),
+    (timedelta(hours=6), 300),
+    (timedelta(days=3), 3600),
+]
+
+
+class PaymentReconciler:
+    """Background job that reconciles pending PIX payments against PixGo"""
+
+    def __init__(
+        self,
+        database: Database,
+        pixgo_service: AsyncPixGoService,
+        subscription_service: SubscriptionService,
+        bot: Any = None,
+        tick_interval: float = 5,
+        concurrency: int = 5,
+        batch_size: int = 100,
+        backoff_schedule: Optional[List[Tuple[timedelta, float]]] = None,
+    ):
+        """
+        Initialize the reconciler
+
+        Args:
+            database: Database used to open a session per batch/settlement
+            pixgo_service: Async PixGo client
+            subscription_service: Settles payments and extends subscriptions
+            bot: Telegram bot used to notify activated users
+            tick_interval: Seconds between scans for due payments
+            concurrency: Maximum simultaneous PixGo status requests
+            batch_size: Maximum payments checked per tick
+            backoff_schedule: (max age, interval) pairs; payments older than the last age are ignored
+        """
+        self.database = database
+        self.pixgo = pixgo_service
+        self.subscriptions = subscription_service
+        self.bot = bot
+        self.tick_interval = tick_interval
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.backoff_schedule = backoff_schedule or DEFAULT_BACKOFF_SCHEDULE
+        self.max_age = self.backoff_schedule[-1][0]
+
+        self._task: Optional[asyncio.Task] = None
+        self._next_check: Dict[int, float] = {}
+        self._paused_until = 0.0
+
+        # Metrics
+        self.checks = 0
+        self.settled = 0
+        self.failed = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.last_tick_duration = 0.0
+        self.last_throughput = 0.0
+        self.last_max_lag = 0.0
+        self.oldest_pending_age = 0.0
+
+    async def start(self):
+        """Start the reconciliation loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Payment reconciler started - scanning every %s seconds", self.tick_interval)
+
+    async def stop(self):
+        """Stop the reconciliation loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Payment reconciler stopped")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Error reconciling payments: %s", e)
+            await asyncio.sleep(self.tick_interval)
+
+    def check_interval(self, age: timedelta) -> Optional[float]:
+        """Seconds between checks for a payment of this age, None when too old to poll"""
+        for max_age, interval in self.backoff_schedule:
+            if age <= max_age:
+                return interval
+        return None
+
+    async def run_once(self) -> int:
+        """Check every due pending payment once. Returns how many were checked."""
+        now_mono = time.monotonic()
+        if now_mono < self._paused_until:
+            return 0
+        if self.pixgo.circuit_breaker.state == CircuitBreakerState.OPEN:
+            # Let the breaker decide when to half-open; don't hammer it meanwhile
+            self._paused_until = now_mono + self.pixgo.circuit_breaker.recovery_timeout / 4
+            return 0
+
+        due = await self._load_due_payments(now_mono)
+        if not due:
+            return 0
+
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self.last_max_lag = max(now_mono - due_at for _, _, due_at in due)
+
+        async def check(payment_id: int, provider_id: str):
+            async with semaphore:
+                if time.monotonic() < self._paused_until:
+                    return
+                await self._check_payment(payment_id, provider_id)
+
+        await asyncio.gather(*(check(pid, provider_id) for pid, provider_id, _ in due))
+
+        self.last_tick_duration = time.monotonic() - started
+        self.last_throughput = len(due) / self.last_tick_duration if self.last_tick_duration > 0 else 0.0
+        logger.debug(
+            "Reconciled %d payments in %.2fs (%.1f/s, max lag %.1fs)",
+            len(due), self.last_tick_duration, self.last_throughput, self.last_max_lag,
+        )
+        return len(due)
+
+    async def _load_due_payments(self, now_mono: float) -> List[Tuple[int, str, float]]:
+        """Pending PIX payments whose next check is due, newest first"""
+        now = datetime.utcnow()
+        async with self.database.session_scope() as session:
+            rows = (await session.execute(
+                select(Payment.id, Payment.pixgo_payment_id, Payment.created_at)
+                .filter(
+                    Payment.status == "pending",
+                    Payment.payment_method == "pix",
+                    Payment.pixgo_payment_id.isnot(None),
+                    Payment.created_at >= now - self.max_age,
+                )
+                .order_by(Payment.created_at.desc())
+            )).all()
+
+        due: List[Tuple[int, str, float]] = []
+        seen = set()
+        for payment_id, provider_id, created_at in rows:
+            seen.add(payment_id)
+            age = now - (created_at or now)
+            interval = self.check_interval(age)
+            if interval is None:
+                continue
+            due_at = self._next_check.setdefault(payment_id, now_mono)
+            if due_at <= now_mono and len(due) < self.batch_size:
+                due.append((payment_id, provider_id, due_at))
+                self._next_check[payment_id] = now_mono + interval
+
+        # Forget payments that left the pending state (settled elsewhere, expired...)
+        for payment_id in list(self._next_check):
+            if payment_id not in seen:
+                del self._next_check[payment_id]
+        self.oldest_pending_age = max(((now - c).total_seconds() for _, _, c in rows if c), default=0.0)
+        return due
+
+    async def _check_payment(self, payment_id: int, provider_id: str):
+        try:
+            status = await self.pixgo.get_payment_status(provider_id, raise_errors=True)
+        except PixGoRateLimitError as e:
+            self.rate_limited += 1
+            retry_after = e.retry_after or 60
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning("PixGo rate limit hit, pausing reconciliation for %ss", retry_after)
+            return
+        except PixGoCircuitBreakerError:
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + self.pixgo.circuit_breaker.recovery_timeout / 4
+            )
+            return
+        except PixGoError as e:
+            self.errors += 1
+            logger.warning("Failed to check payment %s: %s", payment_id, e)
+            return
+        finally:
+            self.checks += 1
+
+        if not status:
+            return
+        status = status.lower()
+        if status in SETTLED_STATUSES:
+            await self._settle(payment_id)
+        elif status in FAILED_STATUSES:
+            await self._mark_failed(payment_id, FAILED_STATUSES[status])
+
+    async def _settle(self, payment_id: int):
+        async with self.database.session_scope() as session:
+            payment = await session.get(Payment, payment_id)
+            if not payment:
+                return
+            db_user = await self.subscriptions.settle_payment(session, payment)
+            await session.commit()
+
+        self._next_check.pop(payment_id, None)
+        if db_user:
+            self.settled += 1
+            logger.info("Payment %s settled by reconciler", payment_id)
+            await self.subscriptions.notify_activation(self.bot, db_user, payment)
+
+    async def _mark_failed(self, payment_id: int, new_status: str):
+        async with self.database.session_scope() as session:
+            # Conditional UPDATE: a settlement committed since the status poll wins
+            result = await session.execute(
+                update(Payment)
+                .where(Payment.id == payment_id, Payment.status == "pending")
+                .values(status=new_status)
+            )
+            await session.commit()
+
+        self._next_check.pop(payment_id, None)
+        if result.rowcount != 1:
+            return
+        self.failed += 1
+        logger.info("Payment %s marked %s by reconciler", payment_id, new_status)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and lag metrics of the reconciler"""
+        return {
+            "tracked": len(self._next_check),
+            "checks": self.checks,
+            "settled": self.settled,
+            "failed": self.failed,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+            "last_tick_duration": self.last_tick_duration,
+            "last_throughput": self.last_throughput,
+            "last_max_lag": self.last_max_lag,
+            "oldest_pending_age": self.oldest_pending_age,
+        }
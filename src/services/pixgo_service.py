@@ -1,12 +1,18 @@
+import asyncio
 import logging
 import time
+from collections import defaultdict
 from enum import Enum
-from typing import Any, Type
+from functools import wraps
+from typing import Any, Dict, Type
 
+import httpx
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from utils.tracing import CLIENT, tracer
+
 logger = logging.getLogger(__name__)
 
 # Import performance monitoring
@@ -19,6 +25,16 @@ except ImportError:
             return func
         return decorator
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 on httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Retries made / retry budgets exhausted, per retried function (exported by /metrics)
+RETRY_COUNTS: Dict[str, int] = defaultdict(int)
+RETRIES_EXHAUSTED: Dict[str, int] = defaultdict(int)
+
 
 class PixGoError(Exception):
     """Base exception for PixGo service errors"""
@@ -71,6 +87,8 @@ class CircuitBreaker:
         self.failure_count = 0
         self.last_failure_time: float | None = None
         self.state = CircuitBreakerState.CLOSED
+        self.opened = 0  # Times the breaker tripped
+        self.rejected = 0  # Calls refused while open
 
     def call(self, func, *args, **kwargs):
         """Execute function with circuit breaker protection"""
@@ -78,6 +96,7 @@ class CircuitBreaker:
             if self.last_failure_time and time.time() - self.last_failure_time > self.recovery_timeout:
                 self.state = CircuitBreakerState.HALF_OPEN
             else:
+                self.rejected += 1
                 raise PixGoCircuitBreakerError("Circuit breaker is open")
 
         try:
@@ -88,6 +107,23 @@ class CircuitBreaker:
             self._on_failure()
             raise
 
+    async def call_async(self, func, *args, **kwargs):
+        """Await coroutine function with circuit breaker protection"""
+        if self.state == CircuitBreakerState.OPEN:
+            if self.last_failure_time and time.time() - self.last_failure_time > self.recovery_timeout:
+                self.state = CircuitBreakerState.HALF_OPEN
+            else:
+                self.rejected += 1
+                raise PixGoCircuitBreakerError("Circuit breaker is open")
+
+        try:
+            result = await func(*args, **kwargs)
+            self._on_success()
+            return result
+        except self.expected_exception:
+            self._on_failure()
+            raise
+
     def _on_success(self):
         """Handle successful call"""
         self.failure_count = 0
@@ -99,6 +135,8 @@ class CircuitBreaker:
         self.last_failure_time = time.time()
 
         if self.failure_count >= self.failure_threshold:
+            if self.state != CircuitBreakerState.OPEN:
+                self.opened += 1
             self.state = CircuitBreakerState.OPEN
 
 
@@ -115,9 +153,11 @@ def retry_on_failure(max_retries: int = 3, backoff_factor: float = 0.3, exceptio
                     if attempt < max_retries:
                         wait_time = backoff_factor * (2 ** attempt)
                         logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}, retrying in {wait_time:.2f}s: {e}")
+                        RETRY_COUNTS[func.__name__] += 1
                         time.sleep(wait_time)
                     else:
                         logger.error(f"All {max_retries + 1} attempts failed for {func.__name__}: {e}")
+                        RETRIES_EXHAUSTED[func.__name__] += 1
             if last_exception:
                 raise last_exception
             raise RuntimeError("Unexpected error in retry logic")
@@ -125,12 +165,215 @@ def retry_on_failure(max_retries: int = 3, backoff_factor: float = 0.3, exceptio
     return decorator
 
 
-class PixGoService:
-    def __init__(self, api_key: str, base_url: str = "https://pixgo.org/api/v1", timeout: int = 30):
+def async_retry_on_failure(max_retries: int = 3, backoff_factor: float = 0.3, exceptions: tuple[Type[Exception], ...] = (httpx.TransportError,)):
+    """Async version of retry_on_failure: backs off with asyncio.sleep so the event loop keeps running"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            last_exception: Exception | None = None
+            for attempt in range(max_retries + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except exceptions as e:
+                    last_exception = e
+                    if attempt < max_retries:
+                        wait_time = backoff_factor * (2 ** attempt)
+                        logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}, retrying in {wait_time:.2f}s: {e}")
+                        RETRY_COUNTS[func.__name__] += 1
+                        await asyncio.sleep(wait_time)
+                    else:
+                        logger.error(f"All {max_retries + 1} attempts failed for {func.__name__}: {e}")
+                        RETRIES_EXHAUSTED[func.__name__] += 1
+            if last_exception:
+                raise last_exception
+            raise RuntimeError("Unexpected error in retry logic")
+        return wrapper
+    return decorator
+
+
+class BasePixGoService:
+    """Transport-independent part of the PixGo clients.
+
+    Holds the request payloads, response validation, error mapping and the
+    USDT fallback shared by ``PixGoService`` (blocking, requests) and
+    ``AsyncPixGoService`` (httpx); each subclass only adds its own HTTP
+    transport and the public calls on top of it.
+    """
+
+    def __init__(self, api_key: str, base_url: str, timeout: int, transport_errors: tuple[Type[Exception], ...]):
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = timeout
 
+        # Circuit breaker for API calls
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=5,
+            recovery_timeout=60,
+            expected_exception=(*transport_errors, PixGoAPIError)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Circuit breaker state and counters (retries are counted module-wide)"""
+        breaker = self.circuit_breaker
+        return {
+            "circuit_state": breaker.state.value,
+            "circuit_failures": breaker.failure_count,
+            "circuit_opened": breaker.opened,
+            "circuit_rejected": breaker.rejected,
+            "retries": dict(RETRY_COUNTS),
+            "retries_exhausted": dict(RETRIES_EXHAUSTED),
+        }
+
+    @staticmethod
+    def _rate_limit_error(headers: Any) -> PixGoRateLimitError:
+        """PixGoRateLimitError for an HTTP 429 answer"""
+        retry_after = headers.get('Retry-After')
+        retry_seconds = int(retry_after) if retry_after and retry_after.isdigit() else 60
+        logger.warning(f"Rate limited by PixGo API, retry after {retry_seconds}s")
+        return PixGoRateLimitError("Rate limit exceeded", retry_after=retry_seconds)
+
+    @staticmethod
+    def _http_error(url: str, status_code: int | None, response: Any, error: Exception) -> PixGoAPIError:
+        """PixGoAPIError for an HTTP error status, with the error details PixGo sent back"""
+        logger.error(f"HTTP error for {url} (status {status_code}): {error}")
+
+        # Try to extract error details from response
+        error_details = "Unknown error"
+        if response is not None and response.content:
+            try:
+                error_data = response.json()
+                error_details = error_data.get('error', error_data.get('message', str(error_data)))
+            except ValueError:
+                error_details = response.text[:200]  # Truncate long error messages
+
+        return PixGoAPIError(f"HTTP {status_code}: {error_details}", status_code=status_code)
+
+    def _check_response(self, response: Any) -> None:
+        """Validate the JSON body of a successful response"""
+        try:
+            response_data = response.json()
+            self._validate_api_response(response_data)
+        except ValueError as e:
+            logger.error(f"Invalid JSON response from PixGo API: {e}")
+            raise PixGoAPIError(f"Invalid JSON response: {e}") from e
+
+    def _validate_api_response(self, response_data: dict) -> None:
+        """Validate API response structure and content"""
+        if not isinstance(response_data, dict):
+            raise PixGoValidationError("API response must be a JSON object")
+
+        # Check for common API error patterns
+        if response_data.get('success') is False:
+            error_msg = response_data.get('error', response_data.get('message', 'API returned success=false'))
+            raise PixGoAPIError(f"API error: {error_msg}", response_data=response_data)
+
+        # Validate required fields for successful responses
+        if 'data' in response_data and response_data.get('success') is True:
+            if not isinstance(response_data['data'], dict):
+                raise PixGoValidationError("API response data must be an object")
+
+    @staticmethod
+    def _valid_payment_request(amount: float, description: str) -> bool:
+        """Input validation of create_payment (logs and returns False when invalid)"""
+        if amount <= 0:
+            logger.error(f"Invalid payment amount: {amount}")
+            return False
+        if not description or len(description.strip()) == 0:
+            logger.error("Payment description cannot be empty")
+            return False
+        return True
+
+    @staticmethod
+    def _payment_payload(amount: float, description: str, payer_info: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Body of POST /payment/create"""
+        # Validate input parameters
+        if amount <= 0:
+            raise PixGoValidationError("Payment amount must be positive")
+        if not description or len(description.strip()) == 0:
+            raise PixGoValidationError("Payment description cannot be empty")
+
+        payload = {"amount": amount, "description": description.strip(), "currency": "BRL"}
+        if payer_info:
+            # Validate payer_info structure
+            if not isinstance(payer_info, dict):
+                raise PixGoValidationError("Payer info must be a dictionary")
+            payload.update(payer_info)
+        return payload
+
+    @staticmethod
+    def _created_payment(data: dict[str, Any]) -> dict[str, Any]:
+        """Payment data of a /payment/create answer, PixGoAPIError when PixGo refused it"""
+        if data.get("success") and "data" in data:
+            payment_data = data["data"]
+            payment_id = payment_data.get('payment_id', payment_data.get('id', 'unknown'))
+            logger.info(f"Created PIX payment: {payment_id}")
+            return payment_data
+
+        # Handle API-level errors
+        error_msg = data.get("error", data.get("message", "Unknown API error"))
+        logger.error(f"Failed to create PIX payment: {error_msg}")
+        raise PixGoAPIError(f"Payment creation failed: {error_msg}", response_data=data)
+
+    def _create_payment_failed(
+        self,
+        error: Exception,
+        amount: float,
+        description: str,
+        fallback_service: Any = None,
+    ) -> dict[str, Any] | None:
+        """Outcome of a failed create_payment: USDT fallback, None, or the error re-raised"""
+        if isinstance(error, PixGoCircuitBreakerError):
+            logger.warning(f"Circuit breaker open for PixGo, attempting fallback: {error}")
+            if fallback_service:
+                return self._fallback_to_usdt(amount, description, fallback_service)
+            raise error
+        if isinstance(error, PixGoRateLimitError):
+            logger.warning(f"PixGo rate limited (retry after {error.retry_after}s), attempting fallback")
+            if fallback_service:
+                return self._fallback_to_usdt(amount, description, fallback_service)
+            raise error
+        if isinstance(error, PixGoValidationError):
+            logger.error(f"Payment validation error: {error}")
+            return None
+        if isinstance(error, PixGoTimeoutError):
+            logger.warning(f"PixGo timeout, attempting fallback: {error}")
+            if fallback_service:
+                return self._fallback_to_usdt(amount, description, fallback_service)
+            return None
+        if isinstance(error, PixGoAPIError):
+            logger.error(f"PixGo API error, attempting fallback: {error}")
+            if fallback_service:
+                return self._fallback_to_usdt(amount, description, fallback_service)
+            return None
+        logger.error(f"Unexpected error in PixGo payment creation: {error}")
+        # Don't attempt fallback for unexpected errors
+        return None
+
+    def _fallback_to_usdt(self, amount: float, description: str, usdt_service: Any) -> dict[str, Any] | None:
+        """Fallback to USDT payment when PixGo fails"""
+        logger.info(f"Falling back to USDT payment for amount {amount}")
+        try:
+            usdt_address = usdt_service.get_payment_address()
+            instructions = usdt_service.get_payment_instructions(amount)
+
+            return {
+                "payment_id": f"usdt_{int(time.time())}",
+                "payment_method": "USDT",
+                "amount": amount,
+                "description": description,
+                "usdt_address": usdt_address,
+                "instructions": instructions,
+                "fallback": True
+            }
+        except Exception as e:
+            logger.error(f"USDT fallback also failed: {e}")
+            return None
+
+
+class PixGoService(BasePixGoService):
+    def __init__(self, api_key: str, base_url: str = "https://pixgo.org/api/v1", timeout: int = 30):
+        super().__init__(api_key, base_url, timeout, transport_errors=(requests.RequestException,))
+
         # Configure session with retry strategy
         self.session = requests.Session()
         retry_strategy = Retry(
@@ -146,13 +389,6 @@ class PixGoService:
             {"X-API-Key": api_key, "Content-Type": "application/json"}
         )
 
-        # Circuit breaker for API calls
-        self.circuit_breaker = CircuitBreaker(
-            failure_threshold=5,
-            recovery_timeout=60,
-            expected_exception=(requests.RequestException, PixGoAPIError)
-        )
-
     @retry_on_failure(max_retries=2, exceptions=(requests.Timeout, requests.ConnectionError))
     def _make_request(self, method: str, url: str, **kwargs) -> requests.Response:
         """Make HTTP request with timeout and comprehensive error handling"""
@@ -162,21 +398,10 @@ class PixGoService:
 
             # Handle specific HTTP status codes
             if response.status_code == 429:
-                retry_after = response.headers.get('Retry-After')
-                retry_seconds = int(retry_after) if retry_after and retry_after.isdigit() else 60
-                logger.warning(f"Rate limited by PixGo API, retry after {retry_seconds}s")
-                raise PixGoRateLimitError(f"Rate limit exceeded", retry_after=retry_seconds)
+                raise self._rate_limit_error(response.headers)
 
             response.raise_for_status()
-
-            # Validate response content
-            try:
-                response_data = response.json()
-                self._validate_api_response(response_data)
-            except ValueError as e:
-                logger.error(f"Invalid JSON response from PixGo API: {e}")
-                raise PixGoAPIError(f"Invalid JSON response: {e}") from e
-
+            self._check_response(response)
             return response
 
         except requests.Timeout as e:
@@ -186,38 +411,12 @@ class PixGoService:
             logger.error(f"Connection error for {url}: {e}")
             raise PixGoAPIError(f"Connection failed: {e}") from e
         except requests.HTTPError as e:
-            status_code = e.response.status_code if e.response else None
-            logger.error(f"HTTP error for {url} (status {status_code}): {e}")
-
-            # Try to extract error details from response
-            error_details = "Unknown error"
-            if e.response and e.response.content:
-                try:
-                    error_data = e.response.json()
-                    error_details = error_data.get('error', error_data.get('message', str(error_data)))
-                except ValueError:
-                    error_details = e.response.text[:200]  # Truncate long error messages
-
-            raise PixGoAPIError(f"HTTP {status_code}: {error_details}", status_code=status_code) from e
+            status_code = e.response.status_code if e.response is not None else None
+            raise self._http_error(url, status_code, e.response, e) from e
         except requests.RequestException as e:
             logger.error(f"Request failed for {url}: {e}")
             raise PixGoAPIError(f"Request failed: {e}") from e
 
-    def _validate_api_response(self, response_data: dict) -> None:
-        """Validate API response structure and content"""
-        if not isinstance(response_data, dict):
-            raise PixGoValidationError("API response must be a JSON object")
-
-        # Check for common API error patterns
-        if response_data.get('success') is False:
-            error_msg = response_data.get('error', response_data.get('message', 'API returned success=false'))
-            raise PixGoAPIError(f"API error: {error_msg}", response_data=response_data)
-
-        # Validate required fields for successful responses
-        if 'data' in response_data and response_data.get('success') is True:
-            if not isinstance(response_data['data'], dict):
-                raise PixGoValidationError("API response data must be an object")
-
     @measure_performance("pixgo_service.create_payment")
     def create_payment(
         self,
@@ -227,43 +426,13 @@ class PixGoService:
         fallback_service: Any = None,
     ) -> dict[str, Any] | None:
         """Create a PIX payment with comprehensive error handling and fallback support"""
-        # Input validation
-        if amount <= 0:
-            logger.error(f"Invalid payment amount: {amount}")
-            return None
-        if not description or len(description.strip()) == 0:
-            logger.error("Payment description cannot be empty")
+        if not self._valid_payment_request(amount, description):
             return None
 
         try:
             return self.circuit_breaker.call(self._create_payment_internal, amount, description, payer_info)
-        except PixGoCircuitBreakerError as e:
-            logger.warning(f"Circuit breaker open for PixGo, attempting fallback: {e}")
-            if fallback_service:
-                return self._fallback_to_usdt(amount, description, fallback_service)
-            raise
-        except PixGoRateLimitError as e:
-            logger.warning(f"PixGo rate limited (retry after {e.retry_after}s), attempting fallback")
-            if fallback_service:
-                return self._fallback_to_usdt(amount, description, fallback_service)
-            raise
-        except PixGoValidationError as e:
-            logger.error(f"Payment validation error: {e}")
-            return None
-        except PixGoTimeoutError as e:
-            logger.warning(f"PixGo timeout, attempting fallback: {e}")
-            if fallback_service:
-                return self._fallback_to_usdt(amount, description, fallback_service)
-            return None
-        except PixGoAPIError as e:
-            logger.error(f"PixGo API error, attempting fallback: {e}")
-            if fallback_service:
-                return self._fallback_to_usdt(amount, description, fallback_service)
-            return None
         except Exception as e:
-            logger.error(f"Unexpected error in PixGo payment creation: {e}")
-            # Don't attempt fallback for unexpected errors
-            return None
+            return self._create_payment_failed(e, amount, description, fallback_service)
 
     def _create_payment_internal(
         self,
@@ -272,70 +441,17 @@ class PixGoService:
         payer_info: dict[str, Any] | None = None,
     ) -> dict[str, Any] | None:
         """Internal payment creation logic with enhanced error handling"""
-        # Validate input parameters
-        if amount <= 0:
-            raise PixGoValidationError("Payment amount must be positive")
-        if not description or len(description.strip()) == 0:
-            raise PixGoValidationError("Payment description cannot be empty")
-
-        payload = {"amount": amount, "description": description.strip(), "currency": "BRL"}
-        if payer_info:
-            # Validate payer_info structure
-            if not isinstance(payer_info, dict):
-                raise PixGoValidationError("Payer info must be a dictionary")
-            payload.update(payer_info)
-
+        payload = self._payment_payload(amount, description, payer_info)
         try:
             response = self._make_request("POST", f"{self.base_url}/payment/create", json=payload)
-            data = response.json()
-
-            if data.get("success") and "data" in data:
-                payment_data = data["data"]
-                payment_id = payment_data.get('payment_id', payment_data.get('id', 'unknown'))
-                logger.info(f"Created PIX payment: {payment_id}")
-                return payment_data
-
-            # Handle API-level errors
-            error_msg = data.get("error", data.get("message", "Unknown API error"))
-            logger.error(f"Failed to create PIX payment: {error_msg}")
-            raise PixGoAPIError(f"Payment creation failed: {error_msg}", response_data=data)
-
-        except PixGoRateLimitError:
-            # Re-raise rate limit errors as they need special handling
-            raise
-        except PixGoAPIError:
-            # Re-raise API errors as-is
-            raise
-        except PixGoTimeoutError:
-            # Re-raise timeout errors as they need special handling
-            raise
-        except PixGoValidationError:
-            # Re-raise validation errors as they need special handling
+            return self._created_payment(response.json())
+        except PixGoError:
+            # Re-raise service errors as they need special handling
             raise
         except Exception as e:
             logger.error(f"Unexpected error in payment creation: {e}")
             raise PixGoAPIError(f"Unexpected error: {e}") from e
 
-    def _fallback_to_usdt(self, amount: float, description: str, usdt_service: Any) -> dict[str, Any] | None:
-        """Fallback to USDT payment when PixGo fails"""
-        logger.info(f"Falling back to USDT payment for amount {amount}")
-        try:
-            usdt_address = usdt_service.get_payment_address()
-            instructions = usdt_service.get_payment_instructions(amount)
-
-            return {
-                "payment_id": f"usdt_{int(time.time())}",
-                "payment_method": "USDT",
-                "amount": amount,
-                "description": description,
-                "usdt_address": usdt_address,
-                "instructions": instructions,
-                "fallback": True
-            }
-        except Exception as e:
-            logger.error(f"USDT fallback also failed: {e}")
-            return None
-
     @measure_performance("pixgo_service.get_payment_status")
     def get_payment_status(self, payment_id: str) -> str | None:
         """Get payment status with error handling"""
@@ -365,3 +481,147 @@ class PixGoService:
         response = self._make_request("GET", f"{self.base_url}/payment/{payment_id}/qr")
         data = response.json()
         return data.get("qr_code")
+
+
+class AsyncPixGoService(BasePixGoService):
+    """Non-blocking PixGo client built on a shared httpx.AsyncClient.
+
+    Uses one pooled HTTP/2 keep-alive connection set for every call and
+    backs off with ``asyncio.sleep``, so a slow PixGo never stalls the
+    event loop. A sibling of the blocking ``PixGoService``: payloads,
+    response validation and the USDT fallback come from ``BasePixGoService``.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://pixgo.org/api/v1",
+        timeout: int = 30,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+    ):
+        super().__init__(api_key, base_url, timeout, transport_errors=(httpx.HTTPError,))
+
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10)),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            headers={"X-API-Key": api_key, "Content-Type": "application/json"},
+        )
+
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        await self.client.aclose()
+
+    @async_retry_on_failure(max_retries=2, exceptions=(httpx.TimeoutException, httpx.TransportError))
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one HTTP request; transport errors are retried by the decorator (one span per attempt)"""
+        attributes = {"http.request.method": method, "url.full": url}
+        with tracer.span(f"pixgo {method}", attributes, CLIENT) as span:
+            response = await self.client.request(method, url, **kwargs)
+            if span is not None:
+                span.set_attribute("http.response.status_code", response.status_code)
+                if response.status_code >= 400:
+                    span.fail(f"HTTP {response.status_code}")
+            return response
+
+    async def _make_request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Make HTTP request with timeout and comprehensive error handling"""
+        try:
+            response = await self._send(method, url, **kwargs)
+
+            # Handle specific HTTP status codes
+            if response.status_code == 429:
+                raise self._rate_limit_error(response.headers)
+
+            response.raise_for_status()
+            self._check_response(response)
+            return response
+
+        except httpx.TimeoutException as e:
+            logger.error(f"Request timeout for {url}: {e}")
+            raise PixGoTimeoutError(f"Request timeout: {e}") from e
+        except httpx.HTTPStatusError as e:
+            raise self._http_error(url, e.response.status_code, e.response, e) from e
+        except httpx.TransportError as e:
+            logger.error(f"Connection error for {url}: {e}")
+            raise PixGoAPIError(f"Connection failed: {e}") from e
+        except httpx.HTTPError as e:
+            logger.error(f"Request failed for {url}: {e}")
+            raise PixGoAPIError(f"Request failed: {e}") from e
+
+    @measure_performance("pixgo_service.create_payment")
+    async def create_payment(
+        self,
+        amount: float,
+        description: str,
+        payer_info: dict[str, Any] | None = None,
+        fallback_service: Any = None,
+    ) -> dict[str, Any] | None:
+        """Create a PIX payment with comprehensive error handling and fallback support"""
+        if not self._valid_payment_request(amount, description):
+            return None
+
+        try:
+            return await self.circuit_breaker.call_async(self._create_payment_internal, amount, description, payer_info)
+        except Exception as e:
+            return self._create_payment_failed(e, amount, description, fallback_service)
+
+    async def _create_payment_internal(
+        self,
+        amount: float,
+        description: str,
+        payer_info: dict[str, Any] | None = None,
+    ) -> dict[str, Any] | None:
+        """Internal payment creation logic with enhanced error handling"""
+        payload = self._payment_payload(amount, description, payer_info)
+        try:
+            response = await self._make_request("POST", f"{self.base_url}/payment/create", json=payload)
+            return self._created_payment(response.json())
+        except PixGoError:
+            # Re-raise service errors as they need special handling
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in payment creation: {e}")
+            raise PixGoAPIError(f"Unexpected error: {e}") from e
+
+    @measure_performance("pixgo_service.get_payment_status")
+    async def get_payment_status(self, payment_id: str, *, raise_errors: bool = False) -> str | None:
+        """Get payment status with error handling
+
+        With raise_errors=True PixGo errors (rate limit, open circuit, ...)
+        propagate instead of returning None, so callers can back off.
+        """
+        try:
+            return await self.circuit_breaker.call_async(self._get_payment_status_internal, payment_id)
+        except (PixGoError, httpx.HTTPError) as e:
+            if raise_errors:
+                raise
+            logger.error(f"Failed to get payment status for {payment_id}: {e}")
+            return None
+
+    async def _get_payment_status_internal(self, payment_id: str) -> str | None:
+        """Internal payment status retrieval"""
+        response = await self._make_request("GET", f"{self.base_url}/payment/{payment_id}/status")
+        data = response.json()
+        return data.get("status")
+
+    @measure_performance("pixgo_service.get_qr_code")
+    async def get_qr_code(self, payment_id: str) -> str | None:
+        """Get QR code for payment with error handling"""
+        try:
+            return await self.circuit_breaker.call_async(self._get_qr_code_internal, payment_id)
+        except (PixGoError, httpx.HTTPError) as e:
+            logger.error(f"Failed to get QR code for {payment_id}: {e}")
+            return None
+
+    async def _get_qr_code_internal(self, payment_id: str) -> str | None:
+        """Internal QR code retrieval"""
+        response = await self._make_request("GET", f"{self.base_url}/payment/{payment_id}/qr")
+        data = response.json()
+        return data.get("qr_code")
@@ -0,0 +1,534 @@
+import asyncio
+import gzip
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timezone
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Table, bindparam, delete, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from models.base import Base
+from models.tombstone import UNTRACKED_TABLES
+from services.backup_service import BACKUP_FORMAT
+from utils.database import Database
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Upsert constructs of the dialects deltas can be replayed on
+UPSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+class BackupFormatError(Exception):
+    """The file is not a readable, complete backup"""
+    pass
+
+
+@dataclass
+class RestoreResult:
+    """Outcome of a restore"""
+
+    backup_timestamp: Optional[str]
+    counts: Dict[str, int] = field(default_factory=dict)
+    deleted: Dict[str, int] = field(default_factory=dict)
+    files: int = 1
+    duration: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration > 0 else 0.0
+
+
+def open_backup(path: Path) -> BinaryIO:
+    """Open a backup for reading, whatever its compression (gzip, zstd or none)"""
+    with open(path, "rb") as probe:
+        magic = probe.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rb")
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise BackupFormatError("zstd backup but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+
+def _lines(stream: BinaryIO) -> Iterator[bytes]:
+    """Lines of a binary stream (zstd readers are not line-iterable themselves)"""
+    pending = b""
+    while True:
+        chunk = stream.read(1 << 20)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def read_backup(path: Path, batch_size: int = 5000) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream the contents of a backup as events.
+
+    Yields ``("header", dict)``, then per table ``("table", (name, columns))``
+    followed by ``("rows", [row, ...])`` batches, and finally ``("end",
+    trailer)``. Deltas list deletions first, as ``("deleted", (name,
+    [primary key]))`` sections whose rows are the deleted keys. Version 1.0
+    backups (one indented JSON document) are loaded whole and replayed
+    through the same events.
+    """
+    with open_backup(path) as stream:
+        lines = _lines(stream)
+        first = next(lines, b"")
+        try:
+            header = json.loads(first)
+        except ValueError:
+            header = None
+
+        if not isinstance(header, dict) or header.get("format") != BACKUP_FORMAT:
+            document = json.loads(first + b"\n" + b"\n".join(lines))
+            yield from _legacy_events(document, batch_size)
+            return
+
+        yield "header", header
+        batch: List[bytes] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            if line.startswith(b"["):
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    yield "rows", _parse_rows(batch)
+                    batch = []
+                continue
+            if batch:
+                yield "rows", _parse_rows(batch)
+                batch = []
+            marker = json.loads(line)
+            if "table" in marker:
+                yield "table", (marker["table"], marker["columns"])
+            elif marker.get("end"):
+                yield "end", marker
+                return
+            elif "deleted" in marker:
+                yield "deleted", (marker["deleted"], marker["columns"])
+        if batch:
+            yield "rows", _parse_rows(batch)
+    # No trailer: the file was cut short
+
+
+def _parse_rows(lines: List[bytes]) -> List[list]:
+    """Parse a batch of row lines with a single json call"""
+    return json.loads(b"[" + b",".join(lines) + b"]")
+
+
+def _legacy_events(document: Any, batch_size: int) -> Iterator[Tuple[str, Any]]:
+    """Events of a version 1.0 backup ({"tables": {name: [record, ...]}})"""
+    if not isinstance(document, dict) or "tables" not in document or "version" not in document:
+        raise BackupFormatError("not a backup file")
+    tables = document["tables"]
+    yield "header", {
+        "version": document["version"],
+        "kind": "full",
+        "backup_timestamp": document.get("backup_timestamp"),
+        "tables": list(tables),
+    }
+    for name, records in tables.items():
+        columns = list(records[0]) if records else []
+        yield "table", (name, columns)
+        for start in range(0, len(records), batch_size):
+            yield "rows", [[record.get(column) for column in columns] for record in records[start:start + batch_size]]
+    yield "end", {"counts": {name: len(records) for name, records in tables.items()}}
+
+
+def inspect_backup(path: Path) -> Dict[str, Any]:
+    """Read a whole backup without touching the database: header plus verified row and deletion counts"""
+    header: Dict[str, Any] = {}
+    found: Dict[str, Dict[str, int]] = {"table": {}, "deleted": {}}
+    current = None
+    trailer = None
+    for kind, payload in read_backup(path):
+        if kind == "header":
+            header = payload
+        elif kind in found:
+            current, name = found[kind], payload[0]
+            current[name] = 0
+        elif kind == "rows":
+            current[name] += len(payload)
+        elif kind == "end":
+            trailer = payload
+    if trailer is None:
+        raise BackupFormatError("backup is truncated (no trailer)")
+    if trailer.get("counts", {}) != found["table"] or trailer.get("deleted", {}) != found["deleted"]:
+        raise BackupFormatError("row counts do not match the trailer")
+    return {**header, "counts": found["table"], "deleted": found["deleted"]}
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        # Stored naive, in UTC
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def _to_time(value):
+    return dt_time.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "on")
+    return bool(value)
+
+
+CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    datetime: _to_datetime,
+    date: _to_date,
+    dt_time: _to_time,
+    bool: _to_bool,
+}
+
+
+def _sqlite_datetime(process: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Naive ISO timestamps rewritten straight into SQLite's storage format, without parsing"""
+    def convert(value):
+        if isinstance(value, str):
+            if len(value) == 26 and value[10] in "T ":
+                return value[:10] + " " + value[11:]
+            if len(value) == 19 and value[10] in "T ":
+                return value[:10] + " " + value[11:] + ".000000"
+        return process(_to_datetime(value))
+
+    return convert
+
+
+def _column_converter(column, dialect) -> Optional[Callable[[Any], Any]]:
+    """Converter from a non-null JSON value of a column to the driver value (None = as is)"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    process = column.type.dialect_impl(dialect).bind_processor(dialect)
+
+    if python_type is datetime and dialect.name == "sqlite":
+        convert = _sqlite_datetime(process)
+    elif python_type in CONVERTERS:
+        parse = CONVERTERS[python_type]
+        if python_type is bool or process is None:
+            convert = parse  # The drivers take Python bools as they are
+        else:
+            def convert(value):
+                return process(parse(value))
+    elif process is not None:
+        convert = process
+    else:
+        return None  # JSON already gives the driver value (str, int, float)
+    return convert
+
+
+def _missing_value(column, dialect):
+    """Driver value for a column the backup does not carry: its Python default, else NULL"""
+    default = column.default
+    if default is None or not (default.is_scalar or default.is_callable):
+        return None
+    value = default.arg if default.is_scalar else default.arg(None)
+    process = column.type.dialect_impl(dialect).bind_processor(dialect)
+    return process(value) if process and value is not None else value
+
+
+def _upsert(table: Table, columns: List[str], dialect):
+    """INSERT that overwrites the row already holding the same primary key"""
+    if dialect.name not in UPSERTS:
+        raise BackupFormatError(f"deltas cannot be replayed on {dialect.name}")
+    statement = UPSERTS[dialect.name](table)
+    keys = [column.name for column in table.primary_key.columns]
+    updates = {name: statement.excluded[name] for name in columns if name not in keys}
+    if not updates:
+        return statement.on_conflict_do_nothing(index_elements=keys)
+    return statement.on_conflict_do_update(index_elements=keys, set_=updates)
+
+
+def row_builder(table: Table, columns: List[str], dialect, upsert: bool = False) -> Tuple[str, Callable[[list], tuple]]:
+    """Compile, once per table, the INSERT statement and a function turning a backup row into its parameters.
+
+    Values leave the builder already converted by the column types' bind
+    processors, so batches go to the driver's executemany as they are.
+    Columns the table no longer has are dropped; missing ones get their
+    Python default evaluated once. With `upsert`, rows replace those with
+    the same primary key (delta replay).
+    """
+    present = {name: index for index, name in enumerate(columns) if name in table.columns}
+    missing = {
+        column.name: _missing_value(column, dialect)
+        for column in table.columns
+        if column.name not in present and column.default is not None
+    }
+    statement = _upsert(table, list(present), dialect) if upsert else insert(table)
+    compiled = statement.compile(dialect=dialect, column_keys=[*present, *missing])
+
+    # Parameters are picked from the row extended with the defaults, in one C-level call
+    extra = list(missing.values())
+    source = {**present, **{name: len(columns) + i for i, name in enumerate(missing)}}
+    names = [compiled.binds[key].key for key in compiled.positiontup]
+    pick = itemgetter(*[source[name] for name in names])
+    converters = [
+        (position, convert)
+        for position, name in enumerate(names)
+        if name in present and (convert := _column_converter(table.columns[name], dialect)) is not None
+    ]
+
+    def build(row: list) -> tuple:
+        values = pick(row + extra)
+        if len(names) == 1:
+            values = (values,)
+        if not converters:
+            return values
+        values = list(values)
+        for position, convert in converters:
+            value = values[position]
+            if value is not None:
+                values[position] = None if value == "null" else convert(value)
+        return tuple(values)
+
+    return compiled.string, build
+
+
+def key_builder(table: Table, dialect) -> Tuple[str, Callable[[list], tuple]]:
+    """Compile the DELETE of one row by primary key, and a function turning a tombstone into its parameters"""
+    key = next(iter(table.primary_key.columns))
+    compiled = delete(table).where(key == bindparam("row_id")).compile(dialect=dialect)
+    try:
+        numeric = key.type.python_type is int
+    except NotImplementedError:
+        numeric = False
+    convert = _column_converter(key, dialect)
+
+    def build(row: list) -> tuple:
+        value = row[0]  # Tombstones keep keys as text
+        if numeric:
+            return (int(value),)
+        return (convert(value) if convert else value,)
+
+    return compiled.string, build
+
+
+def _prepare(events: Iterator[Tuple[str, Any]], dialect) -> Iterator[Tuple[str, Any]]:
+    """Backup events ready for the database: tables become (Table, sql), rows driver tuples.
+
+    Full backups insert, deltas upsert, and "deleted" sections delete by
+    primary key. Tables this schema does not have are skipped with their
+    rows.
+    """
+    build = None
+    upsert = False
+    for kind, payload in events:
+        if kind == "header":
+            upsert = payload.get("kind") == "delta"
+            yield kind, payload
+        elif kind in ("table", "deleted"):
+            name, columns = payload
+            table = Base.metadata.tables.get(name)
+            if table is None:
+                build = None
+                logger.warning("Skipping unknown table %s in backup", name)
+                continue
+            if kind == "deleted":
+                sql, build = key_builder(table, dialect)
+            else:
+                sql, build = row_builder(table, columns, dialect, upsert=upsert)
+            yield kind, (table, sql)
+        elif kind == "rows":
+            if build is not None:
+                yield "rows", [build(row) for row in payload]
+        else:
+            yield kind, payload
+
+
+class RestoreService:
+    """Replaces the database contents with a backup, streaming it in bulk batches.
+
+    The backup is read in batches off the event loop; every table gets a
+    row builder compiled once from its column types, and rows go in with
+    executemany inserts. Clearing the old rows and inserting the new ones
+    happen inside one transaction, under a savepoint, and the trailer row
+    counts are checked before committing, so a bad or truncated file leaves
+    the database untouched. Sequences are moved past the restored ids.
+
+    A chain (a full backup followed by its deltas) is replayed in the same
+    transaction: each delta deletes its tombstoned rows, then upserts its
+    changed ones. A delta on its own is applied on top of the current data.
+    """
+
+    def __init__(self, database: Database, batch_size: int = 5000):
+        self.database = database
+        self.batch_size = batch_size
+
+    async def restore(self, path: Path) -> RestoreResult:
+        """Restore the backup at `path`. Raises BackupFormatError and rolls back on a bad file."""
+        return await self.restore_chain([path])
+
+    async def restore_chain(self, paths: Iterable[Path]) -> RestoreResult:
+        """Replay backups in order, all or nothing. Raises BackupFormatError and rolls back on a bad file or a broken chain."""
+        paths = [Path(path) for path in paths]
+        if not paths:
+            raise BackupFormatError("no backup to restore")
+        started = time.monotonic()
+        result = RestoreResult(backup_timestamp=None, files=len(paths))
+
+        async with self.database.session_scope(detached=True) as session:
+            try:
+                async with session.begin_nested():
+                    connection = await session.connection()
+                    indexes = []
+                    previous = None
+                    for position, path in enumerate(paths):
+                        events = read_backup(path, self.batch_size)
+                        try:
+                            header = await self._apply(
+                                connection, _prepare(events, self.database.engine.dialect), result,
+                                previous, first=position == 0, indexes=indexes,
+                            )
+                        finally:
+                            events.close()
+                        previous = header.get("id")
+                        result.backup_timestamp = header.get("backup_timestamp")
+
+                    for index in indexes:
+                        await connection.run_sync(index.create, checkfirst=True)
+
+                    await self._after_restore(session, [Base.metadata.tables[name] for name in result.counts])
+                await session.commit()
+            except BaseException:
+                await session.rollback()
+                raise
+
+        result.duration = time.monotonic() - started
+        logger.info(
+            "Restored %d rows (%d deleted) from %d backup file(s) of %s in %.2fs (%.0f rows/s)",
+            result.rows, sum(result.deleted.values()), result.files,
+            result.backup_timestamp, result.duration, result.rows_per_second,
+        )
+        return result
+
+    async def _apply(
+        self,
+        connection,
+        events: Iterator[Tuple[str, Any]],
+        result: RestoreResult,
+        previous: Optional[str],
+        first: bool,
+        indexes: List,
+    ) -> Dict[str, Any]:
+        """Stream one backup file into the open transaction. Returns its header."""
+
+        def fetch() -> "asyncio.Future":
+            # Decompression, JSON parsing and conversion run in a worker thread
+            return asyncio.ensure_future(asyncio.to_thread(next, events, None))
+
+        event = await fetch()
+        if event is None or event[0] != "header":
+            raise BackupFormatError("backup has no header")
+        header = event[1]
+        if header.get("kind") == "delta":
+            if previous is not None and header.get("parent") != previous:
+                raise BackupFormatError(f"{header.get('id')} does not follow {previous} in the chain")
+        elif not first:
+            raise BackupFormatError("a full backup can only start a chain")
+        else:
+            cleared = [
+                table for table in reversed(Base.metadata.sorted_tables)
+                if table.name in set(header.get("tables", [])) | UNTRACKED_TABLES
+            ]
+            for table in cleared:
+                await connection.execute(delete(table))
+
+            # Secondary indexes are rebuilt once at the end instead of row by row
+            indexes.extend(index for table in cleared for index in table.indexes)
+            for index in indexes:
+                await connection.run_sync(index.drop, checkfirst=True)
+
+        found: Dict[str, Dict[str, int]] = {"table": {}, "deleted": {}}
+        counter, sql, name, trailer = None, None, None, None
+        pending = fetch()
+        try:
+            while (event := await pending) is not None:
+                # Prepare the next batch while this one is written
+                pending = fetch()
+                kind, payload = event
+                if kind in found:
+                    table, sql = payload
+                    counter, name = found[kind], table.name
+                    counter[name] = 0
+                elif kind == "rows":
+                    await connection.exec_driver_sql(sql, payload)
+                    counter[name] += len(payload)
+                elif kind == "end":
+                    trailer = payload
+            pending = None
+        finally:
+            if pending is not None:
+                # The worker thread cannot be interrupted; let it finish its batch
+                await asyncio.gather(pending, return_exceptions=True)
+
+        if trailer is None:
+            raise BackupFormatError("backup is truncated (no trailer)")
+        mismatched = [
+            name
+            for kind, key in (("table", "counts"), ("deleted", "deleted"))
+            for name, count in found[kind].items()
+            if trailer.get(key, {}).get(name) != count
+        ]
+        if mismatched:
+            raise BackupFormatError(f"row counts do not match the trailer: {', '.join(mismatched)}")
+
+        for name, count in found["table"].items():
+            result.counts[name] = result.counts.get(name, 0) + count
+        for name, count in found["deleted"].items():
+            result.deleted[name] = result.deleted.get(name, 0) + count
+        return header
+
+    async def _after_restore(self, session, restored: List[Table]):
+        """Derived columns the inserts bypassed, and sequences past the restored ids"""
+        # Backups older than users.username_lower do not carry it
+        await session.execute(text(
+            "UPDATE users SET username_lower = lower(username) "
+            "WHERE username_lower IS NULL AND username IS NOT NULL AND username <> ''"
+        ))
+
+        if self.database.engine.dialect.name != "postgresql":
+            return  # SQLite assigns max(rowid) + 1 by itself
+        for table in restored:
+            primary_key = list(table.primary_key.columns)
+            if len(primary_key) != 1 or primary_key[0].type.python_type is not int:
+                continue
+            column = primary_key[0].name
+            await session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column}'), "
+                f"COALESCE((SELECT MAX({column}) FROM {table.name}), 0) + 1, false)"
+            ))
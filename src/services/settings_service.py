@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from models.system_config import SystemConfig
+from utils.config import Config
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# SystemConfig keys written by the admin commands
+SUBSCRIPTION_PRICE = "subscription_price"  # "<price> <currency>", e.g. "50.00 BRL"
+SUBSCRIPTION_DAYS = "subscription_days"
+USDT_WALLET_ADDRESS = "usdt_wallet_address"
+RULES_MESSAGE = "rules_message"
+WELCOME_MESSAGE = "welcome_message"
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed snapshot of the runtime settings"""
+
+    subscription_price: float
+    subscription_currency: str
+    subscription_days: int
+    usdt_wallet_address: str
+    rules_message: Optional[str] = None
+    welcome_message: Optional[str] = None
+
+    @classmethod
+    def defaults(cls) -> "Settings":
+        """Settings from the environment, used for keys with no SystemConfig row"""
+        return cls(
+            subscription_price=Config.SUBSCRIPTION_PRICE,
+            subscription_currency="BRL",
+            subscription_days=Config.SUBSCRIPTION_DAYS,
+            usdt_wallet_address=Config.USDT_WALLET_ADDRESS,
+        )
+
+    def apply(self, key: str, value: str) -> "Settings":
+        """Copy of the snapshot with one SystemConfig value parsed in"""
+        if key == SUBSCRIPTION_PRICE:
+            parts = value.split()
+            price = float(parts[0])
+            currency = parts[1].upper() if len(parts) > 1 else self.subscription_currency
+            return replace(self, subscription_price=price, subscription_currency=currency)
+        if key == SUBSCRIPTION_DAYS:
+            return replace(self, subscription_days=int(value))
+        if key == USDT_WALLET_ADDRESS:
+            return replace(self, usdt_wallet_address=value)
+        if key == RULES_MESSAGE:
+            return replace(self, rules_message=value)
+        if key == WELCOME_MESSAGE:
+            return replace(self, welcome_message=value)
+        return self
+
+
+class SettingsService:
+    """In-process cache of the SystemConfig table as typed Settings.
+
+    Reads are served from memory. Like AdminCache, freshness is checked at
+    most every ``check_interval`` seconds with a one-row version stamp
+    (count, max updated_at), so /setprice, /settime and /setwallet run on
+    another replica are picked up within seconds; writes made through
+    ``set()`` apply to this process immediately. Rows with unparseable
+    values are logged and fall back to the environment defaults.
+    """
+
+    def __init__(self, database: Database, check_interval: float = 5):
+        self.database = database
+        self.check_interval = check_interval
+        self.version = 0  # Bumped on every reload
+        self._settings = Settings.defaults()
+        self._stamp: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Drop the cached stamp so the next read reloads the table"""
+        self._stamp = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _build(rows: Dict[str, str]) -> Settings:
+        settings = Settings.defaults()
+        for key, value in rows.items():
+            try:
+                settings = settings.apply(key, value)
+            except (ValueError, IndexError):
+                logger.warning("Ignoring invalid setting %s=%r", key, value)
+        return settings
+
+    async def refresh(self):
+        """Reload the table if the version stamp changed (rate limited by check_interval)"""
+        if self._stamp is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._stamp is not None and now - self._checked_at < self.check_interval:
+                return
+            async with self.database.session_scope() as session:
+                stamp = tuple((await session.execute(
+                    select(func.count(SystemConfig.id), func.max(SystemConfig.updated_at))
+                )).one())
+                if stamp != self._stamp:
+                    rows = (await session.execute(select(SystemConfig.key, SystemConfig.value))).all()
+                    self._settings = self._build(dict(rows))
+                    self.version += 1
+                    logger.debug("Settings reloaded (%d keys, version %d)", len(rows), self.version)
+            self._stamp = stamp
+            self._checked_at = now
+
+    async def current(self) -> Settings:
+        """Current settings"""
+        await self.refresh()
+        return self._settings
+
+    async def set(self, key: str, value: str, updated_by: int) -> Settings:
+        """Upsert a SystemConfig row, commit, and apply it to this process right away.
+
+        Raises ValueError if the value does not parse for the key.
+        """
+        settings = self._settings.apply(key, value)
+
+        async with self.database.session_scope() as session:
+            config = await session.scalar(select(SystemConfig).filter_by(key=key))
+            if config:
+                config.value = value
+                config.updated_by = updated_by
+                config.updated_at = datetime.utcnow()
+            else:
+                session.add(SystemConfig(key=key, value=value, updated_by=updated_by))
+            await session.commit()
+
+        self._settings = settings
+        # Our own write changed the stamp; re-read it on the next access
+        self.invalidate()
+        return settings
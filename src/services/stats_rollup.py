@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import case, func, select
+
+from models.churn_event import ChurnEvent
+from models.daily_stats import DailyStats, RollupWatermark
+from models.payment import Payment
+from models.user import User
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "daily_stats"
+
+
+def _as_date(value) -> date:
+    """Normalize what func.date() returns (str on SQLite, date on PostgreSQL)"""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class StatsRollup:
+    """Background job maintaining the ``daily_stats`` table behind /stats.
+
+    Each run looks at payments, users and churn events changed since the
+    stored watermark (minus a small overlap for rows committed while the
+    previous run was reading), works out which UTC days those changes touch, and recomputes
+    only those days with grouped queries before upserting them. The first
+    run has no watermark and rebuilds every day from scratch. Today's row
+    also carries a snapshot of the active subscriber count.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        interval: float = 300,
+        lookback_days: int = 1,
+        overlap: float = 60,
+    ):
+        """
+        Initialize the rollup job
+
+        Args:
+            database: Database used to open a session per run
+            interval: Seconds between runs
+            lookback_days: Days before today always recomputed, whatever changed
+            overlap: Seconds subtracted from the watermark to catch late commits
+        """
+        self.database = database
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.overlap = timedelta(seconds=overlap)
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.runs = 0
+        self.days_recomputed = 0
+        self.last_run_duration = 0.0
+        self.last_watermark: Optional[datetime] = None
+
+    async def start(self):
+        """Start the rollup task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Stats rollup started - refreshing every %s seconds", self.interval)
+
+    async def stop(self):
+        """Stop the rollup task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Stats rollup stopped")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Error refreshing daily stats: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Recompute every day touched since the watermark. Returns how many days were written."""
+        started = time.monotonic()
+        now = datetime.utcnow()
+
+        async with self.database.session_scope() as session:
+            marker = await session.get(RollupWatermark, WATERMARK_NAME)
+            since = marker.watermark - self.overlap if marker else None
+
+            days = await self._affected_days(session, since)
+            today = now.date()
+            days.update(today - timedelta(days=i) for i in range(self.lookback_days + 1))
+
+            rows = await self._compute(session, sorted(days), now)
+            for row in rows.values():
+                await session.merge(row)
+
+            if marker:
+                marker.watermark = now
+            else:
+                session.add(RollupWatermark(name=WATERMARK_NAME, watermark=now))
+            await session.commit()
+
+        self.runs += 1
+        self.days_recomputed += len(rows)
+        self.last_watermark = now
+        self.last_run_duration = time.monotonic() - started
+        logger.debug("Stats rollup: %d days recomputed in %.2fs", len(rows), self.last_run_duration)
+        return len(rows)
+
+    async def _affected_days(self, session, since: Optional[datetime]) -> Set[date]:
+        """UTC days whose figures may have changed since `since` (every day when None)"""
+        def changed(query, column):
+            return query if since is None else query.where(column >= since)
+
+        queries = [
+            # Revenue / new subscribers are attributed to the completion day
+            changed(
+                select(func.date(Payment.completed_at)).where(Payment.completed_at.isnot(None)),
+                Payment.updated_at,
+            ),
+            # Sign-ups
+            changed(select(func.date(User.created_at)).where(User.created_at.isnot(None)), User.created_at),
+            # Churn is attributed to the day the subscription lapsed, as recorded when it expired
+            changed(select(func.date(ChurnEvent.lapsed_at)), ChurnEvent.updated_at),
+        ]
+        days: Set[date] = set()
+        for query in queries:
+            result = await session.scalars(query.distinct())
+            days.update(_as_date(value) for value in result if value is not None)
+        return days
+
+    async def _compute(self, session, days: Iterable[date], now: datetime) -> Dict[date, DailyStats]:
+        """Fresh DailyStats rows for `days`, one grouped query per metric over their span"""
+        days = list(days)
+        if not days:
+            return {}
+        wanted = set(days)
+        start = datetime.combine(days[0], datetime.min.time())
+        end = datetime.combine(days[-1] + timedelta(days=1), datetime.min.time())
+
+        rows = {
+            day: DailyStats(
+                day=day, revenue_total=0, revenue_pix=0, revenue_usdt=0,
+                payments_completed=0, payments_pix=0, payments_usdt=0,
+                new_users=0, new_subscribers=0, churned=0, computed_at=now,
+            )
+            for day in days
+        }
+
+        def in_span(column):
+            return (column >= start) & (column < end)
+
+        completed_day = func.date(Payment.completed_at)
+        is_pix = Payment.payment_method == "pix"
+        is_usdt = Payment.payment_method == "usdt"
+        revenue = await session.execute(
+            select(
+                completed_day,
+                func.coalesce(func.sum(Payment.amount), 0),
+                func.coalesce(func.sum(case((is_pix, Payment.amount), else_=0)), 0),
+                func.coalesce(func.sum(case((is_usdt, Payment.amount), else_=0)), 0),
+                func.count(),
+                func.sum(case((is_pix, 1), else_=0)),
+                func.sum(case((is_usdt, 1), else_=0)),
+            )
+            .where(Payment.status == "completed", in_span(Payment.completed_at))
+            .group_by(completed_day)
+        )
+        for day, total, pix, usdt, count, pix_count, usdt_count in revenue:
+            row = rows.get(_as_date(day))
+            if row is not None:
+                row.revenue_total, row.revenue_pix, row.revenue_usdt = total, pix, usdt
+                row.payments_completed, row.payments_pix, row.payments_usdt = count, pix_count or 0, usdt_count or 0
+
+        signup_day = func.date(User.created_at)
+        signups = await session.execute(
+            select(signup_day, func.count()).where(in_span(User.created_at)).group_by(signup_day)
+        )
+        for day, count in signups:
+            if _as_date(day) in wanted:
+                rows[_as_date(day)].new_users = count
+
+        # A subscriber is new on the day of their first completed payment ever; only
+        # users who paid inside the span can be, so the history of everyone else is not read
+        paid_in_span = (
+            select(Payment.user_id)
+            .where(Payment.status == "completed", in_span(Payment.completed_at))
+        )
+        first_paid = (
+            select(Payment.user_id, func.min(Payment.completed_at).label("first_at"))
+            .where(
+                Payment.status == "completed",
+                Payment.completed_at.isnot(None),
+                Payment.user_id.in_(paid_in_span),
+            )
+            .group_by(Payment.user_id)
+            .subquery()
+        )
+        first_day = func.date(first_paid.c.first_at)
+        subscribers = await session.execute(
+            select(first_day, func.count()).where(in_span(first_paid.c.first_at)).group_by(first_day)
+        )
+        for day, count in subscribers:
+            if _as_date(day) in wanted:
+                rows[_as_date(day)].new_subscribers = count
+
+        lapse_day = func.date(ChurnEvent.lapsed_at)
+        churn = await session.execute(
+            select(lapse_day, func.count()).where(in_span(ChurnEvent.lapsed_at)).group_by(lapse_day)
+        )
+        for day, count in churn:
+            if _as_date(day) in wanted:
+                rows[_as_date(day)].churned = count
+
+        today = now.date()
+        if today in rows:
+            rows[today].active_subscribers = await session.scalar(
+                select(func.count()).select_from(User).where(
+                    User.status_assinatura == "active", User.data_expiracao > now
+                )
+            )
+        # Past days keep the snapshot taken while they were current
+        previous = await session.execute(
+            select(DailyStats.day, DailyStats.active_subscribers).where(
+                DailyStats.day.in_([day for day in days if day != today])
+            )
+        )
+        for day, active in previous:
+            rows[_as_date(day)].active_subscribers = active
+
+        return rows
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters of the rollup job"""
+        return {
+            "runs": self.runs,
+            "days_recomputed": self.days_recomputed,
+            "last_run_duration": self.last_run_duration,
+            "last_watermark": self.last_watermark,
+        }
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.payment import Payment
+from models.user import User
+from services.settings_service import SettingsService
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionService:
+    """Settles payments and activates/extends the paying user's subscription"""
+
+    def __init__(self, subscription_days: int = Config.SUBSCRIPTION_DAYS, settings: Optional[SettingsService] = None):
+        self.subscription_days = subscription_days
+        self.settings = settings  # When set, /settime overrides subscription_days
+
+    async def settle_payment(
+        self,
+        session: AsyncSession,
+        payment: Payment,
+        completed_at: Optional[datetime] = None,
+    ) -> Optional[User]:
+        """
+        Mark a payment as completed and extend its user's subscription.
+
+        The payment is flipped with a conditional UPDATE, so concurrent
+        settlements (webhook, reconciler, /confirm) extend the subscription
+        only once. Nothing is committed here: the caller owns the transaction.
+
+        Returns:
+            The updated user, or None if the payment was already completed.
+        """
+        now = completed_at or datetime.utcnow()
+
+        result = await session.execute(
+            update(Payment)
+            .where(Payment.id == payment.id, Payment.status != "completed")
+            .values(status="completed", completed_at=now)
+        )
+        if result.rowcount != 1:
+            logger.info(f"Payment {payment.id} already settled, skipping")
+            return None
+
+        db_user = await session.get(User, payment.user_id)
+        if not db_user:
+            logger.warning(f"Payment {payment.id} settled but user {payment.user_id} not found")
+            return None
+
+        # Renewals stack on top of the remaining time; lapsed subscriptions restart now
+        start = now
+        if db_user.status_assinatura == "active" and db_user.data_expiracao and db_user.data_expiracao > now:
+            start = db_user.data_expiracao
+
+        days = self.subscription_days
+        if self.settings:
+            days = (await self.settings.current()).subscription_days
+
+        db_user.status_assinatura = "active"
+        db_user.data_expiracao = start + timedelta(days=days)
+        logger.info(f"Subscription of user {db_user.id} active until {db_user.data_expiracao.isoformat()}")
+        return db_user
+
+    async def notify_activation(self, bot: Any, db_user: User, payment: Payment) -> None:
+        """Tell the user the payment was confirmed and until when the subscription runs"""
+        if not bot or not db_user.telegram_id:
+            return
+        try:
+            await bot.send_message(
+                chat_id=int(db_user.telegram_id),
+                text=f"✅ **Pagamento Confirmado!**\n\n"
+                     f"💰 Valor: R$ {payment.amount:.2f}\n"
+                     f"⏰ Assinatura ativa até {db_user.data_expiracao.strftime('%d/%m/%Y')}\n\n"
+                     f"Aproveite seu acesso VIP!",
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify user {db_user.telegram_id}: {e}")
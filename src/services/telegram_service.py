@@ -1,14 +1,16 @@
 import logging
 
-from telegram import Bot
+from telegram import Bot, ChatPermissions
 from telegram.error import TelegramError
 
+from utils.telegram_request import MeasuredRequest
+
 logger = logging.getLogger(__name__)
 
 
 class TelegramService:
     def __init__(self, token: str):
-        self.bot = Bot(token=token)
+        self.bot = Bot(token=token, request=MeasuredRequest())
         self.token = token
 
     async def send_message(self, chat_id: int, text: str) -> bool:
@@ -49,6 +51,33 @@ class TelegramService:
             logger.error(f"Failed to ban user {user_id} from {chat_id}: {e}")
             return False
 
+    async def restrict_chat_member(self, chat_id: int, user_id: int, until_date=None) -> bool:
+        """Mute a user in a chat (until_date=None means forever)"""
+        try:
+            await self.bot.restrict_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                permissions=ChatPermissions.no_permissions(),
+                until_date=until_date
+            )
+            return True
+        except TelegramError as e:
+            logger.error(f"Failed to restrict user {user_id} in {chat_id}: {e}")
+            return False
+
+    async def lift_restrictions(self, chat_id: int, user_id: int) -> bool:
+        """Lift the restrictions of a muted user"""
+        try:
+            await self.bot.restrict_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                permissions=ChatPermissions.all_permissions()
+            )
+            return True
+        except TelegramError as e:
+            logger.error(f"Failed to lift restrictions of user {user_id} in {chat_id}: {e}")
+            return False
+
     async def create_chat_invite_link(self, chat_id: int, name: str = None, expire_date=None, member_limit=None):
         """Create an invite link for the chat"""
         try:
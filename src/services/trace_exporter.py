@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+import aiohttp
+
+from utils.tracing import Span
+
+logger = logging.getLogger(__name__)
+
+SCOPE_NAME = "botclient"
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    """OTLP/JSON KeyValue (64-bit integers are encoded as strings)"""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def encode_span(span: Span) -> Dict[str, Any]:
+    """OTLP/JSON representation of a finished span"""
+    encoded = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": [_attribute(key, value) for key, value in span.attributes.items()],
+        "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_UNSET},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+def encode_traces(traces: List[List[Span]], service_name: str) -> Dict[str, Any]:
+    """OTLP ExportTraceServiceRequest, as sent to /v1/traces or written by a collector's file exporter"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": SCOPE_NAME},
+                "spans": [encode_span(span) for spans in traces for span in spans],
+            }],
+        }]
+    }
+
+
+class TraceExporter:
+    """Background exporter of the traces finished by the Tracer.
+
+    ``export`` only queues the spans of a finished trace (bounded; the
+    oldest traces are dropped when the queue is full). Every ``interval``
+    seconds the queue is encoded as one OTLP/JSON request and either POSTed
+    to an OTLP/HTTP collector (``endpoint``, e.g. http://localhost:4318/v1/traces)
+    or appended as a line to a JSON Lines file (``path``), the format the
+    OpenTelemetry Collector's file exporter writes and its otlpjsonfile
+    receiver reads.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        interval: float = 5,
+        max_queue: int = 2000,
+        service_name: str = "botclient",
+    ):
+        """
+        Initialize the exporter
+
+        Args:
+            path: JSON Lines file receiving the traces (used when no endpoint is set)
+            endpoint: OTLP/HTTP JSON traces endpoint of a collector
+            interval: Seconds between flushes
+            max_queue: Finished traces kept waiting for a flush
+            service_name: ``service.name`` resource attribute
+        """
+        if not path and not endpoint:
+            raise ValueError("TraceExporter needs a file path or a collector endpoint")
+        self.path = Path(path) if path else None
+        self.endpoint = endpoint
+        self.interval = interval
+        self.service_name = service_name
+        self._queue: Deque[List[Span]] = deque(maxlen=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Metrics
+        self.traces_exported = 0
+        self.spans_exported = 0
+        self.traces_dropped = 0
+        self.failures = 0
+
+    def export(self, spans: List[Span]):
+        """Queue the spans of a finished trace (called by the Tracer; never blocks)"""
+        if len(self._queue) == self._queue.maxlen:
+            self.traces_dropped += 1
+        self._queue.append(spans)
+
+    async def start(self):
+        """Start the flush task"""
+        if self._task is None:
+            if self.endpoint:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Trace exporter started - writing to %s every %s seconds", self.endpoint or self.path, self.interval)
+
+    async def stop(self):
+        """Stop the flush task, writing the traces still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Error flushing traces on shutdown: %s", e)
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+            logger.info("Trace exporter stopped")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error("Error exporting traces: %s", e)
+
+    async def run_once(self) -> int:
+        """Export every queued trace. Returns how many spans were written."""
+        traces = list(self._queue)
+        self._queue.clear()
+        if not traces:
+            return 0
+
+        payload = json.dumps(encode_traces(traces, self.service_name), separators=(",", ":"))
+        if self.endpoint:
+            await self._post(payload)
+        else:
+            await asyncio.to_thread(self._append, payload)
+
+        spans = sum(len(trace) for trace in traces)
+        self.traces_exported += len(traces)
+        self.spans_exported += spans
+        logger.debug("Exported %d traces (%d spans)", len(traces), spans)
+        return spans
+
+    async def _post(self, payload: str):
+        session = self._session
+        if session is None:
+            session = self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        async with session.post(self.endpoint, data=payload, headers={"Content-Type": "application/json"}) as response:
+            if response.status >= 400:
+                raise RuntimeError(f"collector answered HTTP {response.status}")
+
+    def _append(self, payload: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(payload + "\n")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Exporter metrics"""
+        return {
+            "pending": len(self._queue),
+            "traces_exported": self.traces_exported,
+            "spans_exported": self.spans_exported,
+            "traces_dropped": self.traces_dropped,
+            "failures": self.failures,
+        }
@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +19,11 @@ class USDTService:
         # Placeholder: always return True for now
         return True
 
-    def get_payment_instructions(self, amount: float) -> str:
-        """Get payment instructions for USDT"""
+    def get_payment_instructions(self, amount: float, wallet_address: Optional[str] = None) -> str:
+        """Get payment instructions for USDT (to wallet_address, or the configured wallet)"""
         return f"""
 Para pagar com USDT Polygon:
-1. Envie {amount} USDT para: {self.wallet_address}
+1. Envie {amount} USDT para: {wallet_address or self.wallet_address}
 2. Use a rede Polygon
 3. Envie o hash da transação para confirmação
 """
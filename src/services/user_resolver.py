@@ -0,0 +1,204 @@
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from telegram import Message, Update
+from telegram import User as TelegramUser
+from telegram.ext import ContextTypes
+
+from models.user import User
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_ID = re.compile(r"^\d+$")
+
+
+@dataclass
+class Target:
+    """User referenced by a moderation command"""
+
+    user: Optional[User]  # None when nothing matched
+    name: str  # Username (without @) or id the admin typed, for replies
+    args: List[str] = field(default_factory=list)  # Command arguments after the target
+
+
+class UserResolver:
+    """Resolves command targets (@username, numeric Telegram id or reply) to User rows.
+
+    Usernames are matched case-insensitively through the indexed
+    ``users.username_lower`` column, with an LRU map from handle to user id
+    in front of it so repeated lookups are a primary-key fetch. ``track()``
+    runs for every incoming update and upserts the sender's username and
+    names, releasing a handle from whoever held it before, so lookups keep
+    following users who change handles. Senders whose data did not change
+    since the last update are skipped without touching the database.
+    """
+
+    def __init__(self, database: Database, max_size: int = 10000):
+        self.database = database
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, int]" = OrderedDict()  # username_lower -> User.id
+        self._seen: "OrderedDict[int, Tuple]" = OrderedDict()  # Telegram id -> last written profile
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(username: Optional[str]) -> Optional[str]:
+        """Lowercase handle without the leading @, or None"""
+        if not username:
+            return None
+        return username.lstrip("@").lower() or None
+
+    def invalidate(self):
+        """Forget every cached handle and profile (after the users table was replaced)"""
+        self._ids.clear()
+        self._seen.clear()
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    async def by_username(self, username: str) -> Optional[User]:
+        """User currently holding this handle (any case)"""
+        key = self.normalize(username)
+        if not key:
+            return None
+
+        async with self.database.session_scope() as session:
+            user_id = self._ids.get(key)
+            if user_id is not None:
+                user = await session.get(User, user_id)
+                if user and user.username_lower == key:
+                    self._ids.move_to_end(key)
+                    self.hits += 1
+                    return user
+                # Handle changed hands since it was cached
+                self._ids.pop(key, None)
+
+            self.misses += 1
+            user = await session.scalar(
+                select(User)
+                .filter(User.username_lower == key)
+                .order_by(User.updated_at.desc())
+                .limit(1)
+            )
+        if user:
+            self._remember(self._ids, key, user.id)
+        return user
+
+    async def by_telegram_id(self, telegram_id) -> Optional[User]:
+        """User with this Telegram id (indexed by the unique constraint)"""
+        async with self.database.session_scope() as session:
+            return await session.scalar(select(User).filter_by(telegram_id=str(telegram_id)))
+
+    @staticmethod
+    def _reply_target(message: Message) -> Optional[TelegramUser]:
+        """Author of the message the command replies to (or of the message it forwards)"""
+        replied = message.reply_to_message
+        if not replied:
+            return None
+        origin = getattr(replied, "forward_origin", None)
+        sender = getattr(origin, "sender_user", None)
+        if sender:
+            return sender
+        if replied.from_user and not replied.from_user.is_bot:
+            return replied.from_user
+        return None
+
+    async def resolve(self, message: Message, args: Optional[List[str]]) -> Optional[Target]:
+        """
+        Resolve the target of a command.
+
+        A reply to (or to a forward of) a user's message takes precedence and
+        leaves every argument for the command; otherwise the first argument is
+        a numeric Telegram id or a @username.
+
+        Returns:
+            None if the command names no target at all.
+        """
+        args = list(args or [])
+
+        replied = self._reply_target(message)
+        if replied:
+            user = await self.by_telegram_id(replied.id)
+            return Target(user=user, name=replied.username or str(replied.id), args=args)
+
+        if not args:
+            return None
+        reference = args[0].lstrip("@")
+        if NUMERIC_ID.match(reference):
+            user = await self.by_telegram_id(reference)
+        else:
+            user = await self.by_username(reference)
+        return Target(user=user, name=reference, args=args[1:])
+
+    async def track(self, tg_user: Optional[TelegramUser]):
+        """Upsert username/first/last name of a Telegram user we just heard from"""
+        if not tg_user or tg_user.is_bot:
+            return
+        profile = (tg_user.username, tg_user.first_name, tg_user.last_name)
+        if self._seen.get(tg_user.id) == profile:
+            self._seen.move_to_end(tg_user.id)
+            return
+
+        telegram_id = str(tg_user.id)
+        handle = self.normalize(tg_user.username)
+        async with self.database.session_scope() as session:
+            db_user = await session.scalar(select(User).filter_by(telegram_id=telegram_id))
+            if db_user and (db_user.username, db_user.first_name, db_user.last_name) == profile:
+                self._remember(self._seen, tg_user.id, profile)
+                return
+
+            if handle:
+                # Telegram handles are unique: whoever had this one gave it up
+                await session.execute(
+                    update(User)
+                    .where(
+                        User.username_lower == handle,
+                        or_(User.telegram_id.is_(None), User.telegram_id != telegram_id),
+                    )
+                    .values(username=None, username_lower=None)
+                )
+
+            if db_user:
+                old_handle = db_user.username_lower
+                db_user.username = tg_user.username
+                db_user.first_name = tg_user.first_name
+                db_user.last_name = tg_user.last_name
+                if old_handle and old_handle != handle:
+                    self._ids.pop(old_handle, None)
+            else:
+                db_user = User(
+                    telegram_id=telegram_id,
+                    username=tg_user.username,
+                    first_name=tg_user.first_name,
+                    last_name=tg_user.last_name,
+                )
+                session.add(db_user)
+
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Another update from the same user inserted it first
+                await session.rollback()
+                return
+
+        self._remember(self._seen, tg_user.id, profile)
+        if handle:
+            self._remember(self._ids, handle, db_user.id)
+
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler callback keeping the users table current from every update"""
+        try:
+            await self.track(update.effective_user)
+        except Exception as e:
+            logger.error(f"Failed to track user from update: {e}")
@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import binascii
+import hmac
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+from aiohttp import web
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.payment import Payment
+from models.webhook_event import WebhookEvent
+from services.subscription_service import SubscriptionService
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class DepositWebhookServer:
+    """Embedded aiohttp endpoint that receives DePix/PixGo deposit webhooks.
+
+    Runs beside ``run_polling`` on the same event loop. Each event is
+    authenticated with the shared Basic secret, deduplicated by
+    ``(bankTxId, status)`` and settled in a single transaction.
+    """
+
+    SETTLED_STATUSES = {"depix_sent"}
+    # Terminal provider statuses mapped to our Payment.status
+    FAILED_STATUSES = {
+        "canceled": "failed",
+        "error": "failed",
+        "refunded": "failed",
+        "expired": "expired",
+    }
+    REQUIRED_FIELDS = ("bankTxId", "status", "valueInCents")
+
+    def __init__(
+        self,
+        database: Database,
+        subscription_service: SubscriptionService,
+        secret: str,
+        bot: Any = None,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/webhooks/deposit",
+    ):
+        if len(secret) < 16:
+            raise ValueError("Webhook secret must have at least 16 characters")
+        self.database = database
+        self.subscriptions = subscription_service
+        self.secret = secret
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+        self._notify_tasks: Set[asyncio.Task] = set()
+
+    def build_app(self) -> web.Application:
+        """Create the aiohttp application with the deposit route"""
+        app = web.Application(client_max_size=64 * 1024)
+        app.router.add_post(self.path, self.handle_deposit)
+        return app
+
+    async def start(self):
+        """Start listening for webhook calls"""
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Deposit webhook listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop the HTTP server and wait for pending notifications"""
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+        if self._notify_tasks:
+            await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+        logger.info("Deposit webhook stopped")
+
+    def is_authorized(self, header: Optional[str]) -> bool:
+        """Check 'Authorization: Basic <secret>' or 'Basic base64(user:secret)'"""
+        if not header or not header.startswith("Basic "):
+            return False
+        credential = header[len("Basic "):].strip()
+        expected = self.secret.encode()
+        if hmac.compare_digest(credential.encode(), expected):
+            return True
+        try:
+            decoded = base64.b64decode(credential, validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            return False
+        _, _, password = decoded.partition(":")
+        return hmac.compare_digest(password.encode(), expected)
+
+    async def handle_deposit(self, request: web.Request) -> web.Response:
+        """POST handler for deposit events"""
+        if not self.is_authorized(request.headers.get("Authorization")):
+            logger.warning(f"Rejected webhook call from {request.remote}: invalid authorization")
+            return web.json_response({"error": "unauthorized"}, status=401)
+
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "invalid json"}, status=400)
+
+        if not isinstance(body, dict) or any(body.get(field) is None for field in self.REQUIRED_FIELDS):
+            return web.json_response({"error": "missing required fields"}, status=400)
+
+        # A malformed amount would fail on every retry: reject it instead of answering 500
+        if self.parse_cents(body["valueInCents"]) is None:
+            return web.json_response({"error": "invalid valueInCents"}, status=400)
+
+        try:
+            result = await self.process_event(body)
+        except Exception as e:
+            logger.error(f"Failed to process deposit webhook {body.get('bankTxId')}: {e}")
+            # Non-2xx makes the provider retry; dedupe keeps the retry safe
+            return web.json_response({"error": "processing failed"}, status=500)
+
+        return web.json_response({"result": result})
+
+    @staticmethod
+    def parse_cents(value: Any) -> Optional[int]:
+        """Non-negative whole number of cents (int or digit string), or None"""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, int):
+            return value if value >= 0 else None
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return None
+
+    async def process_event(self, body: Dict[str, Any]) -> str:
+        """Record and apply one deposit event. Returns a short outcome label."""
+        bank_tx_id = str(body["bankTxId"])
+        status = str(body["status"])
+        qr_id = body.get("qrId")
+        value_in_cents = self.parse_cents(body["valueInCents"])
+
+        async with self.database.session_scope() as session:
+            event = WebhookEvent(
+                bank_tx_id=bank_tx_id,
+                qr_id=qr_id,
+                status=status,
+                value_in_cents=value_in_cents,
+                payload=json.dumps(body, ensure_ascii=False),
+            )
+            session.add(event)
+            try:
+                await session.flush()
+            except IntegrityError:
+                await session.rollback()
+                logger.info(f"Duplicate webhook {bank_tx_id} ({status}) ignored")
+                return "duplicate"
+
+            payment = None
+            if qr_id:
+                payment = await session.scalar(select(Payment).filter_by(pixgo_payment_id=str(qr_id)))
+            if not payment:
+                await session.commit()
+                logger.warning(f"Webhook {bank_tx_id} references unknown payment qrId={qr_id}")
+                return "unknown_payment"
+
+            event.payment_id = payment.id
+
+            if status in self.SETTLED_STATUSES:
+                expected_cents = round(payment.amount * 100)
+                if value_in_cents != expected_cents:
+                    await session.commit()
+                    logger.warning(
+                        f"Webhook {bank_tx_id} amount mismatch for payment {payment.id}: "
+                        f"got {value_in_cents} cents, expected {expected_cents}"
+                    )
+                    return "amount_mismatch"
+
+                db_user = await self.subscriptions.settle_payment(session, payment)
+                await session.commit()
+                if not db_user:
+                    return "already_settled"
+
+                logger.info(f"Payment {payment.id} settled via webhook {bank_tx_id}")
+                self._notify_user(db_user, payment)
+                return "settled"
+
+            if status in self.FAILED_STATUSES:
+                # Conditional UPDATE: a depix_sent settling the same payment concurrently wins
+                new_status = self.FAILED_STATUSES[status]
+                result = await session.execute(
+                    update(Payment)
+                    .where(Payment.id == payment.id, Payment.status == "pending")
+                    .values(status=new_status)
+                )
+                await session.commit()
+                if result.rowcount:
+                    logger.info(f"Payment {payment.id} marked {new_status} via webhook {bank_tx_id}")
+                    return "updated"
+                return "recorded"
+
+            await session.commit()
+            return "recorded"
+
+    def _notify_user(self, db_user, payment: Payment) -> None:
+        """Tell the user the subscription is active without delaying the webhook response"""
+        task = asyncio.create_task(self.subscriptions.notify_activation(self.bot, db_user, payment))
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
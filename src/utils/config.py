@@ -31,6 +31,49 @@ class Config:
     PIXGO_API_KEY: str = os.getenv("PIXGO_API_KEY", "")
     PIXGO_BASE_URL: str = os.getenv("PIXGO_BASE_URL", "https://api.pixgo.com")
 
+    # DePix/PixGo deposit webhook (disabled when the secret is empty)
+    DEPIX_WEBHOOK_SECRET: str = os.getenv("DEPIX_WEBHOOK_SECRET", "")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhooks/deposit")
+
+    # Prometheus /metrics endpoint (bind to localhost unless the scraper is remote)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9100"))
+    METRICS_PATH: str = os.getenv("METRICS_PATH", "/metrics")
+
+    # Background reconciliation of pending PIX payments
+    RECONCILER_ENABLED: bool = os.getenv("RECONCILER_ENABLED", "true").lower() in ("1", "true", "yes")
+    RECONCILER_INTERVAL: float = float(os.getenv("RECONCILER_INTERVAL", "5"))
+    RECONCILER_CONCURRENCY: int = int(os.getenv("RECONCILER_CONCURRENCY", "5"))
+
+    # Expiry sweeper (expires lapsed subscriptions and kicks the users from their groups)
+    SWEEPER_ENABLED: bool = os.getenv("SWEEPER_ENABLED", "true").lower() in ("1", "true", "yes")
+    SWEEPER_INTERVAL: float = float(os.getenv("SWEEPER_INTERVAL", "300"))
+    SWEEPER_CONCURRENCY: int = int(os.getenv("SWEEPER_CONCURRENCY", "5"))
+    SWEEPER_RATE_LIMIT: float = float(os.getenv("SWEEPER_RATE_LIMIT", "20"))
+
+    # Daily stats rollup behind /stats (recomputes only days touched since the last run)
+    STATS_ROLLUP_ENABLED: bool = os.getenv("STATS_ROLLUP_ENABLED", "true").lower() in ("1", "true", "yes")
+    STATS_ROLLUP_INTERVAL: float = float(os.getenv("STATS_ROLLUP_INTERVAL", "300"))
+
+    # Backups (/backup and the optional schedule writing rotating files to BACKUP_DIR)
+    BACKUP_COMPRESSION: str = os.getenv("BACKUP_COMPRESSION", "gzip")  # gzip, zstd (needs zstandard)
+    BACKUP_SCHEDULE_ENABLED: bool = os.getenv("BACKUP_SCHEDULE_ENABLED", "false").lower() in ("1", "true", "yes")
+    BACKUP_DIR: str = os.getenv("BACKUP_DIR", "backups")
+    BACKUP_INTERVAL: float = float(os.getenv("BACKUP_INTERVAL", "86400"))
+    BACKUP_DELTA_INTERVAL: float = float(os.getenv("BACKUP_DELTA_INTERVAL", "300"))  # 0 = full backups only
+    BACKUP_KEEP: int = int(os.getenv("BACKUP_KEEP", "7"))
+
+    # Scheduled messages (/schedule HH:MM is interpreted in this time zone)
+    SCHEDULE_TIMEZONE: str = os.getenv("SCHEDULE_TIMEZONE", "America/Sao_Paulo")
+    SCHEDULE_CATCH_UP_MINUTES: int = int(os.getenv("SCHEDULE_CATCH_UP_MINUTES", "360"))
+
+    # Broadcast engine (Telegram limits: ~30 msg/s overall, 20 msg/min per group)
+    BROADCAST_GLOBAL_RATE: float = float(os.getenv("BROADCAST_GLOBAL_RATE", "30"))
+    BROADCAST_GROUP_RATE_PER_MINUTE: float = float(os.getenv("BROADCAST_GROUP_RATE_PER_MINUTE", "20"))
+
     # USDT
     USDT_WALLET_ADDRESS: str = os.getenv("USDT_WALLET_ADDRESS", "")
 
@@ -38,6 +81,24 @@ class Config:
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "logs/bot.log")
 
+    # Performance metrics (percentiles over a sliding window; memory tracked on a sample of calls)
+    PERFORMANCE_WINDOW: float = float(os.getenv("PERFORMANCE_WINDOW", "300"))
+    PERFORMANCE_MEMORY_SAMPLE_RATE: float = float(os.getenv("PERFORMANCE_MEMORY_SAMPLE_RATE", "0"))
+
+    # Query profiling (statements per handler; slow ones logged with their EXPLAIN plan, 0 = off)
+    SLOW_QUERY_THRESHOLD: float = float(os.getenv("SLOW_QUERY_THRESHOLD", "0.2"))
+    SLOW_QUERY_LOG: str = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.log")
+
+    # Update tracing (fraction of updates traced, 0 = off; OTLP/JSON to a file or an OTLP/HTTP collector)
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "0"))
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+    TRACING_ENDPOINT: str = os.getenv("TRACING_ENDPOINT", "")
+    TRACING_FLUSH_INTERVAL: float = float(os.getenv("TRACING_FLUSH_INTERVAL", "5"))
+
+    # Update processing
+    MAX_CONCURRENT_UPDATES: int = int(os.getenv("MAX_CONCURRENT_UPDATES", "8"))
+    MAX_PENDING_UPDATES: int = int(os.getenv("MAX_PENDING_UPDATES", "256"))
+
     # Subscription settings
     SUBSCRIPTION_PRICE: float = float(os.getenv("SUBSCRIPTION_PRICE", "10.0"))
     SUBSCRIPTION_DAYS: int = int(os.getenv("SUBSCRIPTION_DAYS", "30"))
@@ -0,0 +1,97 @@
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Async drivers used for each sync dialect found in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "postgres": "asyncpg",
+}
+
+# Session bound to the update (or background job) currently running
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("current_db_session", default=None)
+
+
+def to_async_url(database_url: str) -> str:
+    """Convert a sync DATABASE_URL (sqlite://, postgresql://) to its async driver equivalent"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"Unsupported database backend for async access: {backend}")
+    if url.drivername == f"{backend}+{driver}":
+        return url.render_as_string(hide_password=False)
+    if backend == "postgres":
+        backend = "postgresql"
+    return url.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+class Database:
+    """Async engine plus a per-update session scope.
+
+    Each Telegram update (or background job iteration) runs inside
+    ``session_scope()``; handlers and services read the scoped session
+    through ``Database.session`` instead of sharing one long-lived Session.
+    """
+
+    def __init__(self, database_url: str, **engine_kwargs):
+        self.url = to_async_url(database_url)
+        self.engine: AsyncEngine = create_async_engine(self.url, **engine_kwargs)
+        self.session_factory = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    @property
+    def session(self) -> AsyncSession:
+        """Session bound to the running update"""
+        session = _current_session.get()
+        if session is None:
+            raise RuntimeError("No database session in scope. Wrap the call in Database.session_scope().")
+        return session
+
+    @asynccontextmanager
+    async def session_scope(self, detached: bool = False) -> AsyncIterator[AsyncSession]:
+        """Open a session for the current update, reusing the outer one when nested.
+
+        ``detached=True`` always opens a new session; background tasks spawned
+        from a handler need it because they inherit the handler's context.
+        """
+        existing = _current_session.get()
+        if existing is not None and not detached:
+            yield existing
+            return
+
+        async with self.session_factory() as session:
+            token = _current_session.set(session)
+            try:
+                yield session
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                _current_session.reset(token)
+
+    async def create_all(self, metadata) -> None:
+        """Create all tables for the given metadata"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+
+    async def dispose(self) -> None:
+        """Close all pooled connections"""
+        await self.engine.dispose()
+        logger.info("Database engine disposed")
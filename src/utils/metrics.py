@@ -0,0 +1,199 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Sub-buckets per power of two: 2 ** PRECISION_BITS, i.e. values are kept
+# within 1 / 2 ** PRECISION_BITS (~3%) of what was recorded
+PRECISION_BITS = 5
+SUB_BUCKETS = 1 << PRECISION_BITS
+
+# Largest value told apart (~18 minutes in nanoseconds); longer ones land in the last bucket
+MAX_VALUE = 1 << 40
+
+
+def bucket_index(value: int) -> int:
+    """HDR-style log-linear bucket of a non-negative integer value"""
+    if value < 2 * SUB_BUCKETS:
+        return value if value > 0 else 0
+    if value >= MAX_VALUE:
+        value = MAX_VALUE - 1
+    shift = value.bit_length() - PRECISION_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_lower(index: int) -> int:
+    """Smallest value of a bucket"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+
+
+def bucket_upper(index: int) -> int:
+    """Smallest value of the next bucket"""
+    return bucket_lower(index + 1)
+
+
+BUCKET_COUNT = bucket_index(MAX_VALUE - 1) + 1
+
+
+class _Slot:
+    """Counts of one time slice of the sliding window"""
+
+    __slots__ = ("epoch", "counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.epoch = -1
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def reset(self, epoch: int):
+        self.epoch = epoch
+        self.counts = [0] * BUCKET_COUNT
+        self.count = self.total = self.min = self.max = 0
+
+
+class Histogram:
+    """Fixed-size histogram of integer values (nanoseconds, bytes) with a sliding window.
+
+    Recording is O(1) and memory is constant: one bucket array for the
+    lifetime totals plus one per window slot. The window is a ring of
+    `slots` time slices; a slice is cleared when the ring wraps onto it.
+
+    A histogram has a single writer (see ShardedHistogram for several
+    threads); readers get a consistent-enough view without locking.
+    """
+
+    __slots__ = ("slot_ns", "slots", "counts", "count", "total", "_ring")
+
+    def __init__(self, window: float = 300, slots: int = 10):
+        self.slot_ns = max(int(window * 1e9 / slots), 1)
+        self.slots = slots
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self._ring = [_Slot() for _ in range(slots)]
+
+    def record(self, value: int, now_ns: Optional[int] = None):
+        """Add one value (clamped at zero)"""
+        if value < 0:
+            value = 0
+        index = bucket_index(value)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+        epoch = (now_ns if now_ns is not None else time.monotonic_ns()) // self.slot_ns
+        slot = self._ring[epoch % self.slots]
+        if slot.epoch != epoch:
+            slot.reset(epoch)
+        if slot.count == 0 or value < slot.min:
+            slot.min = value
+        if value > slot.max:
+            slot.max = value
+        slot.counts[index] += 1
+        slot.count += 1
+        slot.total += value
+
+    def window_slots(self, now_ns: Optional[int] = None) -> List[_Slot]:
+        """Slots still inside the window"""
+        epoch = (now_ns if now_ns is not None else time.monotonic_ns()) // self.slot_ns
+        return [slot for slot in self._ring if slot.count and epoch - self.slots < slot.epoch <= epoch]
+
+
+class ShardedHistogram:
+    """Histogram written from any thread without a lock: one shard per writing thread, merged on read"""
+
+    def __init__(self, window: float = 300, slots: int = 10):
+        self.window = window
+        self.slots = slots
+        self._local = threading.local()
+        self._shards: List[Histogram] = []
+        self._lock = threading.Lock()  # Only taken when a thread writes for the first time
+
+    def _shard(self) -> Histogram:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = Histogram(self.window, self.slots)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, value: int, now_ns: Optional[int] = None):
+        self._shard().record(value, now_ns)
+
+    def snapshot(self, now_ns: Optional[int] = None, window: bool = True) -> "Snapshot":
+        with self._lock:
+            shards = list(self._shards)
+        return Snapshot.merge(shards, now_ns, window)
+
+
+class Snapshot:
+    """Merged view of histograms: lifetime count/total/buckets plus the sliding window"""
+
+    __slots__ = ("count", "total", "counts", "window_count", "window_total", "window_min", "window_max", "window_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.counts = [0] * BUCKET_COUNT
+        self.window_count = 0
+        self.window_total = 0
+        self.window_min = 0
+        self.window_max = 0
+        self.window_counts = [0] * BUCKET_COUNT
+
+    @classmethod
+    def merge(cls, histograms: Iterable[Histogram], now_ns: Optional[int] = None, window: bool = True) -> "Snapshot":
+        """Sum of `histograms`; `window=False` skips the sliding window (lifetime totals only)"""
+        now_ns = now_ns if now_ns is not None else time.monotonic_ns()
+        snapshot = cls()
+        mins = []
+        for histogram in histograms:
+            snapshot.count += histogram.count
+            snapshot.total += histogram.total
+            snapshot.counts = [a + b for a, b in zip(snapshot.counts, histogram.counts)]
+            if not window:
+                continue
+            for slot in histogram.window_slots(now_ns):
+                snapshot.window_count += slot.count
+                snapshot.window_total += slot.total
+                snapshot.window_max = max(snapshot.window_max, slot.max)
+                mins.append(slot.min)
+                snapshot.window_counts = [a + b for a, b in zip(snapshot.window_counts, slot.counts)]
+        snapshot.window_min = min(mins, default=0)
+        return snapshot
+
+    @property
+    def window_mean(self) -> float:
+        return self.window_total / self.window_count if self.window_count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile `q` (0..1) of the window, from the middle of its bucket"""
+        if not self.window_count:
+            return 0.0
+        rank = q * self.window_count
+        seen = 0
+        for index, count in enumerate(self.window_counts):
+            if not count:
+                continue
+            seen += count
+            if seen >= rank:
+                value = (bucket_lower(index) + bucket_upper(index) - 1) / 2
+                return min(max(value, self.window_min), self.window_max)
+        return float(self.window_max)
+
+    def cumulative(self, bounds: Iterable[int]) -> Dict[int, int]:
+        """Lifetime count of values below each bound (Prometheus ``le`` buckets, to bucket precision)"""
+        result = {}
+        index = 0
+        seen = 0
+        for bound in sorted(bounds):
+            while index < BUCKET_COUNT and bucket_upper(index) <= bound + 1:
+                seen += self.counts[index]
+                index += 1
+            result[bound] = seen
+        return result
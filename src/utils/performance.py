@@ -1,99 +1,237 @@
+import inspect
 import logging
+import random
 import time
 import psutil
 import threading
 from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
-from typing import Any, Callable, Dict, Optional
-from collections import defaultdict, deque
-import statistics
+from typing import Any, Callable, Dict, List, Optional
+from collections import defaultdict
+
+from utils.metrics import Histogram, Snapshot
 
 logger = logging.getLogger(__name__)
 
+# Quantiles reported for every operation
+QUANTILES = {"median_time": 0.5, "p95_time": 0.95, "p99_time": 0.99, "p999_time": 0.999}
+
+
+class _Span:
+    """A measurement in progress, collecting the time of the measurements nested in it"""
+
+    __slots__ = ("operation", "children")
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.children: Dict[str, list] = {}  # child operation -> [calls, total ns]
+
+    def add(self, operation: str, duration_ns: int):
+        child = self.children.get(operation)
+        if child is None:
+            self.children[operation] = [1, duration_ns]
+        else:
+            child[0] += 1
+            child[1] += duration_ns
+
+
+# Innermost measurement of the running task (asyncio copies it into each task)
+_current_span: ContextVar[Optional[_Span]] = ContextVar("performance_span", default=None)
+
+
+class _Operation:
+    """Measurements of one operation written by one thread"""
+
+    __slots__ = ("histogram", "errors", "sub_spans", "memory_samples", "memory_delta")
+
+    def __init__(self, window: float, slots: int):
+        self.histogram = Histogram(window, slots)
+        self.errors = 0
+        self.sub_spans: Dict[str, list] = {}
+        self.memory_samples = 0
+        self.memory_delta = 0
+
 
 class PerformanceMonitor:
-    """Performance monitoring utility for tracking execution times and system resources"""
+    """Performance monitoring utility for tracking execution times and system resources
+
+    Durations go into fixed-size log-linear histograms (see utils.metrics):
+    recording is O(1) and memory constant, and percentiles cover a sliding
+    time window instead of the last N samples. Each thread writes its own
+    counters, merged when stats are read, so recording takes no lock.
+    Memory usage is only sampled, on a fraction of the measurements.
+
+    Measurements nest: time spent in a measurement opened inside another one
+    (a PixGo call, a DB statement or a Telegram request inside a handler) is
+    also booked as a sub-span of the outer operation, so its stats break the
+    latency down into where it was actually spent.
+    """
 
-    def __init__(self, max_samples: int = 1000):
-        self.max_samples = max_samples
-        self.execution_times: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
-        self.call_counts: Dict[str, int] = defaultdict(int)
-        self.errors: Dict[str, int] = defaultdict(int)
-        self._lock = threading.Lock()
+    def __init__(self, window: float = 300, slots: int = 10, memory_sample_rate: float = 0.0):
+        """
+        Args:
+            window: Seconds covered by the reported percentiles
+            slots: Slices of the window (it slides by window / slots)
+            memory_sample_rate: Fraction of measurements also tracking the RSS delta (0 = never)
+        """
+        self.window = window
+        self.slots = slots
+        self.memory_sample_rate = memory_sample_rate
+        self._operations: Dict[str, List[_Operation]] = defaultdict(list)
+        self._local = threading.local()
+        self._generation = 0
+        self._process: Optional[psutil.Process] = None
+        self._lock = threading.Lock()  # Registry of per-thread counters, not taken per measurement
+
+    def _operation(self, operation: str) -> _Operation:
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.operations = {}
+            local.generation = self._generation
+        counters = local.operations.get(operation)
+        if counters is None:
+            counters = local.operations[operation] = _Operation(self.window, self.slots)
+            with self._lock:
+                self._operations[operation].append(counters)
+        return counters
+
+    def _rss(self) -> int:
+        if self._process is None:
+            self._process = psutil.Process()
+        return self._process.memory_info().rss
 
     @contextmanager
     def measure(self, operation: str):
         """Context manager to measure execution time of a block of code"""
-        start_time = time.time()
-        start_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+        start_memory = self._rss() if self.memory_sample_rate and random.random() < self.memory_sample_rate else None
+        span = _Span(operation)
+        token = _current_span.set(span)
+        failed = False
+        start_time = time.perf_counter_ns()
 
         try:
             yield
+        except Exception:
+            failed = True
+            raise
         finally:
-            end_time = time.time()
-            end_memory = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+            duration = time.perf_counter_ns() - start_time
+            _current_span.reset(token)
 
-            execution_time = end_time - start_time
-            memory_delta = end_memory - start_memory
+            self.record(operation, duration, error=failed, children=span.children)
+            if start_memory is not None:
+                counters = self._operation(operation)
+                counters.memory_samples += 1
+                counters.memory_delta += self._rss() - start_memory
 
-            with self._lock:
-                self.execution_times[operation].append(execution_time)
-                self.call_counts[operation] += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Performance: {operation} took {duration / 1e9:.3f}s")
 
-            logger.info(
-                f"Performance: {operation} took {execution_time:.3f}s, "
-                f"memory delta: {memory_delta:.2f}MB"
-            )
+    def record(self, operation: str, duration_ns: int, error: bool = False, children: Optional[Dict[str, list]] = None):
+        """Book one execution of `operation`, and its time as a sub-span of the enclosing measurement"""
+        counters = self._operation(operation)
+        counters.histogram.record(duration_ns)
+        if error:
+            counters.errors += 1
+        if children:
+            totals = counters.sub_spans
+            for child, (calls, total) in children.items():
+                if child in totals:
+                    totals[child][0] += calls
+                    totals[child][1] += total
+                else:
+                    totals[child] = [calls, total]
+
+        parent = _current_span.get()
+        if parent is not None:
+            parent.add(operation, duration_ns)
 
     def measure_function(self, operation: Optional[str] = None):
-        """Decorator to measure execution time of a function"""
+        """Decorator to measure execution time of a function
+
+        Coroutine functions are timed until their awaited body completes, so
+        the measurement includes every await and exceptions raised in it.
+        """
         def decorator(func: Callable) -> Callable:
             op_name = operation or f"{func.__module__}.{func.__name__}"
 
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs) -> Any:
+                    with self.measure(op_name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
             @wraps(func)
             def wrapper(*args, **kwargs) -> Any:
                 with self.measure(op_name):
-                    try:
-                        return func(*args, **kwargs)
-                    except Exception as e:
-                        with self._lock:
-                            self.errors[op_name] += 1
-                        raise
+                    return func(*args, **kwargs)
 
             return wrapper
         return decorator
 
+    def snapshot(self, operation: str, window: bool = True) -> Snapshot:
+        """Merged duration histogram (nanoseconds) of an operation across threads"""
+        with self._lock:
+            counters = list(self._operations.get(operation, ()))
+        return Snapshot.merge((counter.histogram for counter in counters), window=window)
+
+    def errors(self, operation: str) -> int:
+        """Failed executions of an operation"""
+        with self._lock:
+            counters = list(self._operations.get(operation, ()))
+        return sum(counter.errors for counter in counters)
+
+    def operations(self) -> List[str]:
+        """Names of every measured operation"""
+        with self._lock:
+            return list(self._operations)
+
     def get_stats(self, operation: str) -> Dict[str, Any]:
-        """Get performance statistics for an operation"""
+        """Get performance statistics for an operation (percentiles over the sliding window)"""
         with self._lock:
-            times = list(self.execution_times[operation])
-            if not times:
-                return {
-                    "calls": 0,
-                    "errors": self.errors[operation],
-                    "avg_time": 0,
-                    "min_time": 0,
-                    "max_time": 0,
-                    "median_time": 0,
-                    "p95_time": 0,
-                    "p99_time": 0
-                }
-
-            return {
-                "calls": self.call_counts[operation],
-                "errors": self.errors[operation],
-                "avg_time": statistics.mean(times),
-                "min_time": min(times),
-                "max_time": max(times),
-                "median_time": statistics.median(times),
-                "p95_time": statistics.quantiles(times, n=20)[18] if len(times) >= 20 else max(times),
-                "p99_time": statistics.quantiles(times, n=100)[98] if len(times) >= 100 else max(times)
-            }
+            counters = list(self._operations.get(operation, ()))
+        snapshot = Snapshot.merge(counter.histogram for counter in counters)
+        calls = snapshot.count
+        stats = {
+            "calls": calls,
+            "errors": sum(counter.errors for counter in counters),
+            "window": self.window,
+            "window_calls": snapshot.window_count,
+            "avg_time": snapshot.window_mean / 1e9,
+            "min_time": snapshot.window_min / 1e9,
+            "max_time": snapshot.window_max / 1e9,
+            **{name: snapshot.quantile(q) / 1e9 for name, q in QUANTILES.items()},
+            "self_time": 0,
+            "sub_spans": {},
+        }
+        if not calls:
+            return stats
+
+        # Sub-span averages are per call of the parent operation, over its lifetime
+        sub_totals: Dict[str, list] = {}
+        for counter in counters:
+            for child, (child_calls, total) in list(counter.sub_spans.items()):
+                merged = sub_totals.setdefault(child, [0, 0])
+                merged[0] += child_calls
+                merged[1] += total
+        stats["sub_spans"] = {
+            child: {"calls": child_calls / calls, "avg_time": total / calls / 1e9}
+            for child, (child_calls, total) in sub_totals.items()
+        }
+        self_time = (snapshot.total - sum(total for _, total in sub_totals.values())) / calls / 1e9
+        stats["self_time"] = max(self_time, 0.0)
+
+        samples = sum(counter.memory_samples for counter in counters)
+        if samples:
+            stats["memory_delta_mb"] = sum(counter.memory_delta for counter in counters) / samples / 1024 / 1024
+        return stats
 
     def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
         """Get performance statistics for all operations"""
-        operations = set(self.execution_times.keys()) | set(self.call_counts.keys()) | set(self.errors.keys())
-        return {op: self.get_stats(op) for op in operations}
+        return {op: self.get_stats(op) for op in self.operations()}
 
     def log_summary(self):
         """Log a summary of all performance statistics"""
@@ -107,15 +245,21 @@ class PerformanceMonitor:
                     f"{operation}: {op_stats['calls']} calls, "
                     f"avg {op_stats['avg_time']:.3f}s, "
                     f"p95 {op_stats['p95_time']:.3f}s, "
+                    f"p99 {op_stats['p99_time']:.3f}s, "
                     f"errors {op_stats['errors']} ({error_rate:.1f}%)"
                 )
+                for child, child_stats in sorted(op_stats["sub_spans"].items(), key=lambda item: -item[1]["avg_time"]):
+                    logger.info(
+                        f"  {child}: {child_stats['calls']:.1f} calls, avg {child_stats['avg_time']:.3f}s per call"
+                    )
+                if op_stats["sub_spans"]:
+                    logger.info(f"  (self): avg {op_stats['self_time']:.3f}s per call")
 
     def reset(self):
         """Reset all performance data"""
         with self._lock:
-            self.execution_times.clear()
-            self.call_counts.clear()
-            self.errors.clear()
+            self._operations.clear()
+            self._generation += 1  # Threads drop their cached counters on their next measurement
 
 
 # Global performance monitor instance
@@ -131,4 +275,25 @@ def measure_performance(operation: Optional[str] = None):
 def measure_block(operation: str):
     """Context manager to measure a block of code"""
     with performance_monitor.measure(operation):
-        yield
\ No newline at end of file
+        yield
+
+
+def instrument_engine(engine, operation: str = "db.query", monitor: Optional[PerformanceMonitor] = None):
+    """Time every statement of a SQLAlchemy engine (the sync_engine of an AsyncEngine) as `operation`"""
+    from sqlalchemy import event
+
+    monitor = monitor or performance_monitor
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("performance_started", []).append(time.perf_counter_ns())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        monitor.record(operation, time.perf_counter_ns() - conn.info["performance_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        started = exception_context.connection.info.get("performance_started") if exception_context.connection else None
+        if started:
+            monitor.record(operation, time.perf_counter_ns() - started.pop(), error=True)
@@ -0,0 +1,249 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statements worth an EXPLAIN when slow (DDL, PRAGMA, BEGIN... are not)
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+# Attribution of statements run outside any handler (background services)
+BACKGROUND = "(background)"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A handler issued more SQL statements than its declared budget"""
+    pass
+
+
+def query_budget(limit: int):
+    """Declare how many SQL statements a handler may issue per update.
+
+    Over budget, the profiler logs a warning (or raises QueryBudgetExceeded
+    in strict mode, as the test fixture does). Any decorator built with
+    functools.wraps keeps the declaration.
+    """
+    def decorator(func):
+        func.__query_budget__ = limit
+        return func
+    return decorator
+
+
+class _HandlerRun:
+    """Statements issued by one handler invocation"""
+
+    __slots__ = ("handler", "queries", "time", "finished")
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.queries = 0
+        self.time = 0.0
+        self.finished = False  # Tasks spawned by the handler outlive it and inherit the run
+
+
+# Handler invocation the running task belongs to
+_current_run: ContextVar[Optional[_HandlerRun]] = ContextVar("query_profiler_run", default=None)
+
+
+def handler_name(callback: Callable) -> str:
+    """Readable name of a handler callback: Class.method, or the function name"""
+    name = getattr(callback, "__qualname__", None) or getattr(callback, "__name__", repr(callback))
+    return name.rsplit("<locals>.", 1)[-1]
+
+
+class QueryProfiler:
+    """Attributes every SQL statement to the handler running it.
+
+    Cursor events on the engine add each statement's count and time to the
+    handler invocation found in a contextvar (set by ``handler_scope`` /
+    ``wrap``, or ``instrument_application`` for every registered handler),
+    so concurrent updates never mix their figures. Statements slower than
+    ``slow_threshold`` go to a dedicated log with their EXPLAIN plan.
+    Handlers declaring a ``@query_budget`` are checked when they return.
+    """
+
+    def __init__(
+        self,
+        slow_threshold: float = 0.2,
+        slow_log: Optional[str] = None,
+        explain: bool = True,
+        strict: bool = False,
+    ):
+        """
+        Args:
+            slow_threshold: Seconds from which a statement is logged as slow (0 = disabled)
+            slow_log: File receiving slow statements (None = the regular logs only)
+            explain: Add the statement's EXPLAIN output to the slow log
+            strict: Raise QueryBudgetExceeded instead of warning when a handler exceeds its budget
+        """
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.strict = strict
+        self.slow_logger = logging.getLogger("slow_queries")
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._engines = []
+        if slow_log:
+            self.log_to(slow_log)
+
+    def configure(self, slow_threshold: Optional[float] = None, slow_log: Optional[str] = None):
+        """Apply settings read after the profiler was created"""
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+        if slow_log:
+            self.log_to(slow_log)
+
+    def log_to(self, path: str):
+        """Write slow statements to `path` (once per file)"""
+        path = str(Path(path).resolve())
+        if any(getattr(handler, "baseFilename", None) == path for handler in self.slow_logger.handlers):
+            return
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        self.slow_logger.addHandler(handler)
+
+    def attach(self, engine):
+        """Profile every statement of a SQLAlchemy engine (the sync_engine of an AsyncEngine)"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+        self._engines.append(engine)
+
+    def detach(self):
+        """Stop profiling the attached engines"""
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+            event.remove(engine, "handle_error", self._handle_error)
+        self._engines.clear()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_profiler_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_profiler_started"].pop()
+        run = _current_run.get()
+        if run is not None and run.finished:
+            run = None  # Background job spawned by a handler that already returned
+        if run is not None:
+            run.queries += 1
+            run.time += elapsed
+        else:
+            self._add(BACKGROUND, queries=1, seconds=elapsed)
+        if self.slow_threshold and elapsed >= self.slow_threshold:
+            self._log_slow(conn, statement, parameters, executemany, elapsed, run)
+
+    def _handle_error(self, exception_context):
+        started = exception_context.connection.info.get("query_profiler_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+    def _log_slow(self, conn, statement: str, parameters, executemany: bool, elapsed: float, run: Optional[_HandlerRun]):
+        handler = run.handler if run else BACKGROUND
+        self._add(handler, slow=1)
+        plan = self._explain(conn, statement, parameters) if self.explain and not executemany else None
+        self.slow_logger.warning(
+            "%.3fs in %s\n%s\nparameters: %r%s",
+            elapsed, handler, statement.strip(), parameters,
+            f"\nplan:\n{plan}" if plan else "",
+        )
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters) -> Optional[str]:
+        """EXPLAIN output of a statement, through a raw cursor so no event fires again"""
+        prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as e:
+            return f"(EXPLAIN failed: {e})"
+        return "\n".join("  " + " | ".join(str(value) for value in row) for row in rows)
+
+    @contextmanager
+    def handler_scope(self, handler: str, budget: Optional[int] = None):
+        """Attribute the statements run inside the block to `handler`, checking its budget on exit"""
+        run = _HandlerRun(handler)
+        token = _current_run.set(run)
+        try:
+            yield run
+        finally:
+            run.finished = True
+            _current_run.reset(token)
+            self._add(handler, calls=1, queries=run.queries, seconds=run.time, max_queries=run.queries)
+
+        # Checked only when the handler returned normally
+        if budget is not None and run.queries > budget:
+            self._add(handler, over_budget=1)
+            message = f"{handler} issued {run.queries} SQL statements (budget {budget})"
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def wrap(self, callback: Callable, budget: Optional[int] = None) -> Callable:
+        """Async handler callback running inside its own handler scope"""
+        name = handler_name(callback)
+        if budget is None:
+            budget = getattr(callback, "__query_budget__", None)
+
+        @wraps(callback)
+        async def profiled(*args, **kwargs):
+            with self.handler_scope(name, budget):
+                return await callback(*args, **kwargs)
+
+        profiled.__profiled__ = True
+        return profiled
+
+    def instrument_application(self, application):
+        """Wrap the callback of every handler registered on a telegram Application"""
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                if not getattr(handler.callback, "__profiled__", False):
+                    handler.callback = self.wrap(handler.callback)
+
+    def _add(self, handler: str, max_queries: int = 0, **counters):
+        with self._lock:
+            stats = self._stats.get(handler)
+            if stats is None:
+                stats = self._stats[handler] = {
+                    "calls": 0, "queries": 0, "seconds": 0.0, "max_queries": 0, "slow": 0, "over_budget": 0,
+                }
+            for key, value in counters.items():
+                stats[key] += value
+            stats["max_queries"] = max(stats["max_queries"], max_queries)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statement count and time per handler (calls = handler invocations)"""
+        with self._lock:
+            return {
+                handler: {
+                    **stats,
+                    "avg_queries": stats["queries"] / stats["calls"] if stats["calls"] else 0,
+                }
+                for handler, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Global query profiler instance
+query_profiler = QueryProfiler()
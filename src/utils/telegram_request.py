@@ -0,0 +1,41 @@
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from telegram.request import HTTPXRequest
+
+from utils.performance import PerformanceMonitor, performance_monitor
+from utils.tracing import CLIENT, tracer
+
+# Bot API responses per (method, HTTP status or "error"), across every MeasuredRequest
+RESPONSE_COUNTS: Dict[Tuple[str, str], int] = defaultdict(int)
+
+
+class MeasuredRequest(HTTPXRequest):
+    """HTTPXRequest timing every Bot API call as ``telegram.<method>``.
+
+    Calls made while a handler is measured show up in its sub-spans, e.g.
+    ``telegram.sendPhoto`` under ``user_handlers.pay_handler``. Response
+    status codes are counted in RESPONSE_COUNTS (429 = rate limited). Not
+    meant for the long-polling ``getUpdates`` request, whose time is idle
+    waiting. Inside a sampled trace each call is also a CLIENT span.
+    """
+
+    def __init__(self, *args, monitor: Optional[PerformanceMonitor] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.monitor = monitor or performance_monitor
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        status = "error"
+        try:
+            with tracer.span(f"telegram.{api_method}", {"http.request.method": method}, CLIENT) as span, \
+                    self.monitor.measure(f"telegram.{api_method}"):
+                code, payload = await super().do_request(url, method, *args, **kwargs)
+                if span is not None:
+                    span.set_attribute("http.response.status_code", code)
+                    if code >= 400:
+                        span.fail(f"HTTP {code}")
+            status = str(code)
+            return code, payload
+        finally:
+            RESPONSE_COUNTS[(api_method, status)] += 1
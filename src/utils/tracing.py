@@ -0,0 +1,202 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+# Longest SQL text kept on a span
+MAX_STATEMENT_LENGTH = 2048
+
+
+class _Trace:
+    """Spans of one sampled trace, handed to the exporter when its root ends"""
+
+    __slots__ = ("trace_id", "spans", "dropped", "ended")
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self.ended = False  # Set when the root span ends and the spans go to the exporter
+
+
+class Span:
+    """One timed operation of a trace (wall-clock nanoseconds, as OTLP wants them)"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: _Trace, name: str, kind: int, parent_id: Optional[str], attributes: Optional[Dict[str, Any]]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.error: Optional[str] = None
+        self.end_ns = 0
+        self.start_ns = time.time_ns()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def fail(self, message: str):
+        """Mark the span as failed (OTLP status ERROR)"""
+        self.error = message
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+
+# Innermost open span of the running task (asyncio copies it into each task)
+_current_span: ContextVar[Optional[Span]] = ContextVar("tracing_span", default=None)
+
+
+class Tracer:
+    """Head-sampled tracing of Telegram updates.
+
+    ``trace`` opens a root span for a fraction ``sample_rate`` of the calls;
+    ``span`` and ``start_span`` only record anything inside a sampled trace,
+    so unsampled updates cost one random draw and a contextvar read per
+    instrumented call. When a root span ends, its whole span tree goes to
+    the exporter (see services.trace_exporter), which encodes and writes it
+    off the request path.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Any = None, max_spans: int = 1000):
+        """
+        Args:
+            sample_rate: Fraction of root spans recorded (0 = tracing off)
+            exporter: Receives the spans of each finished trace through ``export(spans)``
+            max_spans: Spans kept per trace; further ones are counted, not recorded
+        """
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.max_spans = max_spans
+
+    def configure(self, sample_rate: Optional[float] = None, exporter: Any = None):
+        """Apply settings read after the tracer was created"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if exporter is not None:
+            self.exporter = exporter
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def trace(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = SERVER):
+        """Root span of a new trace, when sampled; a plain child span inside an existing trace"""
+        if _current_span.get() is not None:
+            with self.span(name, attributes, kind) as span:
+                yield span
+            return
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = _Trace()
+        root = Span(trace, name, kind, None, attributes)
+        trace.spans.append(root)
+        try:
+            with self._activate(root):
+                yield root
+        finally:
+            trace.ended = True
+            if trace.dropped:
+                root.set_attribute("tracing.dropped_spans", trace.dropped)
+            if self.exporter is not None:
+                self.exporter.export(trace.spans)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = INTERNAL):
+        """Child span of the current one; yields None outside a sampled trace"""
+        span = self.start_span(name, attributes, kind)
+        if span is None:
+            yield None
+            return
+        with self._activate(span):
+            yield span
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = INTERNAL) -> Optional[Span]:
+        """Open a child span without making it current (leaf spans, e.g. from engine events); call ``end()``
+
+        Tasks spawned inside a trace inherit its current span; once the root
+        has ended (and the trace was exported) they record nothing.
+        """
+        parent = _current_span.get()
+        if parent is None or parent.trace.ended:
+            return None
+        trace = parent.trace
+        if len(trace.spans) >= self.max_spans:
+            trace.dropped += 1
+            return None
+        span = Span(trace, name, kind, parent.span_id, attributes)
+        trace.spans.append(span)
+        return span
+
+    def attach(self, engine):
+        """Add a CLIENT span per statement of a SQLAlchemy engine (the sync_engine of an AsyncEngine)"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        current = _current_span.get()
+        if current is None or current.trace.ended:
+            return
+        words = statement.split(None, 1)
+        attributes = {
+            "db.system.name": conn.dialect.name,
+            "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+        }
+        if executemany:
+            attributes["db.operation.batch.size"] = len(parameters)
+        span = self.start_span(words[0].upper() if words else "SQL", attributes, CLIENT)
+        if span is not None:
+            conn.info.setdefault("tracing_spans", []).append(span)
+
+    @staticmethod
+    def _statement_span(conn) -> Optional[Span]:
+        """Span opened for the statement that just finished, if it belongs to the running trace"""
+        spans = conn.info.get("tracing_spans") if conn is not None else None
+        current = _current_span.get()
+        if spans and current is not None and spans[-1].trace is current.trace:
+            return spans.pop()
+        return None
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        span = self._statement_span(conn)
+        if span is not None:
+            span.end()
+
+    def _handle_error(self, exception_context):
+        span = self._statement_span(exception_context.connection)
+        if span is not None:
+            error = exception_context.original_exception
+            span.fail(f"{type(error).__name__}: {error}")
+            span.end()
+
+    @contextmanager
+    def _activate(self, span: Span):
+        token = _current_span.set(span)
+        try:
+            yield
+        except Exception as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+
+
+# Global tracer instance
+tracer = Tracer()
+
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Dict, Hashable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from utils.database import Database
+from utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class SessionUpdateProcessor(BaseUpdateProcessor):
+    """Concurrent update processor with per-user ordering and one DB session per update.
+
+    Updates from different users/chats run in parallel (at most
+    ``max_concurrent_updates`` handlers at a time). Updates sharing the
+    same key are executed strictly in arrival order, so ``/pay`` ->
+    callback -> proof for one user never race each other.
+    """
+
+    def __init__(self, database: Database, max_concurrent_updates: int = 1, max_pending_updates: int = 256):
+        # PTB's semaphore only bounds how many updates may be pending; the
+        # worker limit is applied after the per-key lock so that a burst from
+        # one user can't hold every slot while waiting for its own turn.
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self.database = database
+        self.worker_limit = max_concurrent_updates
+        self._workers = asyncio.Semaphore(max_concurrent_updates)
+        self._key_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._queue_depth: Dict[Hashable, int] = defaultdict(int)
+        self._active = 0
+        self.processed = 0
+        self.max_queue_depth_seen = 0
+
+    @staticmethod
+    def update_key(update: object) -> Optional[Hashable]:
+        """Ordering key of an update: the user, falling back to the chat"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return ("user", update.effective_user.id)
+        if update.effective_chat:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    @staticmethod
+    def update_span(update: object) -> Tuple[str, Dict[str, Any]]:
+        """Name and attributes of an update's root span: its command, else its kind"""
+        if not isinstance(update, Update):
+            return "update", {}
+        kind = next((str(name) for name in Update.ALL_TYPES if getattr(update, name, None) is not None), "update")
+        attributes: Dict[str, Any] = {"telegram.update_id": update.update_id, "telegram.update_type": kind}
+        if update.effective_chat:
+            attributes["telegram.chat_type"] = update.effective_chat.type
+        text = update.message.text if update.message else None
+        if text and text.startswith("/"):
+            return text.split(None, 1)[0].split("@", 1)[0], attributes
+        return kind, attributes
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Trace the update, then run it as soon as its ordering key allows"""
+        with tracer.trace("update") as span:
+            if span is not None:
+                span.name, span.attributes = self.update_span(update)
+            await self._process(update, coroutine)
+
+    async def _process(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Wait for earlier updates of the same key, then run inside a session scope"""
+        key = self.update_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        self._queue_depth[key] += 1
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self._queue_depth[key])
+        lock = self._key_locks.get(key)
+        if lock is None:
+            lock = self._key_locks[key] = asyncio.Lock()
+
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._queue_depth[key] -= 1
+            if self._queue_depth[key] <= 0:
+                # Last pending update for this key: drop its bookkeeping
+                del self._queue_depth[key]
+                self._key_locks.pop(key, None)
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._workers:
+            self._active += 1
+            try:
+                # Root span minus this one = time queued behind the same user or the worker limit
+                with tracer.span("process"):
+                    async with self.database.session_scope():
+                        await coroutine
+            finally:
+                self._active -= 1
+                self.processed += 1
+
+    def get_queue_depths(self) -> Dict[Hashable, int]:
+        """Snapshot of pending updates (running + waiting) per ordering key"""
+        return dict(self._queue_depth)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Processor metrics: active workers, pending updates and queue depth"""
+        depths = self._queue_depth.values()
+        return {
+            "worker_limit": self.worker_limit,
+            "active": self._active,
+            "pending": sum(depths),
+            "keys": len(self._queue_depth),
+            "max_queue_depth": max(depths, default=0),
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "processed": self.processed,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pending = self.get_stats()["pending"]
+        if pending:
+            logger.warning("Update processor shutting down with %d pending updates", pending)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Teste de regressão de N+1: /pending (fila e resumo), /ban e /userinfo devem
+executar o mesmo número de comandos SQL com 3 ou 60 linhas envolvidas.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import event
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from handlers.admin_handlers import AdminHandlers
+from models.base import Base
+from services.admin_cache import AdminCache
+from utils.database import Database
+from admin_test_fakes import FakeBot, FakeTelegram, make_update, seed
+
+
+async def count_statements(rows):
+    """SQL statements issued by each handler with `rows` groups/payments/payers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(f"sqlite:///{tmp}/queries.db")
+        await database.create_all(Base.metadata)
+        await seed(database, rows)
+
+        handlers = AdminHandlers(
+            database, FakeTelegram(), None,
+            admin_cache=AdminCache(database, check_interval=3600),
+        )
+        await handlers.admins.refresh()  # Warm the cache so authorization is query-free
+
+        statements = []
+        event.listen(database.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        counts = {}
+        for name, handler, args in [
+            ("pending", handlers.pending_handler, []),
+            ("pending resumo", handlers.pending_handler, ["resumo"]),
+            ("userinfo", handlers.userinfo_handler, ["1000"]),
+            ("ban", handlers.ban_handler, ["1000"]),
+        ]:
+            update, message = make_update()
+            bot = FakeBot()
+            statements.clear()
+            async with database.session_scope():
+                await handler(update, SimpleNamespace(args=args, bot=bot))
+            counts[name] = len(statements)
+            assert message.replies or bot.sent, f"/{name} did not reply"
+
+        await database.dispose()
+        return counts
+
+
+def test_admin_reports_issue_constant_queries():
+    few = asyncio.run(count_statements(3))
+    many = asyncio.run(count_statements(60))
+    assert few == many, f"statement counts grow with rows: {few} vs {many}"
+
+
+if __name__ == "__main__":
+    test_admin_reports_issue_constant_queries()
+    print("✅ Número de consultas constante")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Teste da camada de banco assíncrona: updates processados ao mesmo tempo
+recebem sessões separadas, e uma consulta lenta de um update não trava as
+consultas dos outros nem o event loop.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import event, text
+from telegram import Chat, Message, Update, User
+
+from utils.database import Database
+from utils.update_processor import SessionUpdateProcessor
+
+SLOW_QUERY_SECONDS = 0.5
+
+
+def make_update(update_id, user_id):
+    chat = Chat(user_id, "private")
+    message = Message(update_id, datetime.now(), chat, from_user=User(user_id, f"user{user_id}", False), text="/status")
+    return Update(update_id, message=message)
+
+
+def add_sleep_function(dbapi_connection, connection_record):
+    """SQL function sleep(seconds), run by SQLite in the connection's worker thread"""
+    def sleep(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    dbapi_connection.run_async(lambda connection: connection.create_function("sleep", 1, sleep))
+
+
+async def run_concurrent_updates():
+    """A slow and a fast update of different users; returns their sessions and finish order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(f"sqlite:///{tmp}/sessions.db")
+        event.listen(database.engine.sync_engine, "connect", add_sleep_function)
+        processor = SessionUpdateProcessor(database, max_concurrent_updates=4)
+        sessions = {}
+        finished = []
+
+        async def slow_update():
+            sessions["slow"] = database.session
+            await database.session.execute(text("SELECT sleep(:seconds)"), {"seconds": SLOW_QUERY_SECONDS})
+            finished.append("slow")
+
+        async def fast_update():
+            await asyncio.sleep(0.05)  # Starts while the slow query is running
+            sessions["fast"] = database.session
+            started = time.monotonic()
+            await database.session.execute(text("SELECT 1"))
+            sessions["fast_query_seconds"] = time.monotonic() - started
+            finished.append("fast")
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 1), slow_update()),
+            processor.process_update(make_update(2, 2), fast_update()),
+        )
+        await database.dispose()
+        return sessions, finished
+
+
+def test_concurrent_updates_get_separate_sessions():
+    sessions, finished = asyncio.run(run_concurrent_updates())
+
+    assert sessions["slow"] is not sessions["fast"]
+    # The fast update neither waited for the slow query nor for its session
+    assert finished == ["fast", "slow"], finished
+    assert sessions["fast_query_seconds"] < SLOW_QUERY_SECONDS / 2, sessions["fast_query_seconds"]
+
+
+if __name__ == "__main__":
+    test_concurrent_updates_get_separate_sessions()
+    print("✅ Sessões separadas por update, sem bloqueio entre consultas")
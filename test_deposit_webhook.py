@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Teste do webhook de depósitos: requisições reais ao app do DepositWebhookServer
+validam a autenticação Basic, a checagem do valor, a deduplicação por
+(bankTxId, status) e que dois eventos liquidados ao mesmo tempo estendem a
+assinatura uma única vez.
+"""
+
+import asyncio
+import base64
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from models.base import Base
+from models.payment import Payment
+from models.user import User
+from services.subscription_service import SubscriptionService
+from services.webhook_service import DepositWebhookServer
+from utils.database import Database
+
+SECRET = "s3cret-webhook-token"
+PATH = "/webhooks/deposit"
+QR_ID = "qr-123"
+DAYS = 30
+
+
+def basic(credential):
+    return {"Authorization": f"Basic {credential}"}
+
+
+AUTH = basic(SECRET)
+
+
+def event(bank_tx_id, status="depix_sent", value_in_cents=1000):
+    return {"bankTxId": bank_tx_id, "qrId": QR_ID, "status": status, "valueInCents": value_in_cents}
+
+
+async def seed(database, expires_at):
+    """A user with an active subscription and one pending R$ 10 PIX payment"""
+    async with database.session_scope() as session:
+        user = User(telegram_id="42", status_assinatura="active", data_expiracao=expires_at)
+        session.add(user)
+        await session.flush()
+        payment = Payment(user_id=user.id, amount=10.0, payment_method="pix", status="pending", pixgo_payment_id=QR_ID)
+        session.add(payment)
+        await session.commit()
+        return user.id, payment.id
+
+
+async def load(database, user_id, payment_id):
+    async with database.session_scope() as session:
+        user = await session.get(User, user_id)
+        payment = await session.get(Payment, payment_id)
+        return user.data_expiracao, payment.status
+
+
+async def exercise():
+    """Outcome of each scenario, read back from the database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(f"sqlite:///{tmp}/webhook.db")
+        await database.create_all(Base.metadata)
+        expires_at = datetime.utcnow() + timedelta(days=5)
+        user_id, payment_id = await seed(database, expires_at)
+
+        server = DepositWebhookServer(database, SubscriptionService(DAYS), SECRET)
+        results = {}
+        async with TestClient(TestServer(server.build_app())) as client:
+            async def post(body, headers=AUTH):
+                response = await client.post(PATH, json=body, headers=headers)
+                return response.status, await response.json()
+
+            # Authorization: raw secret and base64(user:secret), right and wrong
+            results["unauthorized"] = [
+                (await post(event("tx-auth"), headers))[0]
+                for headers in (
+                    {},
+                    basic("wrong-secret-value"),
+                    basic(base64.b64encode(b"depix:wrong-secret-value").decode()),
+                    {"Authorization": f"Bearer {SECRET}"},
+                )
+            ]
+            results["base64_auth"] = await post(
+                event("tx-b64", status="under_review"), basic(base64.b64encode(f"depix:{SECRET}".encode()).decode())
+            )
+
+            results["invalid_amount"] = await post(event("tx-bad", value_in_cents="ten"))
+            results["mismatch"] = await post(event("tx-low", value_in_cents=100))
+            results["after_mismatch"] = await load(database, user_id, payment_id)
+
+            # Two different settled events for the same payment, delivered at once
+            results["concurrent"] = await asyncio.gather(post(event("tx-1")), post(event("tx-2")))
+            results["settled"] = await load(database, user_id, payment_id)
+
+            results["duplicate"] = await post(event("tx-1"))
+            results["late_failure"] = await post(event("tx-3", status="canceled"))
+            results["final"] = await load(database, user_id, payment_id)
+
+        await database.dispose()
+        return expires_at, results
+
+
+def test_deposit_webhook():
+    expires_at, results = asyncio.run(exercise())
+
+    assert results["unauthorized"] == [401, 401, 401, 401]
+    assert results["base64_auth"] == (200, {"result": "recorded"})
+
+    assert results["invalid_amount"][0] == 400
+    assert results["mismatch"] == (200, {"result": "amount_mismatch"})
+    assert results["after_mismatch"] == (expires_at, "pending")
+
+    outcomes = sorted(body["result"] for status, body in results["concurrent"])
+    assert outcomes == ["already_settled", "settled"], outcomes
+    # Renewal stacks on the remaining time, exactly once
+    assert results["settled"] == (expires_at + timedelta(days=DAYS), "completed")
+
+    assert results["duplicate"] == (200, {"result": "duplicate"})
+    # A cancellation arriving after the settlement leaves the payment completed
+    assert results["late_failure"] == (200, {"result": "recorded"})
+    assert results["final"] == results["settled"]
+
+
+if __name__ == "__main__":
+    test_deposit_webhook()
+    print("✅ Webhook de depósitos autenticado, deduplicado e idempotente")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Teste do endpoint /metrics: sobe o MetricsServer numa porta livre, gera
+medições (handler com queries, PixGo com o disjuntor aberto, Bot API com
+429) e valida o formato de exposição do Prometheus obtido por um scrape real.
+"""
+
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+import aiohttp
+import httpx
+from sqlalchemy import text
+
+from services.metrics_server import CONTENT_TYPE, MetricsServer
+from services.pixgo_service import AsyncPixGoService
+from utils.database import Database
+from utils.performance import PerformanceMonitor, instrument_engine
+from utils.query_profiler import QueryProfiler
+from utils.telegram_request import MeasuredRequest
+
+SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+
+
+class FakeProcessor:
+    def get_stats(self):
+        return {
+            "worker_limit": 8, "active": 2, "pending": 5, "keys": 3,
+            "max_queue_depth": 3, "max_queue_depth_seen": 4, "processed": 42,
+        }
+
+
+def parse(body):
+    """{(name, frozenset(labels)): value}, checking every sample follows its family's TYPE line"""
+    samples = {}
+    declared = {}
+    family_order = []
+    for line in body.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            declared[name] = kind
+            family_order.append(name)
+            continue
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"malformed sample line: {line!r}"
+        name = match["name"]
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in declared else name
+        assert family in declared, f"{name} has no TYPE line"
+        assert family == family_order[-1], f"{name} is not contiguous with its family"
+        labels = frozenset(re.findall(r'(\w+)="([^"]*)"', match["labels"] or ""))
+        samples[(name, labels)] = float(match["value"])
+    return samples, declared
+
+
+async def exercise(monitor, pixgo, profiler):
+    """Measurements the endpoint has to expose"""
+    database = Database("sqlite://")
+    instrument_engine(database.engine.sync_engine, monitor=monitor)
+    profiler.attach(database.engine.sync_engine)
+
+    @profiler.wrap
+    @monitor.measure_function("user_handlers.pay_handler")
+    async def pay_handler():
+        async with database.session_scope() as session:
+            await session.execute(text("SELECT 1"))
+            await session.execute(text("SELECT 2"))
+        await asyncio.sleep(0.01)
+
+    for _ in range(3):
+        await pay_handler()
+    profiler.detach()
+    await database.dispose()
+
+    # Breaker trips after five failures, then refuses a call
+    for _ in range(pixgo.circuit_breaker.failure_threshold):
+        pixgo.circuit_breaker._on_failure()
+    try:
+        await pixgo.circuit_breaker.call_async(asyncio.sleep, 0)
+    except Exception:
+        pass
+
+    def telegram_api(request):
+        if request.url.path.endswith("/sendMessage"):
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 1}})
+        return httpx.Response(200, json={"ok": True, "result": True})
+
+    request = MeasuredRequest(monitor=monitor, httpx_kwargs={"transport": httpx.MockTransport(telegram_api)})
+    await request.initialize()
+    for endpoint in ("sendMessage", "sendMessage", "sendPhoto"):
+        await request.do_request(f"https://api.telegram.org/botTOKEN/{endpoint}", "POST")
+    await request.shutdown()
+
+
+async def scrape():
+    monitor = PerformanceMonitor()
+    pixgo = AsyncPixGoService("test-key")
+    profiler = QueryProfiler()
+    await exercise(monitor, pixgo, profiler)
+
+    server = MetricsServer(monitor=monitor, update_processor=FakeProcessor(), pixgo=pixgo, profiler=profiler, port=0)
+    await server.start()
+    try:
+        host, port = server._runner.addresses[0][:2]
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://{host}:{port}/metrics") as response:
+                assert response.status == 200
+                assert response.headers["Content-Type"] == CONTENT_TYPE
+                body = await response.text()
+    finally:
+        await server.stop()
+        await pixgo.aclose()
+    return body
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    samples, declared = parse(asyncio.run(scrape()))
+
+    assert declared["botclient_operation_duration_seconds"] == "histogram"
+    assert declared["botclient_db_query_duration_seconds"] == "histogram"
+    assert declared["botclient_pixgo_circuit_opened_total"] == "counter"
+
+    handler = {("operation", "user_handlers.pay_handler")}
+    assert samples[("botclient_operation_duration_seconds_count", frozenset(handler))] == 3
+    buckets = sorted(
+        (float(dict(labels)["le"]), value)
+        for (name, labels), value in samples.items()
+        if name == "botclient_operation_duration_seconds_bucket" and handler <= labels
+    )
+    assert buckets[-1] == (float("inf"), 3)
+    assert all(a[1] <= b[1] for a, b in zip(buckets, buckets[1:])), "buckets are not cumulative"
+    assert dict(buckets)[0.005] == 0 and dict(buckets)[1] == 3  # Each call sleeps 10ms
+
+    assert samples[("botclient_db_query_duration_seconds_count", frozenset())] == 6
+    assert samples[("botclient_handler_queries_total", frozenset({("handler", "pay_handler")}))] == 6
+    assert samples[("botclient_update_queue_pending", frozenset())] == 5
+    assert samples[("botclient_updates_processed_total", frozenset())] == 42
+
+    assert samples[("botclient_pixgo_circuit_state", frozenset({("state", "open")}))] == 1
+    assert samples[("botclient_pixgo_circuit_state", frozenset({("state", "closed")}))] == 0
+    assert samples[("botclient_pixgo_circuit_opened_total", frozenset())] == 1
+    assert samples[("botclient_pixgo_circuit_rejected_total", frozenset())] == 1
+
+    assert samples[("botclient_telegram_request_duration_seconds_count", frozenset({("method", "sendMessage")}))] == 2
+    assert samples[("botclient_telegram_responses_total", frozenset({("method", "sendPhoto"), ("code", "200")}))] == 1
+    assert samples[("botclient_telegram_rate_limited_total", frozenset({("method", "sendMessage")}))] == 2
+
+
+if __name__ == "__main__":
+    test_metrics_endpoint_exposes_prometheus_text()
+    print("✅ /metrics no formato do Prometheus")
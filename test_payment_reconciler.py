@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Teste do PaymentReconciler: um pagamento liquidado (webhook, /confirm) entre a
+consulta de status na PixGo e a escrita do reconciler continua "completed",
+mesmo que a PixGo ainda responda "expired".
+"""
+
+import asyncio
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from sqlalchemy import event
+
+import models  # noqa: F401 - registers every table on Base.metadata
+from models.base import Base
+from models.payment import Payment
+from models.user import User
+from services.payment_reconciler import PaymentReconciler
+from services.pixgo_service import CircuitBreaker
+from services.subscription_service import SubscriptionService
+from utils.database import Database
+
+QR_ID = "qr-123"
+
+
+class StalePixGo:
+    """PixGo answering with a status that is already outdated"""
+
+    def __init__(self, status):
+        self.status = status
+        self.circuit_breaker = CircuitBreaker()
+
+    async def get_payment_status(self, payment_id, *, raise_errors=False):
+        return self.status
+
+
+async def seed(database):
+    async with database.session_scope() as session:
+        user = User(telegram_id="42", status_assinatura="inactive")
+        session.add(user)
+        await session.flush()
+        payment = Payment(user_id=user.id, amount=10.0, payment_method="pix", status="pending", pixgo_payment_id=QR_ID)
+        session.add(payment)
+        await session.commit()
+        return payment.id
+
+
+async def exercise():
+    """Status of the payment and the reconciler stats after the race"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/reconciler.db"
+        database = Database(f"sqlite:///{path}")
+        await database.create_all(Base.metadata)
+        payment_id = await seed(database)
+
+        def settle_elsewhere(conn, cursor, statement, parameters, context, executemany):
+            # The webhook commits its settlement right before the reconciler writes
+            if statement.startswith("UPDATE payments") and not settled:
+                settled.append(True)
+                other = sqlite3.connect(path)
+                with other:
+                    other.execute(
+                        "UPDATE payments SET status = 'completed', completed_at = ? WHERE id = ?",
+                        (datetime.utcnow().isoformat(" "), payment_id),
+                    )
+                other.close()
+
+        settled = []
+        event.listen(database.engine.sync_engine, "before_cursor_execute", settle_elsewhere)
+
+        reconciler = PaymentReconciler(database, StalePixGo("expired"), SubscriptionService(30))
+        checked = await reconciler.run_once()
+
+        async with database.session_scope() as session:
+            status = (await session.get(Payment, payment_id)).status
+        await database.dispose()
+        return checked, bool(settled), status, reconciler.get_stats()
+
+
+def test_settlement_between_poll_and_write_wins():
+    checked, settled, status, stats = asyncio.run(exercise())
+
+    assert checked == 1
+    assert settled
+    assert status == "completed", status
+    assert stats["failed"] == 0
+    # Stops tracking the payment either way
+    assert stats["tracked"] == 0
+
+
+if __name__ == "__main__":
+    test_settlement_between_poll_and_write_wins()
+    print("✅ Reconciler não sobrescreve pagamentos liquidados")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Teste dos orçamentos de queries: /pending, /userinfo e /ban rodam dentro do
+@query_budget declarado, e um handler acima do orçamento faz o teste falhar.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import pytest
+
+from handlers.admin_handlers import AdminHandlers
+from models.base import Base
+from services.admin_cache import AdminCache
+from utils.database import Database
+from utils.query_profiler import QueryBudgetExceeded, QueryProfiler
+from admin_test_fakes import FakeBot, FakeTelegram, make_update, seed
+
+
+async def run_handlers(profiler, budget=None):
+    """Budgeted admin handlers run through the profiler; returns its per-handler stats"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(f"sqlite:///{tmp}/budgets.db")
+        await database.create_all(Base.metadata)
+        await seed(database, 5)
+
+        handlers = AdminHandlers(
+            database, FakeTelegram(), None,
+            admin_cache=AdminCache(database, check_interval=3600),
+        )
+        await handlers.admins.refresh()  # Warm the cache so authorization is query-free
+        profiler.attach(database.engine.sync_engine)
+
+        try:
+            for handler, args in [
+                (handlers.pending_handler, []),
+                (handlers.pending_handler, ["resumo"]),
+                (handlers.userinfo_handler, ["1000"]),
+                (handlers.ban_handler, ["1000"]),
+            ]:
+                update, message = make_update()
+                bot = FakeBot()
+                async with database.session_scope():
+                    await profiler.wrap(handler, budget)(update, SimpleNamespace(args=args, bot=bot))
+                assert message.replies or bot.sent, f"{handler.__name__} did not reply"
+        finally:
+            profiler.detach()
+            await database.dispose()
+        return profiler.get_stats()
+
+
+def test_admin_handlers_stay_within_budget(query_budget_profiler):
+    stats = asyncio.run(run_handlers(query_budget_profiler))
+    assert stats["AdminHandlers.pending_handler"]["calls"] == 2
+    assert stats["AdminHandlers.ban_handler"]["max_queries"] > 0
+    assert not any(handler["over_budget"] for handler in stats.values())
+
+
+def test_handler_over_budget_fails(query_budget_profiler):
+    with pytest.raises(QueryBudgetExceeded, match="pending_handler issued"):
+        asyncio.run(run_handlers(query_budget_profiler, budget=1))
+
+
+if __name__ == "__main__":
+    test_admin_handlers_stay_within_budget(QueryProfiler(strict=True))
+    test_handler_over_budget_fails(QueryProfiler(strict=True))
+    print("✅ Handlers dentro do orçamento de queries")
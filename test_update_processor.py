@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Teste do SessionUpdateProcessor: updates do mesmo usuário rodam estritamente
+na ordem de chegada, enquanto usuários diferentes rodam em paralelo, sem
+passar de max_concurrent_updates handlers ao mesmo tempo.
+"""
+
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from telegram import Chat, Message, Update, User
+
+from utils.database import Database
+from utils.update_processor import SessionUpdateProcessor
+
+WORKERS = 2
+
+
+def make_update(update_id, user_id):
+    chat = Chat(user_id, "private")
+    message = Message(update_id, datetime.now(), chat, from_user=User(user_id, f"user{user_id}", False), text="/pay")
+    return Update(update_id, message=message)
+
+
+async def run_interleaved():
+    """Interleaved updates of three users; returns the (event, user, seq) log and the peak concurrency"""
+    database = Database("sqlite://")
+    processor = SessionUpdateProcessor(database, max_concurrent_updates=WORKERS)
+    log = []
+    running = {"now": 0, "peak": 0}
+
+    async def handler(user_id, seq):
+        # Each handler holds a session, like a real update
+        assert database.session is not None
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        log.append(("start", user_id, seq))
+        # Earlier updates take longer, so any reordering would show up
+        await asyncio.sleep(0.03 if seq == 0 else 0.01)
+        log.append(("end", user_id, seq))
+        running["now"] -= 1
+
+    arrivals = [(user_id, seq) for seq in range(3) for user_id in (1, 2, 3)]
+    await asyncio.gather(*(
+        processor.process_update(make_update(index, user_id), handler(user_id, seq))
+        for index, (user_id, seq) in enumerate(arrivals)
+    ))
+    stats = processor.get_stats()
+    await database.dispose()
+    return log, running["peak"], stats
+
+
+def test_same_user_in_order_different_users_in_parallel():
+    log, peak, stats = asyncio.run(run_interleaved())
+
+    for user_id in (1, 2, 3):
+        events = [(event, seq) for event, user, seq in log if user == user_id]
+        # Strictly sequential: each update starts only after the previous one ended
+        assert events == [(event, seq) for seq in range(3) for event in ("start", "end")], events
+
+    # Different users overlapped, but never beyond the worker limit
+    assert peak == WORKERS, peak
+    first_end = next(i for i, entry in enumerate(log) if entry[0] == "end")
+    assert {user for event, user, _ in log[:first_end] if event == "start"} == {1, 2}
+
+    assert stats["processed"] == 9
+    assert stats["pending"] == 0 and stats["keys"] == 0
+
+
+if __name__ == "__main__":
+    test_same_user_in_order_different_users_in_parallel()
+    print("✅ Ordem por usuário e paralelismo entre usuários garantidos")